@@ -6,11 +6,13 @@ import psycopg2
 from psycopg2.extras import RealDictCursor
 from typing import List, Dict, Optional
 from config import DB_CONFIG
+from metrics import psycopg2_connection_factory
 
 
 class Database:
     def get_connection(self):
-        return psycopg2.connect(**DB_CONFIG)
+        # Cursors from this connection count statements and DB time for /metrics
+        return psycopg2.connect(**DB_CONFIG, connection_factory=psycopg2_connection_factory())
 
     def create_tables(self):
         with self.get_connection() as conn:
@@ -4,6 +4,7 @@ from models import PaymentRequest, PaymentResponse
 from payment_logic import PaymentProcessor
 from database import Database
 from config import STRIPE_PUBLISHABLE_KEY, STRIPE_TEST_TOKENS
+from metrics import install
 
 app = FastAPI(title="Payment Gateway API", version="1.0.0")
 
@@ -14,6 +15,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency and SQL statements per request (see Database.get_connection); served on /metrics
+install(app)
+
 db = Database()
 payment_processor = PaymentProcessor()
 
@@ -5,6 +5,8 @@ from sqlalchemy.orm import Session
 from database import engine, get_db, Base
 import models
 import auth
+from metrics import install, instrument_engine
+from http_cache import HttpCacheMiddleware
 import stripe
 from typing import Optional
 
@@ -20,6 +22,13 @@ app = FastAPI(
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+# ETag / 304 and compression for the JSON API; the package list is the same for everyone
+app.add_middleware(HttpCacheMiddleware, policies={"/api/packages": "public, max-age=300"})
+
+# Request latency and SQL statements per request; served on /metrics
+instrument_engine(engine)
+install(app)
+
 # Stripe configuration (use environment variable in production)
 stripe.api_key = "sk_test_51Suv7kGeI2OTInqlXrgjjtz67Bx8KTunfDFFsu3JFzZonJcL56ft3BUs2DIqHGryqrhE7NfSQqyys6BXW5bN68c200IUOUtLBc"
 
@@ -0,0 +1,54 @@
+"""
+Benchmark: renders per second for each export layout, built with python-docx
+on every request vs filled into the compiled template, and all formats at once.
+Needs no database:
+    python bench_layouts.py --seconds 2
+"""
+
+import argparse
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from word_export import LAYOUTS, TEMPLATES, build_document, render_formats
+
+
+def sample_report():
+    return SimpleNamespace(
+        uhid="UH000123", sl_no="45", reg_no="R-2024-0099", patient_no="P-778",
+        patient_name="Benchmark Patient", report_date="2024-03-01", age_sex="45/M",
+        origin_ethe="OPD", ref_by="Dr Benchmark", film_no="F-12", scan_time="10:15 AM",
+        report_time="11:05 AM", tat="50 min", scan_type="CT BRAIN PLAIN",
+        doctor_description="No intracranial haemorrhage.\nVentricles are normal in size.\n" * 5,
+        impression="No acute intracranial abnormality.",
+        created_at=datetime(2024, 3, 1, 11, 5),
+    )
+
+
+def measure(render, seconds):
+    count = 0
+    start = time.perf_counter()
+    end = start + seconds
+    while time.perf_counter() < end:
+        render()
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def main(args):
+    report = sample_report()
+
+    for name, layout in LAYOUTS.items():
+        built = measure(lambda: build_document(layout, report).getvalue(), args.seconds)
+        compiled = measure(lambda: TEMPLATES[name].render(report), args.seconds)
+        print(f"{name:<10} python-docx {built:8.1f}/s  compiled {compiled:9.1f}/s  x{compiled / built:.0f}")
+
+    formats = list(LAYOUTS)
+    separate = measure(lambda: [TEMPLATES[name].render(report) for name in formats], args.seconds)
+    one_pass = measure(lambda: render_formats(report, formats), args.seconds)
+    print(f"{'all':<10} separate    {separate:8.1f}/s  one pass {one_pass:9.1f}/s  ({len(formats)} formats each)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=2, help="Time spent on each measurement")
+    main(parser.parse_args())
@@ -0,0 +1,183 @@
+import io
+import re
+import struct
+import time
+import zipfile
+import zlib
+from types import SimpleNamespace
+
+DOCUMENT_PART = "word/document.xml"
+
+# python-docx writes each value into a single <w:t>, so a marker survives intact
+MARKER = re.compile(r"@@(\w+)@@")
+TEXT_NODE = re.compile(r"<w:t(?: [^>]*)?>([^<]*)</w:t>")
+
+# Characters XML 1.0 does not allow at all
+INVALID_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+RUN_BREAK = '</w:t><w:br/><w:t xml:space="preserve">'
+RUN_TAB = '</w:t><w:tab/><w:t xml:space="preserve">'
+
+
+def _escape(text):
+    """Escape a value the way python-docx stores run text (line breaks and tabs become elements)"""
+    text = INVALID_XML_CHARS.sub("", text)
+    text = text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    text = text.replace("\t", RUN_TAB)
+    return text.replace("\r", RUN_BREAK).replace("\n", RUN_BREAK)
+
+
+def escape_fields(report, fields):
+    """Escaped text of each non-empty field, read from the report once (empty fields are left out)"""
+    values = {}
+    for field in fields:
+        value = getattr(report, field)
+        if value:
+            values[field] = _escape(str(value))
+    return values
+
+
+def _dos_time():
+    t = time.localtime()
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dos_date = ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    return dos_time, dos_date
+
+
+def _deflate(data):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _local_header(name, crc, compressed_size, size, dos_time, dos_date):
+    return struct.pack(
+        "<IHHHHHIIIHH", 0x04034B50, 20, 0, zipfile.ZIP_DEFLATED,
+        dos_time, dos_date, crc, compressed_size, size, len(name), 0
+    ) + name
+
+
+def _central_header(name, crc, compressed_size, size, dos_time, dos_date, offset):
+    return struct.pack(
+        "<IHHHHHHIIIHHHHHII", 0x02014B50, 20, 20, 0, zipfile.ZIP_DEFLATED,
+        dos_time, dos_date, crc, compressed_size, size, len(name), 0, 0, 0, 0, 0, offset
+    ) + name
+
+
+class DocxTemplate:
+    """A .docx layout compiled once; rendering only fills field values into document.xml.
+
+    build is a python-docx builder such as word_export.build_document. It is run
+    once with marker values so the layout (styles, tables, headings) comes
+    from the same code as before. defaults gives the text the builder
+    writes when a field is empty (anything not listed becomes "").
+    """
+
+    def __init__(self, build, fields, defaults=None):
+        self.defaults = defaults or {}
+        probe = SimpleNamespace(**{field: f"@@{field}@@" for field in fields})
+        package = zipfile.ZipFile(build(probe))
+        self._compile_document(package.read(DOCUMENT_PART).decode("utf-8"))
+        self._compile_package(package)
+        # Fields this layout shows, and their empty text already escaped
+        self.fields = tuple(dict.fromkeys(self.segments[1::2]))
+        self.empty = {field: _escape(self.defaults.get(field, "")) for field in self.fields}
+
+    def _compile_document(self, xml):
+        # Alternating literal XML and field names: [xml, field, xml, field, ..., xml]
+        self.segments = []
+        literal = []
+        position = 0
+
+        for node in TEXT_NODE.finditer(xml):
+            text = node.group(1)
+            if not MARKER.search(text):
+                continue
+            literal.append(xml[position:node.start()])
+            literal.append('<w:t xml:space="preserve">')
+            parts = MARKER.split(text)
+            for index, part in enumerate(parts):
+                if index % 2 == 0:
+                    literal.append(part)
+                else:
+                    self.segments.append("".join(literal))
+                    self.segments.append(part)
+                    literal = []
+            literal.append("</w:t>")
+            position = node.end()
+
+        literal.append(xml[position:])
+        self.segments.append("".join(literal))
+
+        if "@@" in "".join(self.segments[::2]):
+            raise ValueError("Template field was split across runs and cannot be filled in")
+
+    def _compile_package(self, package):
+        # Every part except document.xml is identical for all reports, so it is
+        # compressed once. document.xml goes last to keep those offsets fixed.
+        dos_time, dos_date = _dos_time()
+        local_parts = []
+        central_parts = []
+        offset = 0
+
+        for info in package.infolist():
+            if info.filename == DOCUMENT_PART:
+                continue
+            data = package.read(info.filename)
+            compressed = _deflate(data)
+            name = info.filename.encode("utf-8")
+            crc = zlib.crc32(data)
+            header = _local_header(name, crc, len(compressed), len(data), dos_time, dos_date)
+            local_parts.append(header + compressed)
+            central_parts.append(_central_header(name, crc, len(compressed), len(data), dos_time, dos_date, offset))
+            offset += len(header) + len(compressed)
+
+        self.static_local = b"".join(local_parts)
+        self.static_central = b"".join(central_parts)
+        self.static_count = len(central_parts)
+        self.dos_time = dos_time
+        self.dos_date = dos_date
+
+    def render_xml(self, report):
+        """document.xml for one report, as bytes"""
+        return self.fill(escape_fields(report, self.fields))
+
+    def fill(self, values):
+        """document.xml from already escaped values (see escape_fields), as bytes"""
+        pieces = []
+        segments = self.segments
+        empty = self.empty
+        for index in range(0, len(segments) - 1, 2):
+            field = segments[index + 1]
+            pieces.append(segments[index])
+            pieces.append(values.get(field) or empty[field])
+        pieces.append(segments[-1])
+        return "".join(pieces).encode("utf-8")
+
+    def render(self, report):
+        """Complete .docx file for one report, as bytes"""
+        return self.package(self.render_xml(report))
+
+    def render_values(self, values):
+        """Complete .docx file from already escaped values, so several
+        templates can share one read of the report"""
+        return self.package(self.fill(values))
+
+    def package(self, data):
+        """Zip document.xml together with the precompressed static parts"""
+        compressed = _deflate(data)
+        crc = zlib.crc32(data)
+        name = DOCUMENT_PART.encode("utf-8")
+        offset = len(self.static_local)
+
+        local = _local_header(name, crc, len(compressed), len(data), self.dos_time, self.dos_date)
+        central = self.static_central + _central_header(
+            name, crc, len(compressed), len(data), self.dos_time, self.dos_date, offset
+        )
+        end = struct.pack(
+            "<IHHHHIIH", 0x06054B50, 0, 0, self.static_count + 1, self.static_count + 1,
+            len(central), offset + len(local) + len(compressed), 0
+        )
+        return b"".join((self.static_local, local, compressed, central, end))
+
+    def render_stream(self, report):
+        """Same as render() but as a file object, like the python-docx builders return"""
+        return io.BytesIO(self.render(report))
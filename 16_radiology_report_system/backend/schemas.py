@@ -0,0 +1,51 @@
+from pydantic import BaseModel, ConfigDict
+from typing import Optional
+from datetime import date, datetime
+
+# Response models. With a response model FastAPI writes the JSON in pydantic-core
+# straight from the returned rows or ORM objects.
+
+
+class ReportCreated(BaseModel):
+    success: bool
+    id: int
+    message: str
+
+
+# One row of the reports table
+class ReportSummary(BaseModel):
+    # from_attributes lets these be filled from SQLAlchemy Row tuples and ORM objects
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    uhid: Optional[str] = None
+    patient_name: str
+    patient_no: Optional[str] = None
+    report_date: Optional[date] = None
+    age_sex: Optional[str] = None
+    scan_type: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+# A full report
+class ReportDetail(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    uhid: Optional[str] = None
+    sl_no: Optional[str] = None
+    reg_no: Optional[str] = None
+    patient_no: Optional[str] = None
+    patient_name: str
+    report_date: Optional[date] = None
+    age_sex: Optional[str] = None
+    origin_ethe: Optional[str] = None
+    ref_by: Optional[str] = None
+    film_no: Optional[str] = None
+    scan_time: Optional[str] = None
+    report_time: Optional[str] = None
+    tat: Optional[str] = None
+    scan_type: Optional[str] = None
+    doctor_description: Optional[str] = None
+    impression: Optional[str] = None
+    created_at: Optional[datetime] = None
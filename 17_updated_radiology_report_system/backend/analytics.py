@@ -0,0 +1,197 @@
+import re
+from datetime import datetime
+from sqlalchemy import select, update, delete, insert, bindparam, and_, text
+from models import RadiologyReport, ReportDailyStats
+
+# Same day-first order the .docx parser uses for dates
+TIMESTAMP_FORMATS = (
+    "%d/%m/%Y %I:%M %p", "%d/%m/%Y %I:%M:%S %p", "%d/%m/%Y %H:%M", "%d/%m/%Y %H:%M:%S",
+    "%d-%m-%Y %I:%M %p", "%d-%m-%Y %H:%M", "%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M",
+)
+TIME_FORMATS = ("%I:%M %p", "%I:%M:%S %p", "%H:%M", "%H:%M:%S")
+
+# "1 Hr 20 min", "2 hrs", "45 mins", "1h 5m", "90"
+TAT_PART = re.compile(r"(\d+(?:\.\d+)?)\s*(h|hr|hrs|hour|hours|m|min|mins|minute|minutes)?\b", re.IGNORECASE)
+TAT_CLOCK = re.compile(r"^\s*(\d+):(\d{2})\s*$")
+
+# Fields that, when changed, move a report's numbers in the summary table
+ANALYTICS_FIELDS = {"report_date", "scan_type", "scan_time", "report_time", "tat", "ref_by"}
+
+# Columns filled in from the free-text fields whenever a report is written
+DERIVED_COLUMNS = ("scan_at", "report_at", "tat_minutes", "stat_day")
+
+# Fields the derived columns are worked out from
+SOURCE_COLUMNS = ("report_date", "created_at", "scan_time", "report_time", "tat")
+
+table = RadiologyReport.__table__
+stats_table = ReportDailyStats.__table__
+
+
+def parse_tat(text):
+    """Turnaround time in minutes, or None if the text is not understood"""
+    if not text:
+        return None
+    clock = TAT_CLOCK.match(text)
+    if clock:
+        return int(clock.group(1)) * 60 + int(clock.group(2))
+
+    minutes = 0.0
+    found = False
+    for number, unit in TAT_PART.findall(text):
+        found = True
+        if unit.lower().startswith("h"):
+            minutes += float(number) * 60
+        else:
+            minutes += float(number)
+    return minutes if found else None
+
+
+def parse_timestamp(text, report_date=None):
+    """Scan/report time as a datetime; a bare time is taken to be on the report date"""
+    if not text:
+        return None
+    text = " ".join(text.split())
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    if report_date:
+        for fmt in TIME_FORMATS:
+            try:
+                return datetime.combine(report_date, datetime.strptime(text, fmt).time())
+            except ValueError:
+                continue
+    return None
+
+
+def derive(values):
+    """Derived column values for one report, from its free-text fields"""
+    report_date = values.get("report_date")
+    scan_at = parse_timestamp(values.get("scan_time"), report_date)
+    report_at = parse_timestamp(values.get("report_time"), report_date)
+
+    tat_minutes = parse_tat(values.get("tat"))
+    if tat_minutes is None and scan_at and report_at and report_at >= scan_at:
+        tat_minutes = (report_at - scan_at).total_seconds() / 60
+
+    # Reports are counted on their report date, else the day they were scanned or entered
+    created_at = values.get("created_at") or datetime.now()
+    stat_day = report_date or (scan_at.date() if scan_at else created_at.date())
+
+    return {"scan_at": scan_at, "report_at": report_at, "tat_minutes": tat_minutes, "stat_day": stat_day}
+
+
+def stats_key(stat_day, scan_type):
+    return stat_day, scan_type or ""
+
+
+def refresh_reports(db, report_ids):
+    """Recompute the derived columns of these reports; returns their (day, scan_type) keys"""
+    keys = set()
+    if not report_ids:
+        return keys
+
+    rows = db.execute(
+        select(table.c.id, table.c.scan_type, *[table.c[column] for column in SOURCE_COLUMNS])
+        .where(table.c.id.in_(list(report_ids)))
+    ).all()
+
+    params = []
+    for row in rows:
+        values = derive(row._asdict())
+        keys.add(stats_key(values["stat_day"], row.scan_type))
+        params.append({"match_id": row.id, **{f"new_{column}": values[column] for column in DERIVED_COLUMNS}})
+
+    if params:
+        db.execute(
+            update(table)
+            .where(table.c.id == bindparam("match_id"))
+            .values({column: bindparam(f"new_{column}") for column in DERIVED_COLUMNS}),
+            params,
+        )
+    return keys
+
+
+def _percentile(values, pct):
+    """Linear interpolation between closest ranks (same as Postgres percentile_cont)"""
+    position = (len(values) - 1) * pct
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def recompute_stats(db, keys):
+    """Rebuild the summary rows of the given (day, scan_type) keys from their reports.
+    db is a sync Session (async code calls this through run_sync)."""
+    postgres = db.get_bind().dialect.name == "postgresql"
+
+    # Sorted so two transactions always lock keys in the same order
+    for stat_day, scan_type in sorted(key for key in keys if key[0] is not None):
+        if postgres:
+            # Concurrent writes to the same day and scan type take turns, so the
+            # second one re-reads the rows after the first has committed
+            db.execute(
+                text("SELECT pg_advisory_xact_lock(hashtext(:key))"),
+                {"key": f"report_daily_stats:{stat_day}:{scan_type}"},
+            )
+        match_type = table.c.scan_type == scan_type if scan_type else table.c.scan_type.is_(None) | (table.c.scan_type == "")
+        rows = db.execute(
+            select(table.c.tat_minutes, table.c.ref_by)
+            .where(table.c.stat_day == stat_day, match_type)
+        ).all()
+
+        db.execute(delete(stats_table).where(and_(
+            stats_table.c.day == stat_day, stats_table.c.scan_type == scan_type
+        )))
+        if not rows:
+            continue
+
+        tats = sorted(row.tat_minutes for row in rows if row.tat_minutes is not None)
+        referrers = {}
+        for row in rows:
+            name = (row.ref_by or "").strip() or "Unknown"
+            referrers[name] = referrers.get(name, 0) + 1
+
+        db.execute(insert(stats_table).values(
+            day=stat_day,
+            scan_type=scan_type,
+            report_count=len(rows),
+            tat_count=len(tats),
+            tat_mean=sum(tats) / len(tats) if tats else None,
+            tat_p50=_percentile(tats, 0.5) if tats else None,
+            tat_p90=_percentile(tats, 0.9) if tats else None,
+            referrers=referrers,
+            updated_at=datetime.now(),
+        ))
+
+
+def current_keys(db, where):
+    """(day, scan_type) keys of existing reports, read before they are changed or deleted"""
+    rows = db.execute(select(table.c.stat_day, table.c.scan_type).where(where)).all()
+    return {stats_key(row.stat_day, row.scan_type) for row in rows}
+
+
+def update_analytics(db, report_ids, old_keys=()):
+    """Call in the same transaction after reports are written: refresh their derived
+    columns and the summary rows of every day/scan type they were or are now in"""
+    keys = refresh_reports(db, report_ids) | set(old_keys)
+    recompute_stats(db, keys)
+
+
+def rebuild_analytics(db, chunk_size=1000):
+    """Fill the derived columns and summary table for reports written before they existed"""
+    keys = set()
+    last_id = 0
+    while True:
+        ids = db.execute(
+            select(table.c.id)
+            .where(table.c.stat_day.is_(None), table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(chunk_size)
+        ).scalars().all()
+        if not ids:
+            break
+        keys |= refresh_reports(db, ids)
+        last_id = ids[-1]
+    recompute_stats(db, keys)
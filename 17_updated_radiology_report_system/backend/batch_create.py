@@ -0,0 +1,50 @@
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import RadiologyReport
+
+# Batches at least this large are sent with COPY on Postgres (asyncpg)
+COPY_THRESHOLD = 5000
+
+COPY_COLUMNS = [column.name for column in RadiologyReport.__table__.columns if column.name != "id"]
+
+
+async def _insert_rows(db, rows):
+    # Passing the rows as a parameter list lets SQLAlchemy compile the INSERT once
+    # and send it as multi-row VALUES pages ("insertmanyvalues"), with RETURNING
+    # kept in input order
+    table = RadiologyReport.__table__
+    result = await db.execute(
+        insert(table).returning(table.c.id, table.c.serial_number, sort_by_parameter_order=True),
+        rows,
+    )
+    return result.all()
+
+
+async def _copy_rows(db, rows):
+    # COPY returns nothing, so the new ids are read back by serial number
+    connection = await db.connection()
+    # The asyncpg adapter opens its transaction on the first statement; run one
+    # so the COPY is part of it and rolls back with the rest on failure
+    await connection.execute(text("SELECT 1"))
+    raw = await connection.get_raw_connection()
+    records = [tuple(row.get(column) for column in COPY_COLUMNS) for row in rows]
+    await raw.driver_connection.copy_records_to_table(
+        RadiologyReport.__tablename__, records=records, columns=COPY_COLUMNS
+    )
+
+    serials = [row["serial_number"] for row in rows]
+    result = await db.execute(
+        select(RadiologyReport.id, RadiologyReport.serial_number)
+        .where(RadiologyReport.serial_number.in_(serials))
+    )
+    ids = dict((serial, report_id) for report_id, serial in result.all())
+    return [(ids[serial], serial) for serial in serials]
+
+
+async def insert_reports(db: AsyncSession, rows):
+    """Insert many new reports in the session's transaction; returns [(id, serial_number)] in input order.
+    The caller commits."""
+    if len(rows) >= COPY_THRESHOLD and db.bind.dialect.driver == "asyncpg":
+        return await _copy_rows(db, rows)
+
+    return [(report_id, serial) for report_id, serial in await _insert_rows(db, rows)]
@@ -0,0 +1,124 @@
+"""
+Benchmark: sync routes (threadpool + SessionLocal) vs the async routes (AsyncSession)
+for list, get-by-serial and create, at the same concurrency.
+Run from the backend folder (uses DATABASE_URL like the app):
+    python bench_async.py --concurrency 200 --seconds 10
+Each app is started in its own uvicorn process with one worker.
+"""
+
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+from fastapi import FastAPI, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+import httpx
+from database import SessionLocal, engine
+from models import Base, RadiologyReport
+from serials import generate_serial_number
+from routes import ReportCreate, SUMMARY_COLUMNS
+
+# The old way: plain def routes on the sync session, run in Starlette's threadpool
+sync_app = FastAPI()
+
+
+def get_sync_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@sync_app.get("/api/reports")
+def sync_list(limit: int = Query(50, ge=1, le=200), db: Session = Depends(get_sync_db)):
+    rows = db.query(*SUMMARY_COLUMNS).order_by(
+        RadiologyReport.created_at.desc(), RadiologyReport.id.desc()
+    ).limit(limit).all()
+    return {"items": [{"id": row.id, "serial_number": row.serial_number} for row in rows]}
+
+
+@sync_app.get("/api/reports/serial/{serial_number}")
+def sync_get(serial_number: str, db: Session = Depends(get_sync_db)):
+    report = db.query(RadiologyReport).filter(RadiologyReport.serial_number == serial_number).first()
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found")
+    return {"id": report.id, "serial_number": report.serial_number, "patient_name": report.patient_name}
+
+
+@sync_app.post("/api/reports")
+def sync_create(report: ReportCreate, db: Session = Depends(get_sync_db)):
+    new_report = RadiologyReport(**report.dict(), serial_number=generate_serial_number())
+    db.add(new_report)
+    db.commit()
+    return {"id": new_report.id, "serial_number": new_report.serial_number}
+
+
+async def worker(client, method, url, end, counts, payload=None):
+    while time.perf_counter() < end:
+        response = await client.request(method, url, json=payload)
+        key = "ok" if response.status_code < 400 else str(response.status_code)
+        counts[key] = counts.get(key, 0) + 1
+
+
+async def run_case(base_url, method, url, args, payload=None):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        counts = {}
+        start = time.perf_counter()
+        end = start + args.seconds
+        await asyncio.gather(*[
+            worker(client, method, url, end, counts, payload) for _ in range(args.concurrency)
+        ])
+        return counts, time.perf_counter() - start
+
+
+async def wait_ready(base_url):
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        for _ in range(100):
+            try:
+                await client.get("/api/reports?limit=1")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"Server at {base_url} did not start")
+
+
+async def bench_app(name, target, port, args):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", target, "--port", str(port), "--log-level", "warning"]
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        await wait_ready(base_url)
+        async with httpx.AsyncClient(base_url=base_url) as client:
+            created = await client.post("/api/reports", json={"patient_name": "Benchmark Patient"})
+            serial = created.json()["serial_number"]
+
+        cases = (
+            ("list", "GET", "/api/reports?limit=50", None),
+            ("get-by-serial", "GET", f"/api/reports/serial/{serial}", None),
+            ("create", "POST", "/api/reports", {"patient_name": "Benchmark Patient", "scan_type": "CT"}),
+        )
+        for case, method, url, payload in cases:
+            counts, elapsed = await run_case(base_url, method, url, args, payload)
+            total = sum(counts.values())
+            print(f"{name:<6} {case:<14} {total / elapsed:8.1f} req/s  {counts}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+async def main(args):
+    Base.metadata.create_all(bind=engine)
+    await bench_app("sync", "bench_async:sync_app", args.port, args)
+    await bench_app("async", "main:app", args.port + 1, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8100)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,75 @@
+"""
+Benchmark: creating reports one request at a time vs POST /reports/batch
+Runs in-process against DATABASE_URL, or against a running server:
+    python bench_batch_create.py --sizes 1000 10000 --concurrency 10
+    python bench_batch_create.py --url http://localhost:8000/api
+"""
+
+import argparse
+import asyncio
+import time
+import httpx
+
+
+def sample_reports(count):
+    return [
+        {
+            "patient_name": f"Batch Patient {n}",
+            "uhid": f"UH{n:06d}",
+            "scan_type": "CT" if n % 2 else "MRI",
+            "ref_by": "Dr Benchmark",
+            "impression": "No acute abnormality.",
+        }
+        for n in range(count)
+    ]
+
+
+async def one_by_one(client, reports, concurrency):
+    queue = list(reversed(reports))
+
+    async def worker():
+        while queue:
+            response = await client.post("/reports", json=queue.pop())
+            response.raise_for_status()
+
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+
+
+async def batched(client, reports):
+    response = await client.post("/reports/batch", json=reports)
+    response.raise_for_status()
+    assert response.json()["count"] == len(reports)
+
+
+async def main(args):
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=600)
+    else:
+        from main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench/api", timeout=600)
+
+    async with client:
+        for size in args.sizes:
+            reports = sample_reports(size)
+
+            start = time.perf_counter()
+            await one_by_one(client, reports, args.concurrency)
+            loop_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            await batched(client, reports)
+            batch_seconds = time.perf_counter() - start
+
+            print(
+                f"{size:>6} rows  one-by-one {loop_seconds:8.2f}s ({size / loop_seconds:8.0f} rows/s)  "
+                f"batch {batch_seconds:6.2f}s ({size / batch_seconds:8.0f} rows/s)  "
+                f"x{loop_seconds / batch_seconds:.1f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="Running server, e.g. http://localhost:8000/api")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--concurrency", type=int, default=10, help="Parallel requests for the one-by-one run")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,195 @@
+"""
+Benchmark: reading uploaded reports with python-docx (docx_parser) vs the streaming
+reader (docx_stream). First checks that both give the same fields for exported files
+and for documents edited in Word-like ways (merged cells, breaks, tabs, hyperlinks),
+then times both on large multi-page documents and measures their peak memory.
+Run from the backend folder:  python bench_docx_stream.py --pages 50 --count 20
+"""
+
+import argparse
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+from io import BytesIO
+from types import SimpleNamespace
+from docx import Document
+from docx.enum.text import WD_BREAK
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+from word_export import create_table_format, render_table_format
+from docx_parser import parse_report_docx
+from docx_stream import extract_report
+
+# Findings paragraphs that fill roughly one page
+PARAGRAPHS_PER_PAGE = 12
+
+
+def sample_report(i, lines=8):
+    findings = "\n".join(
+        f"Line {n}: lesion of {random.randint(2, 40)} mm <segment {n}> & surrounding tissue"
+        for n in range(lines)
+    )
+    return SimpleNamespace(
+        uhid=f"UH{i:06d}", patient_no=f"P{i}", sl_no=str(i), reg_no=f"REG-{i}",
+        patient_name=f"Patient {i} O'Brien & Sons", age_sex="45/M",
+        report_date=date(2026, 1, 1 + i % 28), origin_ethe="OPD", ref_by="Dr. Khan",
+        film_no=f"F{i}", scan_time="10:15", report_time="11:05", tat="50 min",
+        scan_type=random.choice(["CT Brain", "MRI Spine", "X-Ray Chest", None]),
+        doctor_description=findings if i % 5 else None,
+        impression="No acute abnormality.\tFollow up in 6 weeks." if i % 7 else "",
+    )
+
+
+def save(document):
+    output = BytesIO()
+    document.save(output)
+    return output.getvalue()
+
+
+def long_report(i, pages):
+    """An exported report whose findings were typed out over many pages in Word"""
+    document = Document(BytesIO(render_table_format(sample_report(i))))
+    impression = next(p for p in document.paragraphs if p.text.startswith("Impression:"))
+    for n in range(pages * PARAGRAPHS_PER_PAGE):
+        paragraph = impression.insert_paragraph_before(
+            f"{n}. The {random.choice(['left', 'right'])} lobe shows a {random.randint(2, 40)} mm "
+            "hypodense lesion with smooth margins, no calcification and no mass effect on "
+            "adjacent structures; correlate clinically and with prior imaging."
+        )
+        if n % PARAGRAPHS_PER_PAGE == PARAGRAPHS_PER_PAGE - 1:
+            paragraph.add_run().add_break(WD_BREAK.PAGE)
+    return save(document)
+
+
+def edited_document():
+    """Things Word produces that the exporter never does"""
+    document = Document()
+    table = document.add_table(rows=4, cols=4)
+    labels = [("UHID:", "UH42", "Sl No:", "7"), ("Patient Name:", "", "", ""),
+              ("Reg No:", "REG-9", "Age/Sex:", "30/F"), ("Film No:", "", "TAT:", "40 min")]
+    for row, values in zip(table.rows, labels):
+        for cell, value in zip(row.cells, values):
+            cell.text = value
+    # Name spread over three grid columns, Reg No merged down into the next row
+    name = table.cell(1, 1).merge(table.cell(1, 3))
+    name.text = "Jane\tDoe"
+    table.cell(2, 1).merge(table.cell(3, 1))
+    table.cell(0, 3).add_paragraph("second line")
+    # A table nested in a cell is not part of the cell text
+    table.cell(3, 2).add_table(rows=1, cols=2).cell(0, 0).text = "nested"
+    document.add_table(rows=1, cols=2).cell(0, 0).text = "Only the first table is read:"
+
+    document.add_paragraph("CT ABDOMEN")
+    document.add_paragraph("Findings:")
+    paragraph = document.add_paragraph("Liver\tnormal")
+    paragraph.add_run().add_break()
+    paragraph.add_run("spleen normal")
+    paragraph.add_run().add_break(WD_BREAK.PAGE)
+    paragraph.add_run("kidneys normal")
+    document.add_paragraph("   ")
+    link = document.add_paragraph("See ")
+    link._p.append(parse_xml(
+        f'<w:hyperlink {nsdecls("w", "r")} r:id="rId99"><w:r><w:t xml:space="preserve">prior study </w:t>'
+        "</w:r><w:r><w:noBreakHyphen/><w:t>2024</w:t></w:r></w:hyperlink>"
+    ))
+    document.add_paragraph("Impression:")
+    document.add_paragraph("Normal study.")
+    return save(document)
+
+
+def check_conformance(reports):
+    """The streaming reader must read back exactly what python-docx reads"""
+    documents = []
+    for report in reports:
+        documents.append((f"create_table_format {report.uhid}", create_table_format(report).getvalue()))
+        documents.append((f"render_table_format {report.uhid}", render_table_format(report)))
+    documents.append(("edited in Word", edited_document()))
+    documents.append(("multi-page", long_report(0, 5)))
+
+    for name, content in documents:
+        expected = parse_report_docx(content)
+        actual = extract_report(content)
+        if expected != actual:
+            raise SystemExit(f"Fields differ for {name}:\n{expected}\n{actual}")
+    print(f"Conformance: {len(documents)} documents read back identically")
+
+
+PARSERS = {"python-docx": parse_report_docx, "streaming": extract_report}
+
+
+def peak_rss():
+    """Peak RSS of this process in KiB. ru_maxrss would also count the parent's
+    memory, carried over into a child process on Linux, so VmHWM is used when present."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def peak_growth(parser_name, path):
+    """Growth of peak RSS while parsing one file, in a fresh process. tracemalloc
+    would miss python-docx's lxml tree, which lives outside the Python heap."""
+    output = subprocess.run(
+        [sys.executable, __file__, "--peak-of", parser_name, path],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return int(output) / 1024
+
+
+def measure(name, documents, path):
+    parse = PARSERS[name]
+    parse(documents[0])  # warm up
+    start = time.perf_counter()
+    for content in documents:
+        parse(content)
+    elapsed = time.perf_counter() - start
+
+    megabytes = sum(len(content) for content in documents) / 1024 / 1024
+    print(
+        f"{name:<12} {len(documents) / elapsed:8.1f} docs/s  {megabytes / elapsed:6.2f} MiB/s  "
+        f"({elapsed * 1000 / len(documents):.1f} ms each)  peak RSS +{peak_growth(name, path):6.1f} MiB"
+    )
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=50, help="Pages of findings per document")
+    parser.add_argument("--count", type=int, default=20, help="Documents timed")
+    parser.add_argument("--peak-of", nargs=2, metavar=("PARSER", "FILE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.peak_of:
+        # Child process of peak_growth(): print the peak RSS growth in KiB
+        name, path = args.peak_of
+        before = peak_rss()
+        PARSERS[name](path)
+        print(peak_rss() - before)
+        raise SystemExit
+
+    random.seed(1)
+    check_conformance([sample_report(i) for i in range(50)])
+
+    base = long_report(1, args.pages)
+    documents = [base] * args.count
+    size = len(base) / 1024
+    print(f"{args.count} documents of {args.pages} pages ({size:.0f} KiB each)")
+
+    fd, path = tempfile.mkstemp(suffix=".docx")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(base)
+        before = measure("python-docx", documents, path)
+        after = measure("streaming", documents, path)
+    finally:
+        os.remove(path)
+    print(f"Speed-up: {before / after:.1f}x")
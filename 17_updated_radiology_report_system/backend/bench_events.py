@@ -0,0 +1,175 @@
+"""
+Benchmark: live report events (GET /api/reports/events) on one uvicorn worker.
+Opens many idle event streams and reports the server's memory per connection,
+then times how long a report update takes to reach every client, and finally
+floods events at clients that never read to show their buffers stay bounded.
+Run from the backend folder (uses DATABASE_URL like the app):
+    python bench_events.py --clients 3000 --updates 50
+"""
+
+import argparse
+import asyncio
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+import httpx
+from loadtest import percentile
+from config import EVENTS_CLIENT_BUFFER
+
+REQUEST = b"GET /api/reports/events HTTP/1.1\r\nHost: bench\r\nAccept: text/event-stream\r\n\r\n"
+
+
+def server_memory(pid):
+    """Current RSS of the server process in KiB"""
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+
+
+async def open_stream(port, receive_buffer=None):
+    sock = socket.socket()
+    if receive_buffer:
+        # A client that stops reading; a small window makes the server's side fill up sooner
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer)
+    sock.setblocking(False)
+    await asyncio.get_running_loop().sock_connect(sock, ("127.0.0.1", port))
+    reader, writer = await asyncio.open_connection(sock=sock)
+    writer.write(REQUEST)
+    await reader.readuntil(b"\r\n\r\n")
+    return reader, writer
+
+
+async def read_events(reader, arrivals, counts):
+    """Record the arrival time of each event frame"""
+    try:
+        while True:
+            # The body is chunked, so a frame can come after a chunk size line
+            frame = await reader.readuntil(b"\n\n")
+            start = frame.find(b"event: ")
+            if start >= 0:
+                event_type = frame[start + 7:frame.index(b"\n", start)].decode()
+                counts[event_type] = counts.get(event_type, 0) + 1
+                if event_type == "updated":
+                    arrivals.append(time.perf_counter())
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+
+
+async def wait_ready(base_url):
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        for _ in range(200):
+            try:
+                await client.get("/")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"Server at {base_url} did not start")
+
+
+async def main(args):
+    base_url = f"http://127.0.0.1:{args.port}"
+    env = dict(os.environ, EVENTS_MAX_CLIENTS=str(args.clients + args.slow + 10))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"], env=env
+    )
+    try:
+        await wait_ready(base_url)
+        async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+            serial = (await client.post("/api/reports", json={"patient_name": "Events Benchmark"})).json()["serial_number"]
+
+            # Idle connections
+            before = server_memory(server.pid)
+            start = time.perf_counter()
+            streams = [await open_stream(args.port) for _ in range(args.clients)]
+            opened = time.perf_counter() - start
+            after = server_memory(server.pid)
+            print(
+                f"{args.clients} idle streams opened in {opened:.1f} s; server RSS "
+                f"{before / 1024:.0f} -> {after / 1024:.0f} MiB ({(after - before) / args.clients:.1f} KiB per stream)"
+            )
+
+            # Fan-out: one update, time until every client has the event
+            arrivals = [[] for _ in streams]
+            counts = {}
+            readers = [asyncio.create_task(read_events(reader, arrivals[i], counts)) for i, (reader, _) in enumerate(streams)]
+            sent = []
+            for n in range(args.updates):
+                sent.append(time.perf_counter())
+                await client.patch(f"/api/reports/serial/{serial}", json={"ref_by": f"Dr. {n}"})
+                await asyncio.sleep(args.interval)
+            await asyncio.sleep(2)
+
+            firsts, lasts = [], []
+            for n, sent_at in enumerate(sent):
+                received = [times[n] - sent_at for times in arrivals if len(times) > n]
+                if received:
+                    firsts.append(min(received))
+                    lasts.append(max(received))
+            delivered = sum(len(times) for times in arrivals)
+            print(
+                f"{args.updates} updates -> {delivered} of {args.updates * args.clients} events delivered; "
+                f"first client p50 {percentile(sorted(firsts), 50) * 1000:.1f} ms, "
+                f"last client p50 {percentile(sorted(lasts), 50) * 1000:.1f} ms "
+                f"p99 {percentile(sorted(lasts), 99) * 1000:.1f} ms"
+            )
+
+            for task in readers:
+                task.cancel()
+            for _, writer in streams:
+                writer.close()
+            await asyncio.sleep(1)
+
+            # Slow consumers: connected, never read, while a flood of events goes out
+            # (batch creates small enough to be sent as one event per report); one
+            # client keeps reading
+            slow = [await open_stream(args.port, receive_buffer=4096) for _ in range(args.slow)]
+            reader, writer = await open_stream(args.port)
+            counts = {}
+            reading = asyncio.create_task(read_events(reader, [], counts))
+            before = server_memory(server.pid)
+            for _ in range(args.flood // EVENTS_CLIENT_BUFFER):
+                await client.post("/api/reports/batch", json=[{"patient_name": "Flood"}] * EVENTS_CLIENT_BUFFER)
+            await asyncio.sleep(2)
+            after = server_memory(server.pid)
+            print(
+                f"{args.flood // EVENTS_CLIENT_BUFFER * EVENTS_CLIENT_BUFFER} events at {args.slow} clients that never read: server RSS "
+                f"{before / 1024:.0f} -> {after / 1024:.0f} MiB; the reading client got "
+                f"{counts.get('created', 0)} created, {counts.get('reset', 0)} reset"
+            )
+            reading.cancel()
+            writer.close()
+
+            # What a slow client finds when it finally reads: what was already in
+            # the socket buffers, then a reset in place of the rest
+            slow_counts = {}
+            try:
+                await asyncio.wait_for(read_events(slow[0][0], [], slow_counts), 3)
+            except asyncio.TimeoutError:
+                pass
+            print(f"a slow client catching up gets {slow_counts.get('created', 0)} created, {slow_counts.get('reset', 0)} reset")
+
+            for _, writer in slow:
+                writer.close()
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=3000, help="Idle event streams held open")
+    parser.add_argument("--updates", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=0.1, help="Seconds between updates")
+    parser.add_argument("--slow", type=int, default=50, help="Clients that never read")
+    parser.add_argument("--flood", type=int, default=100000, help="Events sent at the slow clients")
+    parser.add_argument("--port", type=int, default=8120)
+    args = parser.parse_args()
+
+    # Each stream is a file descriptor on both ends
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    asyncio.run(main(args))
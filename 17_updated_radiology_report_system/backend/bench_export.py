@@ -0,0 +1,62 @@
+"""
+Benchmark: python-docx export vs the compiled .docx template
+Run from the backend folder:  python bench_export.py --count 300
+"""
+
+import argparse
+import random
+import time
+from datetime import date
+from types import SimpleNamespace
+from word_export import create_table_format, render_table_format
+from docx_parser import parse_report_docx
+
+
+def sample_report(i):
+    findings = "\n".join(
+        f"Line {n}: lesion of {random.randint(2, 40)} mm <segment {n}> & surrounding tissue"
+        for n in range(random.randint(3, 15))
+    )
+    return SimpleNamespace(
+        uhid=f"UH{i:06d}", patient_no=f"P{i}", sl_no=str(i), reg_no=f"REG-{i}",
+        patient_name=f"Patient {i} O'Brien & Sons", age_sex="45/M",
+        report_date=date(2026, 1, 1 + i % 28), origin_ethe="OPD", ref_by="Dr. Khan",
+        film_no=f"F{i}", scan_time="10:15", report_time="11:05", tat="50 min",
+        scan_type=random.choice(["CT Brain", "MRI Spine", "X-Ray Chest", None]),
+        doctor_description=findings if i % 5 else None,
+        impression="No acute abnormality.\tFollow up in 6 weeks." if i % 7 else "",
+    )
+
+
+def check_compatible(reports):
+    """Both renderers must give the same fields back through the upload parser"""
+    for report in reports:
+        expected = parse_report_docx(create_table_format(report).getvalue())
+        actual = parse_report_docx(render_table_format(report))
+        if expected != actual:
+            raise SystemExit(f"Output differs for {report.uhid}:\n{expected}\n{actual}")
+    print(f"Compatibility: {len(reports)} reports parse back identically")
+
+
+def measure(name, render, reports):
+    start = time.perf_counter()
+    for report in reports:
+        render(report)
+    elapsed = time.perf_counter() - start
+    rate = len(reports) / elapsed
+    print(f"{name:<22} {rate:10.1f} renders/s  ({elapsed * 1000 / len(reports):.2f} ms each)")
+    return rate
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=300)
+    args = parser.parse_args()
+
+    random.seed(1)
+    reports = [sample_report(i) for i in range(args.count)]
+    check_compatible(reports[:50])
+
+    before = measure("create_table_format", lambda r: create_table_format(r).getvalue(), reports)
+    after = measure("compiled template", render_table_format, reports)
+    print(f"Speed-up: {after / before:.1f}x")
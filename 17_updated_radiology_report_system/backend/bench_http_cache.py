@@ -0,0 +1,121 @@
+"""
+Benchmark: bytes on the wire and CPU per request for the JSON API with the
+compression / conditional GET middleware (http_cache.py).
+For each endpoint, a first visit without compression, with gzip and with brotli,
+and a repeat visit that sends If-None-Match, are timed in-process (CPU time, the
+database included) and their response sizes (headers + body) compared. Then the
+middleware's own work on the same bodies is timed at several compression levels.
+Run from the backend folder (uses DATABASE_URL like the app):
+    python bench_http_cache.py --reports 500 --repeat 200
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import random
+import time
+import httpx
+from http_cache import COMPRESS_MIN_BYTES, GZIP_LEVEL, BROTLI_QUALITY, brotli
+from main import app
+
+ENDPOINTS = (
+    ("list, 50 rows", "/api/reports?limit=50"),
+    ("list, 200 rows", "/api/reports?limit=200"),
+    ("search", "/api/reports/search?q=lesion&limit=20"),
+    ("analytics", "/api/analytics"),
+    ("qr-config", "/api/qr-config"),
+)
+
+VARIANTS = (
+    ("identity", {"Accept-Encoding": "identity"}),
+    ("gzip", {"Accept-Encoding": "gzip"}),
+    ("br", {"Accept-Encoding": "gzip, deflate, br"}),
+    ("304", None),
+)
+
+SCANS = ("CT Brain", "MRI Spine", "X-Ray Chest", "CT Abdomen", "Ultrasound Pelvis")
+
+
+def wire_size(response):
+    """Status line, headers and body as sent (HTTP/1.1)"""
+    headers = sum(len(name) + len(value) + 4 for name, value in response.headers.raw)
+    return len("HTTP/1.1 200 OK\r\n") + headers + 2 + response.num_bytes_downloaded
+
+
+async def seed(client, count):
+    rng = random.Random(1)
+    reports = [
+        {
+            "uhid": f"UH{i:06d}", "patient_no": f"P-{i}", "reg_no": f"REG-{i}",
+            "patient_name": f"Patient {rng.choice(['Khan', 'Ahmed', 'Malik', 'Raza'])} {i}",
+            "age_sex": f"{rng.randint(1, 90)}/{rng.choice('MF')}", "scan_type": rng.choice(SCANS),
+            "doctor_description": f"A {rng.randint(2, 40)} mm lesion in segment {rng.randint(1, 8)}.",
+            "impression": "No acute abnormality.",
+        }
+        for i in range(count)
+    ]
+    for start in range(0, count, 1000):
+        response = await client.post("/api/reports/batch", json=reports[start:start + 1000])
+        response.raise_for_status()
+
+
+async def time_variant(client, url, headers, repeat):
+    start = time.process_time()
+    for _ in range(repeat):
+        response = await client.get(url, headers=headers)
+    return (time.process_time() - start) / repeat, response
+
+
+async def bench_endpoints(client, repeat):
+    print(f"{'endpoint':<16} {'variant':<9} {'status':>6} {'bytes':>8} {'CPU/request':>12}")
+    for name, url in ENDPOINTS:
+        etag = (await client.get(url)).headers.get("etag")
+        for variant, headers in VARIANTS:
+            if headers is None:
+                headers = {"Accept-Encoding": "gzip, deflate, br", "If-None-Match": etag}
+            cpu, response = await time_variant(client, url, headers, repeat)
+            print(f"{name:<16} {variant:<9} {response.status_code:>6} {wire_size(response):>8} {cpu * 1000:>9.3f} ms")
+
+
+def time_call(fn, repeat):
+    start = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - start) / repeat
+
+
+async def bench_middleware_work(client, repeat):
+    """What the middleware adds per response: the ETag hash and the compression"""
+    print(f"\nmiddleware work per response (threshold {COMPRESS_MIN_BYTES} bytes; "
+          f"defaults gzip {GZIP_LEVEL}, brotli {BROTLI_QUALITY})")
+    for name, url in ENDPOINTS[:2]:
+        body = (await client.get(url, headers={"Accept-Encoding": "identity"})).content
+        print(f"{name}: {len(body)} bytes")
+        print(f"  {'sha1 ETag':<12} {time_call(lambda: hashlib.sha1(body).hexdigest(), repeat) * 1000:8.3f} ms")
+        for level in (1, 6, 9):
+            size = len(gzip.compress(body, compresslevel=level, mtime=0))
+            cpu = time_call(lambda: gzip.compress(body, compresslevel=level, mtime=0), repeat)
+            print(f"  {'gzip ' + str(level):<12} {cpu * 1000:8.3f} ms  {size:>7} bytes")
+        # Brotli is optional, as in the app
+        for quality in (1, 4, 6, 11) if brotli is not None else ():
+            size = len(brotli.compress(body, quality=quality))
+            cpu = time_call(lambda: brotli.compress(body, quality=quality), max(1, repeat // 10) if quality > 9 else repeat)
+            print(f"  {'brotli ' + str(quality):<12} {cpu * 1000:8.3f} ms  {size:>7} bytes")
+
+
+async def main(args):
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            if not (await client.get("/api/reports?limit=1")).json()["items"]:
+                await seed(client, args.reports)
+            await bench_endpoints(client, args.repeat)
+            await bench_middleware_work(client, args.repeat)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reports", type=int, default=500, help="Reports seeded into an empty database")
+    parser.add_argument("--repeat", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,110 @@
+"""
+Benchmark: patient timeline and patient lookup latency as the table grows.
+Seeds synthetic reports into DATABASE_URL (only those still missing), then times
+each query and prints the plan the database chose for it:
+    DATABASE_URL=sqlite:///bench.db python bench_patients.py --reports 1000000
+On SQLite the close-match step of a lookup is a substring scan (like the search
+fallback), so only the timeline and prefix numbers say anything about Postgres.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from datetime import date, datetime, timedelta
+from sqlalchemy import insert, select, func, text
+from database import engine, async_engine, AsyncSessionLocal
+from models import Base, RadiologyReport
+from migrations import apply_migrations
+from patients import patient_timeline, lookup_patients, prefix_query, LOOKUP_FIELDS
+from loadtest import percentile
+
+FIRST_NAMES = ("Mohammed", "Ayesha", "Imran", "Fatima", "Bilal", "Sana", "Usman", "Hina")
+LAST_NAMES = ("Khan", "Ahmed", "Malik", "Hussain", "Qureshi", "Siddiqui", "Raza", "Butt")
+
+
+def seed(count, patients, batch=20000):
+    with engine.begin() as conn:
+        existing = conn.execute(select(func.count()).select_from(RadiologyReport)).scalar()
+        for start in range(existing, count, batch):
+            rows = []
+            for n in range(start, min(count, start + batch)):
+                patient = n % patients
+                day = date(2015, 1, 1) + timedelta(days=n * 7 % 3650)
+                rows.append({
+                    "serial_number": f"RAD-BENCH-{n:09d}",
+                    "uhid": f"UH{patient:08d}",
+                    "patient_no": f"P-{patient}",
+                    "reg_no": f"REG-{n}",
+                    "patient_name": f"{FIRST_NAMES[patient % 8]} {LAST_NAMES[patient // 8 % 8]} {patient}",
+                    "report_date": day,
+                    "stat_day": day,
+                    "scan_type": "CT",
+                    "created_at": datetime(2024, 1, 1) + timedelta(seconds=n),
+                })
+            conn.execute(insert(RadiologyReport), rows)
+            print(f"  seeded {start + len(rows)} reports", end="\r")
+    print()
+
+
+async def explain(db, statement):
+    prefix = "EXPLAIN QUERY PLAN " if db.bind.dialect.name == "sqlite" else "EXPLAIN "
+    compiled = statement.compile(dialect=db.bind.dialect, compile_kwargs={"literal_binds": True})
+    rows = (await db.execute(text(prefix + str(compiled)))).all()
+    return "\n".join("    " + str(row[-1]) for row in rows)
+
+
+async def timeit(name, run, repeat):
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await run()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    print(
+        f"{name:<34} p50 {percentile(latencies, 50) * 1000:7.2f} ms  "
+        f"p99 {percentile(latencies, 99) * 1000:7.2f} ms"
+    )
+
+
+async def main(args):
+    rng = random.Random(1)
+    async with AsyncSessionLocal() as db:
+        async def timeline_first_page():
+            await patient_timeline(db, f"UH{rng.randrange(args.patients):08d}", 50)
+
+        async def timeline_later_page():
+            await patient_timeline(db, f"UH{rng.randrange(args.patients):08d}", 50, (date(2020, 1, 1), 10 ** 9))
+
+        def lookup(q, fields=list(LOOKUP_FIELDS)):
+            async def run():
+                await lookup_patients(db, q() if callable(q) else q, fields, 10)
+            return run
+
+        await timeit("timeline, first page", timeline_first_page, args.repeat)
+        await timeit("timeline, page after a cursor", timeline_later_page, args.repeat)
+        await timeit("lookup patient_no prefix", lookup(lambda: f"P-{rng.randrange(args.patients)}", ["patient_no"]), args.repeat)
+        await timeit("lookup reg_no prefix (1 char)", lookup("R", ["reg_no"]), args.repeat)
+        await timeit("lookup name prefix", lookup("Ayesha Kh", ["patient_name"]), args.repeat)
+        await timeit("lookup name, misspelt (all fields)", lookup("Ayeshaa Qureshy"), args.repeat)
+
+        uhid = f"UH{args.patients // 2:08d}"
+        query = select(RadiologyReport.id).where(RadiologyReport.uhid == uhid).order_by(
+            RadiologyReport.stat_day.desc(), RadiologyReport.id.desc()).limit(51)
+        print("\nplan, timeline:\n" + await explain(db, query))
+        query = prefix_query(db.bind.dialect, "patient_name", "Ayesha Kh", 10)
+        print("plan, name prefix:\n" + await explain(db, query))
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reports", type=int, default=1000000)
+    parser.add_argument("--patients", type=int, default=100000, help="Distinct uhids among the reports")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    apply_migrations()
+    seed(args.reports, args.patients)
+    asyncio.run(main(args))
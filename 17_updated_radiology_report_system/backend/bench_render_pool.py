@@ -0,0 +1,170 @@
+"""
+Benchmark: list-endpoint latency while exports and QR images are being rendered,
+with rendering in the app's thread pool (RENDER_PROCESSES=0) vs the render process pool.
+Each setting runs its own uvicorn process (one worker) against DATABASE_URL:
+    python bench_render_pool.py --seconds 10 --reports 2000 --list-rate 50 --max-p99-ratio 5
+The goal is a list p99 close to its idle value with the process pool, and 503 instead
+of waiting for requests beyond the render queue; --max-p99-ratio makes the script exit 1
+when that is not met. On a single CPU (this script, the API and the render processes
+sharing one core), with RENDER_SCHED_IDLE=1:
+    thread pool    list p99 idle 9.2 ms, rendering 2234 ms, 66 renders/s
+    process pool   list p99 idle 5-7 ms, rendering 12-23 ms, 70-74 renders/s, about 80 503s
+Use --list-rate: back-to-back list clients (--list-clients) keep a single core busy on
+their own, and SCHED_IDLE then leaves the renders almost no CPU.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+from loadtest import synthetic_report, percentile
+
+
+async def wait_ready(client):
+    for _ in range(200):
+        try:
+            await client.get("/api/reports?limit=1")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("Server did not start")
+
+
+async def list_request(client, latencies):
+    start = time.perf_counter()
+    try:
+        response = await client.get("/api/reports?limit=50")
+        response.raise_for_status()
+    except httpx.HTTPError:
+        # A failed request counts as infinitely slow
+        latencies.append(float("inf"))
+        return
+    latencies.append(time.perf_counter() - start)
+
+
+async def list_worker(client, end, latencies):
+    while time.perf_counter() < end:
+        await list_request(client, latencies)
+
+
+async def list_at_rate(client, end, latencies, rate):
+    """List requests sent on a fixed schedule, whether or not earlier ones have
+    finished (a slow server does not slow the arrivals down)"""
+    tasks = []
+    next_at = time.perf_counter()
+    while next_at < end:
+        await asyncio.sleep(max(0, next_at - time.perf_counter()))
+        tasks.append(asyncio.create_task(list_request(client, latencies)))
+        next_at += 1 / rate
+    await asyncio.gather(*tasks)
+
+
+def list_load(client, end, latencies, args):
+    if args.list_rate:
+        return [list_at_rate(client, end, latencies, args.list_rate)]
+    return [list_worker(client, end, latencies) for _ in range(args.list_clients)]
+
+
+async def flood_worker(client, end, targets, counts):
+    # Every request is for a report not rendered before, so none is a cache hit
+    while time.perf_counter() < end and targets:
+        report_id, serial = targets.pop()
+        url = f"/api/reports/{report_id}/export" if report_id % 4 == 0 else f"/api/reports/serial/{serial}/qr"
+        response = await client.get(url)
+        key = str(response.status_code)
+        counts[key] = counts.get(key, 0) + 1
+        if response.status_code == 503:
+            # As a well-behaved client would (with jitter, so rejected clients do
+            # not all come back at once); the report is tried again after the wait
+            targets.append((report_id, serial))
+            await asyncio.sleep(float(response.headers.get("retry-after", 1)) * random.uniform(0.5, 1.5))
+
+
+def describe(latencies):
+    latencies = sorted(latencies)
+    return (
+        f"{len(latencies):6} requests  p50 {percentile(latencies, 50) * 1000:7.1f} ms  "
+        f"p99 {percentile(latencies, 99) * 1000:7.1f} ms"
+    )
+
+
+async def bench(name, render_processes, port, args):
+    env = dict(
+        os.environ,
+        RENDER_PROCESSES=str(render_processes),
+        RENDER_QUEUE=str(args.render_queue),
+        EXPORT_CACHE_DIR=tempfile.mkdtemp(prefix="bench-exports-"),
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"], env=env
+    )
+    limits = httpx.Limits(max_connections=args.flood + args.list_clients + 4)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=120, limits=limits) as client:
+            await wait_ready(client)
+            response = await client.post("/api/reports/batch", json=[synthetic_report(n) for n in range(args.reports)])
+            response.raise_for_status()
+            targets = [(item["id"], item["serial_number"]) for item in response.json()["reports"]]
+
+            # List requests alone
+            idle = []
+            end = time.perf_counter() + args.seconds
+            await asyncio.gather(*list_load(client, end, idle, args))
+
+            # Same list requests while exports and QR images are rendered flat out
+            # (measured once the export clients have all arrived)
+            busy = []
+            counts = {}
+            start = time.perf_counter()
+            end = start + args.warmup + args.seconds
+            flood = [asyncio.create_task(flood_worker(client, end, targets, counts)) for _ in range(args.flood)]
+            await asyncio.sleep(args.warmup)
+            await asyncio.gather(*list_load(client, end, busy, args), *flood)
+            elapsed = time.perf_counter() - start
+
+            rendered = counts.get("200", 0)
+            print(f"{name}")
+            print(f"  list, idle          {describe(idle)}")
+            print(f"  list, rendering     {describe(busy)}")
+            print(f"  export/QR           {rendered / elapsed:6.1f} rendered/s  responses {counts}")
+            return percentile(sorted(idle), 99), percentile(sorted(busy), 99), rendered
+    finally:
+        server.terminate()
+        server.wait()
+
+
+async def main(args):
+    if not args.skip_threads:
+        await bench("thread pool (RENDER_PROCESSES=0)", 0, args.port, args)
+    idle_p99, busy_p99, rendered = await bench(
+        f"process pool (RENDER_PROCESSES={args.render_processes})", args.render_processes, args.port + 1, args
+    )
+    if args.max_p99_ratio:
+        # Pass: list p99 within the allowed factor of idle, and exports still served
+        ok = busy_p99 <= idle_p99 * args.max_p99_ratio and rendered > 0
+        print(f"list p99 rendering/idle {busy_p99 / idle_p99:.1f}x (allowed {args.max_p99_ratio}x): {'PASS' if ok else 'FAIL'}")
+        if not ok:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--reports", type=int, default=3000, help="Reports seeded, each rendered at most once")
+    parser.add_argument("--list-clients", type=int, default=4, help="Clients sending list requests back to back")
+    parser.add_argument("--list-rate", type=float, default=0, help="List requests per second instead (open loop)")
+    parser.add_argument("--flood", type=int, default=32, help="Concurrent export/QR clients")
+    parser.add_argument("--warmup", type=float, default=1, help="Seconds of exports before list latency is measured")
+    parser.add_argument("--render-processes", type=int, default=2)
+    parser.add_argument("--render-queue", type=int, default=16)
+    parser.add_argument("--port", type=int, default=8200)
+    parser.add_argument("--skip-threads", action="store_true", help="Only run the process pool setting")
+    parser.add_argument(
+        "--max-p99-ratio", type=float, default=0, help="Exit 1 if the process pool's list p99 grows more than this"
+    )
+    asyncio.run(main(parser.parse_args()))
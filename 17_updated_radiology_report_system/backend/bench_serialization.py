@@ -0,0 +1,129 @@
+"""
+Benchmark: time and memory to load and serialise a page of reports, per 1,000 reports.
+  before: ORM objects or Row tuples -> hand-built dicts with str() -> jsonable_encoder -> json.dumps
+  after:  Row tuples -> response model (from_attributes) -> JSON bytes in pydantic-core
+Uses an in-memory SQLite database, so it needs no server:
+    python bench_serialization.py --reports 1000 --repeat 20
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+from datetime import datetime, date, timedelta
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, select, insert
+from sqlalchemy.orm import Session
+from models import Base, RadiologyReport
+from routes import SUMMARY_COLUMNS
+from schemas import ReportPage
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def seed(db, count):
+    start = datetime(2024, 1, 1, 8, 0)
+    db.execute(insert(RadiologyReport), [
+        {
+            "serial_number": f"RAD-BENCH-{n:06d}",
+            "uhid": f"UH{n:06d}",
+            "patient_name": f"Benchmark Patient {n}",
+            "patient_no": f"P-{n}",
+            "report_date": date(2024, 1, 1) + timedelta(days=n % 90),
+            "age_sex": "45/M",
+            "scan_type": "CT" if n % 2 else "MRI",
+            "doctor_description": "No acute abnormality. " * 20,
+            "created_at": start + timedelta(minutes=n),
+        }
+        for n in range(count)
+    ])
+    db.commit()
+
+
+def summary_dict(row):
+    # What the routes did before response models
+    return {
+        "id": row.id,
+        "serial_number": row.serial_number,
+        "uhid": row.uhid,
+        "patient_name": row.patient_name,
+        "patient_no": row.patient_no,
+        "report_date": str(row.report_date) if row.report_date else None,
+        "age_sex": row.age_sex,
+        "scan_type": row.scan_type,
+        "created_at": str(row.created_at),
+    }
+
+
+def json_response_body(content):
+    # Same as FastAPI without a response model: jsonable_encoder, then JSONResponse.render
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def orm_dicts(db, count):
+    reports = db.execute(select(RadiologyReport).limit(count)).scalars().all()
+    body = json_response_body({"items": [summary_dict(report) for report in reports], "next_cursor": None})
+    db.expunge_all()
+    return body
+
+
+def row_dicts(db, count):
+    rows = db.execute(select(*SUMMARY_COLUMNS).limit(count)).all()
+    return json_response_body({"items": [summary_dict(row) for row in rows], "next_cursor": None})
+
+
+def row_orjson(db, count):
+    rows = db.execute(select(*SUMMARY_COLUMNS).limit(count)).all()
+    return orjson.dumps({"items": [row._asdict() for row in rows], "next_cursor": None})
+
+
+def row_model(db, count):
+    rows = db.execute(select(*SUMMARY_COLUMNS).limit(count)).all()
+    return ReportPage.model_validate({"items": rows, "next_cursor": None}).model_dump_json().encode()
+
+
+def measure(case, db, args):
+    case(db, args.reports)  # warm up
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        case(db, args.reports)
+    seconds = (time.perf_counter() - start) / args.repeat
+
+    tracemalloc.start()
+    body = case(db, args.reports)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    scale = 1000 / args.reports
+    return seconds * 1000 * scale, peak / 1024 * scale, len(body)
+
+
+def main(args):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        seed(db, args.reports)
+
+        cases = [
+            ("before: ORM objects + dicts", orm_dicts),
+            ("before: Row tuples + dicts", row_dicts),
+            ("after: Row tuples + response model", row_model),
+        ]
+        if orjson is not None:
+            cases.append(("Row tuples + orjson (no model)", row_orjson))
+
+        print(f"per 1,000 reports ({args.reports} loaded, {args.repeat} runs)")
+        for name, case in cases:
+            ms, peak_kib, size = measure(case, db, args)
+            print(f"{name:<38} {ms:8.2f} ms  peak {peak_kib:9.1f} KiB  body {size} bytes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reports", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    main(parser.parse_args())
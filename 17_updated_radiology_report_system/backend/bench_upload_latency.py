@@ -0,0 +1,83 @@
+"""
+Benchmark: latency of list and QR requests while a burst of uploads is running
+Start the server first (python main.py), then from the backend folder:
+    python bench_upload_latency.py --url http://localhost:8000/api --uploaders 16 --seconds 10
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from types import SimpleNamespace
+import httpx
+from word_export import render_table_format, TABLE_FORMAT_FIELDS
+
+
+def sample_docx():
+    """A large report (long findings) so parsing takes real CPU time"""
+    fields = {field: f"value {field}" for field in TABLE_FORMAT_FIELDS}
+    fields["patient_name"] = "Benchmark Patient"
+    fields["doctor_description"] = "\n".join(f"Finding line {n} " * 8 for n in range(2000))
+    return render_table_format(SimpleNamespace(**fields))
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def probe(client, url, seconds, timings):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        start = time.perf_counter()
+        await client.get(url)
+        timings.append((time.perf_counter() - start) * 1000)
+
+
+async def uploader(client, url, content, seconds, statuses):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        response = await client.post(url, files={"file": ("bench.docx", content)})
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        if response.status_code == 503:
+            await asyncio.sleep(0.05)
+
+
+def report(phase, name, timings):
+    print(
+        f"{phase:<14} {name:<5} n={len(timings):<6} p50={statistics.median(timings):7.1f}ms "
+        f"p95={percentile(timings, 95):7.1f}ms p99={percentile(timings, 99):7.1f}ms max={max(timings):7.1f}ms"
+    )
+
+
+async def main(args):
+    async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+        created = await client.post("/reports", json={"patient_name": "Benchmark Patient"})
+        serial = created.json()["serial_number"]
+        content = sample_docx()
+        probes = {"list": "/reports?limit=50", "qr": f"/reports/serial/{serial}/qr"}
+
+        for phase, uploaders in (("idle", 0), ("upload burst", args.uploaders)):
+            timings = {name: [] for name in probes}
+            statuses = {}
+            tasks = [probe(client, url, args.seconds, timings[name]) for name, url in probes.items()]
+            tasks += [
+                uploader(client, f"/reports/serial/{serial}/upload", content, args.seconds, statuses)
+                for _ in range(uploaders)
+            ]
+            await asyncio.gather(*tasks)
+
+            for name in probes:
+                report(phase, name, timings[name])
+            if statuses:
+                print(f"{phase:<14} uploads by status: {statuses}")
+
+        await client.delete(f"/reports/serial/{serial}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000/api")
+    parser.add_argument("--uploaders", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    asyncio.run(main(parser.parse_args()))
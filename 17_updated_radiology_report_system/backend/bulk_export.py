@@ -0,0 +1,94 @@
+import io
+import zipfile
+from collections import deque
+from database import SessionLocal
+from models import RadiologyReport
+from export_cache import EXPORT_FIELDS, export_cache, report_digest
+from workers import get_process_pool, bulk_slot, render_table_docx
+from config import WORKER_PROCESSES
+
+# Documents submitted to the shared process pool and not yet written, per export:
+# two for each of its WORKER_PROCESSES processes, so each has the next one waiting.
+# This (not the number of reports) bounds memory.
+MAX_IN_FLIGHT = WORKER_PROCESSES * 2
+
+
+class ZipOutput(io.RawIOBase):
+    """Write-only, non-seekable sink that hands written bytes back in chunks"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def report_query(db, serial_numbers, date_from, date_to):
+    columns = [getattr(RadiologyReport, field) for field in ("id", "serial_number") + EXPORT_FIELDS]
+    query = db.query(*columns)
+
+    if serial_numbers:
+        query = query.filter(RadiologyReport.serial_number.in_(serial_numbers))
+    if date_from:
+        query = query.filter(RadiologyReport.report_date >= date_from)
+    if date_to:
+        query = query.filter(RadiologyReport.report_date <= date_to)
+
+    return query.order_by(RadiologyReport.id).yield_per(500)
+
+
+def stream_reports_zip(serial_numbers=None, date_from=None, date_to=None):
+    """Yield a ZIP of .docx reports chunk by chunk while the pool is still rendering.
+
+    The first chunk is empty: the route takes it at once, so a request beyond
+    BULK_CONCURRENCY gets PoolSaturated before the response has started."""
+    with bulk_slot():
+        yield b""
+        db = SessionLocal()
+        pool = get_process_pool()
+        output = ZipOutput()
+        # .docx files are already compressed, so they are stored as they are
+        archive = zipfile.ZipFile(output, "w", compression=zipfile.ZIP_STORED)
+        pending = deque()
+
+        def write_oldest():
+            name, result = pending.popleft()
+            content = result if isinstance(result, bytes) else result.result()
+            archive.writestr(name, content)
+            return output.drain()
+
+        try:
+            for row in report_query(db, serial_numbers, date_from, date_to):
+                fields = row._asdict()
+                name = f"{fields['serial_number']}.docx"
+
+                # Reports exported before are already rendered
+                cached = export_cache.get(fields["id"], report_digest(row))
+                if cached is not None:
+                    pending.append((name, cached))
+                else:
+                    render_fields = {field: fields[field] for field in EXPORT_FIELDS}
+                    pending.append((name, pool.submit(render_table_docx, render_fields)))
+
+                if len(pending) >= MAX_IN_FLIGHT:
+                    yield write_oldest()
+
+            while pending:
+                yield write_oldest()
+
+            archive.close()
+            yield output.drain()
+        finally:
+            for _, result in pending:
+                if not isinstance(result, bytes):
+                    result.cancel()
+            db.close()
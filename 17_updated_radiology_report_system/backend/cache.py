@@ -0,0 +1,165 @@
+import os
+import threading
+import tempfile
+from collections import OrderedDict
+
+
+class MemoryLRU:
+    """In-memory LRU of bytes values, bounded by their total size.
+    Other values can be stored by passing their size explicitly."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self.sizes = {}
+        self.groups = {}
+        self.lock = threading.Lock()
+
+    def get(self, group, key):
+        with self.lock:
+            value = self.entries.get((group, key))
+            if value is not None:
+                self.entries.move_to_end((group, key))
+            return value
+
+    def set(self, group, key, value, size=None):
+        size = len(value) if size is None else size
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            self._remove((group, key))
+            self.entries[(group, key)] = value
+            self.sizes[(group, key)] = size
+            self.groups.setdefault(group, set()).add(key)
+            self.size += size
+
+            # Drop least recently used entries until we fit again
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+
+    def invalidate(self, group):
+        with self.lock:
+            for key in list(self.groups.get(group, ())):
+                self._remove((group, key))
+
+    def delete(self, group, key):
+        with self.lock:
+            self._remove((group, key))
+
+    def _remove(self, entry):
+        value = self.entries.pop(entry, None)
+        if value is None:
+            return
+        self.size -= self.sizes.pop(entry)
+        group, key = entry
+        keys = self.groups.get(group)
+        keys.discard(key)
+        if not keys:
+            del self.groups[group]
+
+
+class DiskCache:
+    """Directory of cached files, bounded by total size (oldest used evicted first)"""
+
+    # Eviction lists the whole directory, so it frees this much more than needed
+    # and does not run again until another 10% of max_bytes has been written
+    LOW_WATER = 0.9
+
+    def __init__(self, directory, max_bytes, suffix=""):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.size = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+
+    def _path(self, group, key):
+        return os.path.join(self.directory, f"{group}-{key}{self.suffix}")
+
+    def get(self, group, key):
+        path = self._path(group, key)
+        try:
+            with open(path, "rb") as f:
+                value = f.read()
+            # Touch the file so eviction treats it as recently used
+            os.utime(path)
+            return value
+        except OSError:
+            return None
+
+    def set(self, group, key, value):
+        if len(value) > self.max_bytes:
+            return
+        path = self._path(group, key)
+
+        # Write to a temp file first so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(value)
+
+        with self.lock:
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+            self.size += len(value) - old_size
+            if self.size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Temp files belong to writers that are still in progress
+        files = [
+            entry for entry in os.scandir(self.directory)
+            if entry.is_file() and not entry.name.endswith(".tmp")
+        ]
+        files.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in files:
+            if self.size <= self.max_bytes * self.LOW_WATER:
+                break
+            self._unlink(entry.path)
+
+    def delete(self, group, key):
+        with self.lock:
+            self._unlink(self._path(group, key))
+
+    def _unlink(self, path):
+        try:
+            file_size = os.path.getsize(path)
+            os.remove(path)
+            self.size -= file_size
+        except OSError:
+            pass
+
+
+class TieredCache:
+    """Memory LRU in front of an optional disk cache.
+    Keys must identify the content (e.g. a hash of it): invalidate() only frees
+    the memory tier, and old files on disk are left for eviction to remove.
+    delete() removes one key from both tiers."""
+
+    def __init__(self, memory, disk=None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, group, key):
+        value = self.memory.get(group, key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(group, key)
+            if value is not None:
+                self.memory.set(group, key, value)
+        return value
+
+    def set(self, group, key, value):
+        self.memory.set(group, key, value)
+        if self.disk is not None:
+            self.disk.set(group, key, value)
+
+    def invalidate(self, group):
+        # Scanning the directory for the group's files would cost a listing of
+        # every cached file per call
+        self.memory.invalidate(group)
+
+    def delete(self, group, key):
+        self.memory.delete(group, key)
+        if self.disk is not None:
+            self.disk.delete(group, key)
+
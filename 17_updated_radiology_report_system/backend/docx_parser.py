@@ -0,0 +1,80 @@
+from docx import Document
+from io import BytesIO
+from datetime import datetime
+from metrics import timed
+
+
+@timed("docx_parse")
+def parse_report_docx(content):
+    """Read report fields back out of an exported .docx file (bytes, a path or a file object).
+    Uploads go through docx_stream.extract_report instead; this python-docx version is
+    the reference it is checked against."""
+    document = Document(BytesIO(content) if isinstance(content, bytes) else content)
+    extracted = {}
+
+    # Extract table data
+    for table in document.tables:
+        for row in table.rows:
+            cells = [c.text.strip() for c in row.cells]
+            if len(cells) >= 2:
+                extracted[cells[0].replace(":", "").strip()] = cells[1].strip()
+            if len(cells) >= 4:
+                extracted[cells[2].replace(":", "").strip()] = cells[3].strip()
+        break
+
+    # Extract scan type and sections
+    scan_type = None
+    findings_text = ""
+    impression_text = ""
+    current_section = None
+    last_text = ""
+
+    for para in document.paragraphs:
+        text = para.text.strip()
+        if not text:
+            continue
+
+        if text.startswith("Findings:"):
+            scan_type = last_text
+            current_section = "Findings"
+            continue
+        elif text.startswith("Impression:"):
+            current_section = "Impression"
+            continue
+
+        if current_section == "Findings":
+            findings_text += text + "\n"
+        elif current_section == "Impression":
+            impression_text += text + "\n"
+
+        last_text = text
+
+    # Parse report date
+    report_date = None
+    if extracted.get("Report Date"):
+        for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y"):
+            try:
+                report_date = datetime.strptime(extracted["Report Date"], fmt).date()
+                break
+            except:
+                continue
+
+    # Prepare data for database
+    return {
+        "uhid": extracted.get("UHID"),
+        "sl_no": extracted.get("Sl No"),
+        "reg_no": extracted.get("Reg No"),
+        "patient_no": extracted.get("Patient No"),
+        "patient_name": extracted.get("Patient Name", "Uploaded Patient"),
+        "age_sex": extracted.get("Age/Sex"),
+        "origin_ethe": extracted.get("Origin"),
+        "ref_by": extracted.get("Referred By"),
+        "film_no": extracted.get("Film No"),
+        "scan_time": extracted.get("Scan Time"),
+        "report_time": extracted.get("Report Time"),
+        "tat": extracted.get("TAT"),
+        "scan_type": scan_type,
+        "report_date": report_date,
+        "doctor_description": findings_text.strip(),
+        "impression": impression_text.strip(),
+    }
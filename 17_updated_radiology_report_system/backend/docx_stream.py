@@ -0,0 +1,209 @@
+"""
+Streaming reader for uploaded report .docx files (the ingest path).
+
+word/document.xml is decompressed out of the ZIP and fed through an incremental
+XML parser; each paragraph and table row is dropped as soon as it has been read,
+so memory grows with the findings text kept, not with the size of the XML.
+Reads the same fields as docx_parser.parse_report_docx (python-docx), which
+bench_docx_stream.py checks.
+"""
+
+import zipfile
+from datetime import datetime
+from io import BytesIO
+from xml.etree import ElementTree
+from metrics import timed
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+RELATIONSHIPS = "{http://schemas.openxmlformats.org/package/2006/relationships}Relationship"
+OFFICE_DOCUMENT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+DEFAULT_DOCUMENT_PART = "word/document.xml"
+
+BODY = W + "body"
+P = W + "p"
+R = W + "r"
+HYPERLINK = W + "hyperlink"
+T = W + "t"
+BR = W + "br"
+TBL = W + "tbl"
+TR = W + "tr"
+TC = W + "tc"
+TR_PR = W + "trPr"
+TC_PR = W + "tcPr"
+GRID_BEFORE = W + "gridBefore"
+GRID_SPAN = W + "gridSpan"
+V_MERGE = W + "vMerge"
+VAL = W + "val"
+
+# Run contents read as text, as python-docx reads them (w:br only when it is a line break)
+RUN_TEXT = {W + "tab": "\t", W + "ptab": "\t", W + "cr": "\n", W + "noBreakHyphen": "-"}
+
+# Depth of elements under <w:document>: body children at 2, rows of a body
+# table at 3, their cells at 4 and the cells' paragraphs at 5
+BODY_DEPTH = 2
+CELL_PARAGRAPH_DEPTH = 5
+
+
+def document_part(archive):
+    """Name of the main document part, from the package relationships"""
+    try:
+        with archive.open("_rels/.rels") as rels:
+            for rel in ElementTree.parse(rels).getroot().iter(RELATIONSHIPS):
+                if rel.get("Type") == OFFICE_DOCUMENT:
+                    return rel.get("Target").lstrip("/")
+    except KeyError:
+        pass
+    return DEFAULT_DOCUMENT_PART
+
+
+def iter_body(content):
+    """Yield ("row", cell texts) for each row of the first table in the body and
+    ("paragraph", text) for each paragraph directly in the body, in document order.
+
+    Cells come out like python-docx's row.cells: a cell spanning several grid
+    columns is repeated, and a vertically merged cell repeats the one above it."""
+    source = BytesIO(content) if isinstance(content, bytes) else content
+    with zipfile.ZipFile(source) as archive, archive.open(document_part(archive)) as xml:
+        tags = []            # open elements, outermost first
+        elements = []
+        text = None          # pieces of the paragraph being read
+        text_depth = None
+        table_done = False   # only the first table's rows are read
+        in_table = False
+        cell_paragraphs = []
+        cell_span, cell_merge = 1, None
+        row, row_cells, above = [], {}, {}
+        offset = 0
+
+        for event, element in ElementTree.iterparse(xml, events=("start", "end")):
+            tag = element.tag
+            if event == "start":
+                tags.append(tag)
+                elements.append(element)
+                depth = len(tags) - 1
+                if tag == P and text is None and (
+                    (depth == BODY_DEPTH and tags[1] == BODY)
+                    or (depth == CELL_PARAGRAPH_DEPTH and in_table and tags[4] == TC)
+                ):
+                    text, text_depth = [], depth
+                elif depth == BODY_DEPTH and tag == TBL and not table_done:
+                    in_table = True
+                elif in_table and depth == 3 and tag == TR:
+                    row, row_cells, offset = [], {}, 0
+                elif in_table and depth == 4 and tag == TC:
+                    cell_paragraphs, cell_span, cell_merge = [], 1, None
+                continue
+
+            depth = len(tags) - 1
+            tags.pop()
+            elements.pop()
+
+            if text is not None and depth > text_depth:
+                # Runs directly in the paragraph, or in a hyperlink in it
+                path = tags[text_depth + 1:]
+                if path == [R] or path == [HYPERLINK, R]:
+                    if tag == T:
+                        text.append(element.text or "")
+                    elif tag in RUN_TEXT:
+                        text.append(RUN_TEXT[tag])
+                    elif tag == BR and element.get(W + "type", "textWrapping") == "textWrapping":
+                        text.append("\n")
+
+            elif tag == P and depth == text_depth:
+                if depth == BODY_DEPTH:
+                    yield "paragraph", "".join(text)
+                else:
+                    cell_paragraphs.append("".join(text))
+                text = text_depth = None
+
+            elif in_table:
+                if depth == 5 and tag == GRID_BEFORE and tags[-1] == TR_PR:
+                    offset += int(element.get(VAL, 0))
+                elif depth == 6 and tag == GRID_SPAN and tags[-1] == TC_PR:
+                    cell_span = int(element.get(VAL, 1))
+                elif depth == 6 and tag == V_MERGE and tags[-1] == TC_PR:
+                    cell_merge = element.get(VAL, "continue")
+                elif depth == 4 and tag == TC:
+                    if cell_merge == "continue" and offset in above:
+                        # Continues the merged cell above, which gives the text and width
+                        cell = above[offset]
+                    else:
+                        cell = ("\n".join(cell_paragraphs), cell_span)
+                    row.extend([cell[0]] * cell[1])
+                    row_cells[offset] = cell
+                    offset += cell_span
+                elif depth == 3 and tag == TR:
+                    yield "row", row
+                    above = row_cells
+                elif depth == BODY_DEPTH and tag == TBL:
+                    in_table, table_done = False, True
+
+            # Drop finished body blocks and table rows so the tree never grows
+            if elements and (depth == BODY_DEPTH or (depth == 3 and tag == TR)):
+                elements[-1].remove(element)
+
+
+def parse_report_date(value):
+    if value:
+        for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y"):
+            try:
+                return datetime.strptime(value, fmt).date()
+            except ValueError:
+                continue
+    return None
+
+
+@timed("docx_parse")
+def extract_report(content):
+    """Read report fields out of an uploaded .docx file (bytes, a path or a file object)"""
+    extracted = {}
+    scan_type = None
+    sections = {"Findings": [], "Impression": []}
+    current_section = None
+    last_text = ""
+
+    for kind, value in iter_body(content):
+        if kind == "row":
+            # Label/value pairs, two per row in the exported layout
+            cells = [cell.strip() for cell in value]
+            if len(cells) >= 2:
+                extracted[cells[0].replace(":", "").strip()] = cells[1]
+            if len(cells) >= 4:
+                extracted[cells[2].replace(":", "").strip()] = cells[3]
+            continue
+
+        text = value.strip()
+        if not text:
+            continue
+
+        # The scan type is the line just before "Findings:"
+        if text.startswith("Findings:"):
+            scan_type = last_text
+            current_section = "Findings"
+            continue
+        elif text.startswith("Impression:"):
+            current_section = "Impression"
+            continue
+
+        if current_section:
+            sections[current_section].append(text)
+        last_text = text
+
+    return {
+        "uhid": extracted.get("UHID"),
+        "sl_no": extracted.get("Sl No"),
+        "reg_no": extracted.get("Reg No"),
+        "patient_no": extracted.get("Patient No"),
+        "patient_name": extracted.get("Patient Name", "Uploaded Patient"),
+        "age_sex": extracted.get("Age/Sex"),
+        "origin_ethe": extracted.get("Origin"),
+        "ref_by": extracted.get("Referred By"),
+        "film_no": extracted.get("Film No"),
+        "scan_time": extracted.get("Scan Time"),
+        "report_time": extracted.get("Report Time"),
+        "tat": extracted.get("TAT"),
+        "scan_type": scan_type,
+        "report_date": parse_report_date(extracted.get("Report Date")),
+        "doctor_description": "\n".join(sections["Findings"]),
+        "impression": "\n".join(sections["Impression"]),
+    }
@@ -0,0 +1,57 @@
+import hashlib
+import json
+from cache import MemoryLRU, DiskCache, TieredCache
+from config import EXPORT_CACHE_MEMORY_BYTES, EXPORT_CACHE_DIR, EXPORT_CACHE_DISK_BYTES
+from starlette.concurrency import run_in_threadpool
+from word_export import render_table_format, TABLE_FORMAT_FIELDS
+from workers import run_render, render_table_docx
+from metrics import span
+
+# Bump when the exported layout changes so old cached files are not served
+EXPORT_VERSION = 2
+
+# Every report field that ends up in the exported document
+EXPORT_FIELDS = TABLE_FORMAT_FIELDS
+
+export_cache = TieredCache(
+    MemoryLRU(EXPORT_CACHE_MEMORY_BYTES),
+    DiskCache(EXPORT_CACHE_DIR, EXPORT_CACHE_DISK_BYTES, suffix=".docx"),
+)
+
+
+def report_digest(report):
+    """Hash of the report's exported field values (also used as the ETag)"""
+    values = [EXPORT_VERSION] + [str(getattr(report, field) or "") for field in EXPORT_FIELDS]
+    return hashlib.sha256(json.dumps(values).encode()).hexdigest()
+
+
+def get_export(report, digest):
+    """Return the rendered .docx bytes, rendering only on a cache miss"""
+    content = export_cache.get(report.id, digest)
+    if content is None:
+        with span("docx_render"):
+            content = render_table_format(report)
+        export_cache.set(report.id, digest, content)
+    return content
+
+
+async def get_export_async(report, digest):
+    """Same as get_export for the API routes: a cache miss is rendered in the
+    render process pool (raises PoolSaturated when it is full)"""
+    content = await run_in_threadpool(export_cache.get, report.id, digest)
+    if content is None:
+        fields = {field: getattr(report, field) for field in EXPORT_FIELDS}
+        with span("docx_render"):
+            content = await run_render(render_table_docx, fields)
+        await run_in_threadpool(export_cache.set, report.id, digest, content)
+    return content
+
+
+def invalidate_export(report_id):
+    export_cache.invalidate(report_id)
+
+
+def delete_export(report_id, digest):
+    """Remove the report's current export from memory and disk (its older
+    versions have other digests and are left for eviction)"""
+    export_cache.delete(report_id, digest)
@@ -0,0 +1,354 @@
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, func
+from database import SessionLocal, engine
+from models import ExportJob
+from bulk_export import report_query
+from export_cache import get_export, report_digest
+from workers import init_render_process
+from config import (
+    EXPORT_JOB_WORKERS, EXPORT_JOB_DIR, EXPORT_JOB_KEEP_HOURS,
+    EXPORT_JOB_POLL_SECONDS, EXPORT_JOB_HEARTBEAT_SECONDS, EXPORT_JOB_TIMEOUT, EXPORT_JOB_MAX_ATTEMPTS,
+)
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+EXPIRED = "expired"
+
+MEDIA_TYPES = {
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "zip": "application/zip",
+}
+
+# Recorded on claimed jobs so an operator can see who ran what
+WORKER_NAME = f"{socket.gethostname()}:{os.getpid()}"
+
+jobs = ExportJob.__table__
+
+
+def job_path(file_name):
+    return os.path.join(EXPORT_JOB_DIR, file_name)
+
+
+def download_name(job):
+    if job.format == "docx":
+        return f"radiology_report_{job.serial_number}.docx"
+    return f"radiology_reports_{job.date_from}_{job.date_to}.zip"
+
+
+# ---- Runs in the worker processes ----
+
+def _init_worker_process():
+    # Niced like the render processes, so exports leave the CPU to API requests
+    init_render_process()
+    # Connections inherited from the parent must not be used by the child
+    engine.dispose(close=False)
+
+
+def run_export_job(job_id):
+    """Render one job into EXPORT_JOB_DIR; returns (file_name, file_size, report_count)"""
+    db = SessionLocal()
+    fd, tmp_path = tempfile.mkstemp(dir=EXPORT_JOB_DIR, suffix=".tmp")
+    try:
+        job = db.get(ExportJob, job_id)
+        serial_numbers = [job.serial_number] if job.serial_number else None
+        rows = report_query(db, serial_numbers, job.date_from, job.date_to)
+        count = 0
+
+        with os.fdopen(fd, "wb") as output:
+            if job.format == "docx":
+                row = next(iter(rows), None)
+                if row is None:
+                    raise ValueError("Report not found")
+                output.write(get_export(row, report_digest(row)))
+                count = 1
+            else:
+                # .docx files are already compressed, so they are stored as they are
+                with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_STORED) as archive:
+                    for row in rows:
+                        archive.writestr(f"{row.serial_number}.docx", get_export(row, report_digest(row)))
+                        count += 1
+
+        file_name = f"export-{job_id}.{job.format}"
+        os.replace(tmp_path, job_path(file_name))
+        return file_name, os.path.getsize(job_path(file_name)), count
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        db.close()
+
+
+# ---- Queue operations (the export_jobs table is the queue) ----
+
+def claim_next_job():
+    """Mark the oldest queued job as running for this process; returns its id or None"""
+    next_id = (
+        select(jobs.c.id)
+        .where(jobs.c.status == QUEUED)
+        .order_by(jobs.c.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    with engine.begin() as conn:
+        return conn.execute(
+            update(jobs)
+            .where(jobs.c.id == next_id, jobs.c.status == QUEUED)
+            .values(
+                status=RUNNING, started_at=datetime.now(), heartbeat_at=datetime.now(),
+                worker=WORKER_NAME, attempts=jobs.c.attempts + 1,
+            )
+            .returning(jobs.c.id)
+        ).scalar()
+
+
+def owned(job_ids):
+    """Condition for jobs this process is running (not since requeued and taken by another)"""
+    return jobs.c.id.in_(job_ids) & (jobs.c.status == RUNNING) & (jobs.c.worker == WORKER_NAME)
+
+
+def heartbeat_jobs(job_ids):
+    with engine.begin() as conn:
+        conn.execute(update(jobs).where(owned(job_ids)).values(heartbeat_at=datetime.now()))
+
+
+def finish_job(job_id, **values):
+    with engine.begin() as conn:
+        conn.execute(update(jobs).where(owned([job_id])).values(finished_at=datetime.now(), **values))
+
+
+def release_jobs(job_ids):
+    """Put jobs this process will not finish back in the queue (the try does not count)"""
+    with engine.begin() as conn:
+        conn.execute(
+            update(jobs)
+            .where(owned(job_ids))
+            .values(status=QUEUED, started_at=None, heartbeat_at=None, worker=None, attempts=jobs.c.attempts - 1)
+        )
+
+
+def retry_job(job_id, error):
+    """A job whose worker process died goes back to the queue, unless that was its last attempt"""
+    with engine.begin() as conn:
+        conn.execute(
+            update(jobs)
+            .where(owned([job_id]), jobs.c.attempts >= EXPORT_JOB_MAX_ATTEMPTS)
+            .values(status=FAILED, finished_at=datetime.now(), error=error)
+        )
+        conn.execute(
+            update(jobs)
+            .where(owned([job_id]), jobs.c.attempts < EXPORT_JOB_MAX_ATTEMPTS)
+            .values(status=QUEUED, started_at=None, heartbeat_at=None, worker=None)
+        )
+
+
+def requeue_abandoned_jobs():
+    """Running jobs without a heartbeat for EXPORT_JOB_TIMEOUT lost their process; retry or give up on them"""
+    cutoff = datetime.now() - timedelta(seconds=EXPORT_JOB_TIMEOUT)
+    # Jobs claimed before heartbeats were recorded have only started_at
+    abandoned = (jobs.c.status == RUNNING) & (func.coalesce(jobs.c.heartbeat_at, jobs.c.started_at) < cutoff)
+    with engine.begin() as conn:
+        conn.execute(
+            update(jobs)
+            .where(abandoned, jobs.c.attempts >= EXPORT_JOB_MAX_ATTEMPTS)
+            .values(status=FAILED, finished_at=datetime.now(), error="Export did not finish")
+        )
+        conn.execute(
+            update(jobs)
+            .where(abandoned, jobs.c.attempts < EXPORT_JOB_MAX_ATTEMPTS)
+            .values(status=QUEUED, started_at=None, heartbeat_at=None, worker=None)
+        )
+
+
+def expire_old_files():
+    """Delete finished files older than EXPORT_JOB_KEEP_HOURS"""
+    cutoff = datetime.now() - timedelta(hours=EXPORT_JOB_KEEP_HOURS)
+    with engine.begin() as conn:
+        expired = conn.execute(
+            update(jobs)
+            .where(jobs.c.status == DONE, jobs.c.finished_at < cutoff)
+            .values(status=EXPIRED)
+            .returning(jobs.c.file_name)
+        ).scalars().all()
+
+    for file_name in expired:
+        try:
+            os.remove(job_path(file_name))
+        except OSError:
+            pass
+
+
+class ExportJobRunner:
+    """Claims queued export jobs and renders them in a pool of worker processes.
+
+    Every app process runs one. Because the queue is the export_jobs table,
+    jobs survive restarts and are shared by all app processes. Running jobs get
+    a heartbeat every EXPORT_JOB_HEARTBEAT_SECONDS, however long they take; a
+    job whose process died stops getting them and is picked up again after
+    EXPORT_JOB_TIMEOUT. Jobs running when the runner stops are requeued at once.
+    If a worker process dies, the pool is replaced and its jobs are retried.
+    """
+
+    def __init__(self, workers=EXPORT_JOB_WORKERS):
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.pool = None
+        self.pool_broken = threading.Event()
+        self.thread = None
+        self.started = None
+        # Running jobs by id -> start time, and total busy worker-seconds so far
+        self.running = {}
+        self.busy_seconds = 0.0
+        self.completed = 0
+
+    def start(self):
+        if self.thread is not None:
+            return
+        os.makedirs(EXPORT_JOB_DIR, exist_ok=True)
+        self._new_pool()
+        self.started = time.monotonic()
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._run, name="export-jobs", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.stopping.set()
+        self.wakeup.set()
+        self.thread.join()
+        # The executor has no public way to stop work it has started; shutdown() drops this
+        processes = list((self.pool._processes or {}).values())
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+        # Jobs still running go back to the queue for the next runner, and their
+        # renders are stopped rather than finished after the server is gone
+        with self.lock:
+            running = list(self.running)
+        if running:
+            try:
+                release_jobs(running)
+            except Exception:
+                logger.exception("Could not requeue export jobs %s", running)
+            for process in processes:
+                process.terminate()
+        self.thread = None
+
+    def _new_pool(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+        self.pool_broken.clear()
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker_process)
+
+    def notify(self):
+        """Check the queue now instead of at the next poll"""
+        self.wakeup.set()
+
+    def _run(self):
+        last_maintenance = None
+        last_heartbeat = time.monotonic()
+        while not self.stopping.is_set():
+            self.wakeup.clear()
+            try:
+                if time.monotonic() - last_heartbeat > EXPORT_JOB_HEARTBEAT_SECONDS:
+                    with self.lock:
+                        running = list(self.running)
+                    if running:
+                        heartbeat_jobs(running)
+                    last_heartbeat = time.monotonic()
+
+                if last_maintenance is None or time.monotonic() - last_maintenance > 60:
+                    requeue_abandoned_jobs()
+                    expire_old_files()
+                    last_maintenance = time.monotonic()
+
+                # A process died (killed, or out of memory); the executor cannot be used again
+                if self.pool_broken.is_set():
+                    logger.warning("Export worker process died, starting a new pool")
+                    self._new_pool()
+
+                while len(self.running) < self.workers and not self.stopping.is_set():
+                    if self.pool_broken.is_set():
+                        break
+                    job_id = claim_next_job()
+                    if job_id is None:
+                        break
+                    self._submit(job_id)
+            except Exception:
+                logger.exception("Export job runner error")
+            self.wakeup.wait(EXPORT_JOB_POLL_SECONDS)
+
+    def _submit(self, job_id):
+        with self.lock:
+            self.running[job_id] = time.monotonic()
+        try:
+            future = self.pool.submit(run_export_job, job_id)
+        except BrokenProcessPool:
+            # The pool broke before the job got to it, so the try does not count
+            self.pool_broken.set()
+            with self.lock:
+                del self.running[job_id]
+            release_jobs([job_id])
+            return
+        except Exception as e:
+            self._finished(job_id, None, e)
+            return
+        future.add_done_callback(lambda f: self._finished(job_id, f))
+
+    def _finished(self, job_id, future, error=None):
+        try:
+            if future is not None and future.cancelled():
+                # Shut down before it started; leave it for the next runner
+                release_jobs([job_id])
+                return
+            if error is None:
+                error = future.exception()
+            if error is None:
+                file_name, file_size, report_count = future.result()
+                finish_job(job_id, status=DONE, file_name=file_name, file_size=file_size, report_count=report_count)
+            elif isinstance(error, BrokenProcessPool):
+                self.pool_broken.set()
+                retry_job(job_id, "Export worker process died")
+            else:
+                finish_job(job_id, status=FAILED, error=str(error) or error.__class__.__name__)
+        except Exception:
+            logger.exception("Could not record result of export job %s", job_id)
+        finally:
+            with self.lock:
+                self.busy_seconds += time.monotonic() - self.running.pop(job_id)
+                self.completed += 1
+            self.wakeup.set()
+
+    def stats(self):
+        """Worker utilisation of this process since it started"""
+        now = time.monotonic()
+        with self.lock:
+            busy = self.busy_seconds + sum(now - started for started in self.running.values())
+            running = len(self.running)
+            completed = self.completed
+        uptime = now - self.started if self.started else 0
+        return {
+            "workers": self.workers,
+            "busy_workers": running,
+            "jobs_completed": completed,
+            "utilisation": round(busy / (self.workers * uptime), 4) if uptime else 0.0,
+        }
+
+
+export_runner = ExportJobRunner()
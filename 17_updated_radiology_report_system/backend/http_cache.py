@@ -0,0 +1,170 @@
+"""
+Compression and conditional GET for the JSON APIs.
+
+    from http_cache import HttpCacheMiddleware
+    app.add_middleware(HttpCacheMiddleware, policies={"/api/packages": "public, max-age=300"})
+
+For every GET answered with a 200 JSON body the middleware:
+- adds a weak ETag computed from the body, and answers a matching If-None-Match
+  with 304 Not Modified and no body;
+- compresses bodies of HTTP_COMPRESS_MIN_BYTES or more with brotli or gzip,
+  whichever the client accepts (brotli first, when the module is installed);
+- sets Cache-Control from the policy for the request path, keyed by the full
+  path template (prefix included, e.g. "/api/user/{user_id}"), or the default:
+  private, no-cache (the client keeps the body but asks again each time, and a
+  304 costs a few headers). Templates are matched against the request path, so
+  it does not matter how a router reports its routes' paths.
+A route that sets its own ETag, Cache-Control or Content-Encoding keeps it.
+Other responses (HTML, files, event streams, errors) pass through unbuffered.
+
+The same file is copied into each app folder.
+"""
+
+import gzip
+import hashlib
+import os
+import re
+from starlette.datastructures import Headers, MutableHeaders
+
+# Brotli is optional; without it bodies are sent as gzip or plain
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Smaller bodies fit in a packet or two either way; compressing them costs more than it saves
+COMPRESS_MIN_BYTES = int(os.getenv("HTTP_COMPRESS_MIN_BYTES", 1024))
+
+# Levels for responses built per request (the highest levels cost several
+# times the CPU for a few percent smaller bodies)
+GZIP_LEVEL = int(os.getenv("HTTP_GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.getenv("HTTP_BROTLI_QUALITY", 4))
+
+DEFAULT_POLICY = "private, no-cache"
+
+# Headers a 304 repeats from the full response
+NOT_MODIFIED_HEADERS = ("cache-control", "etag", "vary", "expires", "content-location")
+
+
+def weak_etag(body):
+    return f'W/"{hashlib.sha1(body).hexdigest()}"'
+
+
+def etag_matches(if_none_match, etag):
+    """Check an If-None-Match header against our ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in tags)
+
+
+def path_pattern(template):
+    """Regex for the request paths a path template such as "/api/user/{user_id}" matches"""
+    pattern = re.escape(template)
+    pattern = re.sub(r"\\\{[^}]*:path\\\}", ".+", pattern)
+    pattern = re.sub(r"\\\{[^}]*\\\}", "[^/]+", pattern)
+    return re.compile(pattern + "$")
+
+
+def choose_encoding(accept_encoding):
+    """Best coding the client accepts: brotli, then gzip, then none"""
+    accepted = set()
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+
+    if brotli is not None and ("br" in accepted or "*" in accepted):
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class HttpCacheMiddleware:
+    """ASGI middleware: ETag / 304, compression and Cache-Control for GET JSON responses"""
+
+    def __init__(self, app, policies=None, default=DEFAULT_POLICY, min_size=COMPRESS_MIN_BYTES):
+        self.app = app
+        self.policies = [(path_pattern(template), policy) for template, policy in (policies or {}).items()]
+        self.default = default
+        self.min_size = min_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        start = None
+        chunks = []
+
+        async def send_cached(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message.get("headers", []))
+                if (
+                    message["status"] == 200
+                    and headers.get("content-type", "").startswith("application/json")
+                    and "content-encoding" not in headers
+                ):
+                    start = message
+                    return
+                start = None
+            elif start is not None and message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if message.get("more_body", False):
+                    return
+                await self.finish(scope, request_headers, start, b"".join(chunks), send)
+                return
+            await send(message)
+
+        await self.app(scope, receive, send_cached)
+
+    def policy(self, scope):
+        # Paths are declared without the prefix a proxy serves the app under
+        path = scope["path"]
+        root_path = scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        for pattern, policy in self.policies:
+            if pattern.match(path):
+                return policy
+        return self.default
+
+    async def finish(self, scope, request_headers, start, body, send):
+        headers = MutableHeaders(raw=list(start["headers"]))
+        if "etag" not in headers:
+            headers["etag"] = weak_etag(body)
+        if "cache-control" not in headers:
+            headers["cache-control"] = self.policy(scope)
+        compressible = len(body) >= self.min_size
+        if compressible:
+            headers.add_vary_header("Accept-Encoding")
+
+        if etag_matches(request_headers.get("if-none-match"), headers["etag"]):
+            kept = [(name, value) for name, value in headers.raw if name.decode() in NOT_MODIFIED_HEADERS]
+            await send({"type": "http.response.start", "status": 304, "headers": kept})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        encoding = choose_encoding(request_headers.get("accept-encoding")) if compressible else None
+        if encoding:
+            compressed = compress(body, encoding)
+            # Already compressed data (or very random text) can come out bigger
+            if len(compressed) < len(body):
+                body = compressed
+                headers["content-encoding"] = encoding
+                headers["content-length"] = str(len(body))
+
+        await send({**start, "headers": headers.raw})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,285 @@
+import re
+import zipfile
+from datetime import datetime
+from collections import deque
+from sqlalchemy import func
+from fastapi import HTTPException, Request
+from starlette.datastructures import UploadFile
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from database import SessionLocal, dialect_insert
+from models import RadiologyReport
+from docx_stream import extract_report
+from workers import get_process_pool, bulk_slot
+from serials import generate_serial_number
+from report_changes import report_created, report_changed, reports_created, reports_changed
+from analytics import stats_key, current_keys, update_analytics
+from config import (
+    WORKER_PROCESSES, UPLOAD_MAX_BYTES, BULK_UPLOAD_MAX_BYTES, BULK_UPLOAD_MAX_FILES, BULK_UNPACKED_MAX_BYTES,
+)
+
+# Rows written per INSERT ... ON CONFLICT statement
+BATCH_SIZE = 500
+
+# Files being parsed at once; bounds memory for very large uploads
+MAX_IN_FLIGHT = WORKER_PROCESSES * 2
+
+# Room for the multipart boundary and part headers around an uploaded file
+FORM_OVERHEAD = 64 * 1024
+
+# Files named after their report (as the bulk ZIP export does) keep that serial;
+# any other name gets a new serial, so uploading it again adds another report
+SERIAL_FILENAME = re.compile(r"^(RAD-\d{8}-\d+)\.docx$", re.IGNORECASE)
+
+UPSERT_COLUMNS = (
+    "uhid", "sl_no", "reg_no", "patient_no", "patient_name", "age_sex",
+    "origin_ethe", "ref_by", "film_no", "scan_time", "report_time", "tat",
+    "scan_type", "report_date", "doctor_description", "impression",
+)
+
+
+async def read_form(request: Request, limit, max_files):
+    """Parse a multipart form whose body may be at most limit bytes.
+
+    The form parser stores every file before a route sees it, so the size cap
+    is enforced here, on the request body: refused up front when Content-Length
+    is over it, and as soon as that much has arrived otherwise (chunked bodies)."""
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > limit:
+        raise HTTPException(status_code=413, detail="File is too large")
+
+    received = 0
+
+    async def receive():
+        nonlocal received
+        message = await request.receive()
+        received += len(message.get("body", b""))
+        if received > limit:
+            raise HTTPException(status_code=413, detail="File is too large")
+        return message
+
+    try:
+        return await Request(request.scope, receive).form(max_files=max_files)
+    except StarletteHTTPException as e:
+        # Malformed form, or too many files
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+
+async def read_upload(request: Request):
+    """Parse a single-file upload form and return (form, file); the caller closes the form"""
+    form = await read_form(request, UPLOAD_MAX_BYTES + FORM_OVERHEAD, 1)
+    file = form.get("file")
+    if not isinstance(file, UploadFile):
+        await form.close()
+        raise HTTPException(status_code=400, detail="No file uploaded")
+    if file.size > UPLOAD_MAX_BYTES:
+        await form.close()
+        raise HTTPException(status_code=413, detail="File is too large")
+    return form, file
+
+
+async def read_bulk_upload(request: Request):
+    """Parse a bulk upload form and return (form, files); the caller closes the form"""
+    form = await read_form(request, BULK_UPLOAD_MAX_BYTES, BULK_UPLOAD_MAX_FILES)
+    files = [file for file in form.getlist("files") if isinstance(file, UploadFile)]
+    if not files:
+        await form.close()
+        raise HTTPException(status_code=400, detail="No file uploaded")
+    return form, files
+
+
+def save_uploaded_report(serial_number, upload):
+    """Parse an uploaded file and save it to the report, then close the file
+    (runs in the upload thread pool)"""
+    db = SessionLocal()
+    try:
+        report_data = extract_report(upload)
+
+        # Update existing report
+        report = db.query(RadiologyReport).filter(
+            RadiologyReport.serial_number == serial_number
+        ).first()
+
+        if report:
+            old_key = stats_key(report.stat_day, report.scan_type)
+            for k, v in report_data.items():
+                if v is not None:
+                    setattr(report, k, v)
+            db.flush()
+            update_analytics(db, [report.id], {old_key})
+            db.commit()
+            report_changed(report.id, serial_number)
+            return "Report updated from file"
+
+        # Create new report if not exists
+        new_report = RadiologyReport(
+            serial_number=serial_number,
+            **report_data
+        )
+        db.add(new_report)
+        db.flush()
+        update_analytics(db, [new_report.id])
+        db.commit()
+        report_created(new_report.id, serial_number)
+        return "New report created from file"
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+        upload.close()
+
+
+def iter_entries(files):
+    """Yield (filename, size, upload or ZIP member) for every file, looking inside ZIP files"""
+    for upload in files:
+        name = upload.filename or ""
+        if name.lower().endswith(".zip"):
+            with zipfile.ZipFile(upload.file) as archive:
+                for member in archive.infolist():
+                    member_name = member.filename.rsplit("/", 1)[-1]
+                    if member.is_dir() or member_name.startswith("~$"):
+                        continue
+                    yield member_name, member.file_size, (archive, member)
+        else:
+            yield name, upload.size, upload
+
+
+def check_bulk_upload(files):
+    """Refuse (413) a bulk upload with too many documents, or one that unzips to
+    too much. ZIP sizes are the ones its directory declares: reading a member
+    never returns more than that, so the check holds for crafted archives too."""
+    count = 0
+    unpacked = 0
+    for name, size, _ in iter_entries(files):
+        if not name.lower().endswith(".docx") or size > UPLOAD_MAX_BYTES:
+            continue
+        count += 1
+        unpacked += size
+    if count > BULK_UPLOAD_MAX_FILES:
+        raise HTTPException(status_code=413, detail=f"More than {BULK_UPLOAD_MAX_FILES} documents")
+    if unpacked > BULK_UNPACKED_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="Documents are too large in total")
+
+
+def iter_documents(files):
+    """Yield (filename, bytes or None, error) for every file, looking inside ZIP files"""
+    for name, size, source in iter_entries(files):
+        if not name.lower().endswith(".docx"):
+            yield name, None, "Only .docx files allowed"
+        elif size > UPLOAD_MAX_BYTES:
+            yield name, None, "File is too large"
+        elif isinstance(source, tuple):
+            archive, member = source
+            yield name, archive.read(member), None
+        else:
+            yield name, source.file.read(), None
+
+
+def serial_for(filename):
+    """Serial for a bulk-uploaded file: its own for RAD-YYYYMMDD-N.docx names (so
+    the report is updated), otherwise a new one (a new report; files are not
+    matched on their content)"""
+    match = SERIAL_FILENAME.match(filename)
+    return match.group(1).upper() if match else generate_serial_number()
+
+
+def upsert_reports(db, rows):
+    """Insert or update many parsed reports with one statement; returns {serial: (id, created)}"""
+    table = RadiologyReport.__table__
+    serials = [row["serial_number"] for row in rows]
+    existing = {
+        serial for (serial,) in
+        db.query(RadiologyReport.serial_number).filter(RadiologyReport.serial_number.in_(serials))
+    }
+    old_keys = current_keys(db, RadiologyReport.serial_number.in_(serials))
+
+    stmt = dialect_insert(db.bind)(table).values(rows)
+    # Same rule as the single upload: empty values never overwrite stored ones
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.serial_number],
+        set_={
+            **{
+                column: func.coalesce(stmt.excluded[column], table.c[column])
+                for column in UPSERT_COLUMNS
+            },
+            # Column onupdate defaults do not apply to ON CONFLICT updates
+            "updated_at": datetime.now(),
+        },
+    ).returning(table.c.id, table.c.serial_number)
+
+    saved = {serial: (report_id, serial not in existing) for report_id, serial in db.execute(stmt)}
+    update_analytics(db, [report_id for report_id, _ in saved.values()], old_keys)
+    db.commit()
+
+    reports_created([(report_id, serial) for serial, (report_id, created) in saved.items() if created])
+    reports_changed([(report_id, serial) for serial, (report_id, created) in saved.items() if not created])
+    return saved
+
+
+def ingest_files(files):
+    """Parse uploaded .docx files in the process pool and save them in batches
+    (blocking; the route runs it in a worker thread with its own session).
+    Raises PoolSaturated when BULK_CONCURRENCY bulk operations are already running."""
+    check_bulk_upload(files)
+    with bulk_slot():
+        db = SessionLocal()
+        try:
+            return _ingest(db, files)
+        finally:
+            db.close()
+
+
+def _ingest(db, files):
+    pool = get_process_pool()
+    results = []
+    pending = deque()
+    batch = {}
+
+    def flush():
+        rows = [row for row, _ in batch.values()]
+        try:
+            saved = upsert_reports(db, rows)
+            for serial, (row, result) in batch.items():
+                report_id, created = saved[serial]
+                result.update(id=report_id, status="created" if created else "updated")
+        except Exception as e:
+            db.rollback()
+            for _, result in batch.values():
+                result.update(status="error", detail=str(e))
+        batch.clear()
+
+    def collect_oldest():
+        result, future = pending.popleft()
+        serial_number = result["serial_number"]
+
+        try:
+            report_data = future.result()
+        except Exception as e:
+            result.update(status="error", detail=f"Could not read document: {e}")
+            return
+
+        # A later file for the same serial replaces an earlier one in the batch
+        if serial_number in batch:
+            batch[serial_number][1].update(status="skipped", detail="Replaced by a later file")
+        batch[serial_number] = ({"serial_number": serial_number, **report_data}, result)
+        if len(batch) >= BATCH_SIZE:
+            flush()
+
+    for filename, content, error in iter_documents(files):
+        result = {"filename": filename}
+        results.append(result)
+        if error is not None:
+            result.update(status="error", detail=error)
+            continue
+
+        result["serial_number"] = serial_for(filename)
+        pending.append((result, pool.submit(extract_report, content)))
+        if len(pending) >= MAX_IN_FLIGHT:
+            collect_oldest()
+
+    while pending:
+        collect_oldest()
+    if batch:
+        flush()
+
+    return results
@@ -0,0 +1,285 @@
+"""
+Load test: seed N synthetic reports, then drive mixed traffic at the API and report
+throughput and p50/p95/p99 latency per endpoint.
+
+In-process against DATABASE_URL (a local Postgres, or sqlite:///... as a stand-in):
+    python loadtest.py --seed 10000 --concurrency 50 --seconds 30 --output run1.json
+Against a running server (e.g. uvicorn main:app --workers 4):
+    python loadtest.py --url http://localhost:8000/api --seed 10000
+Compare with an earlier run (exit code 1 if an endpoint regressed):
+    python loadtest.py --seed 10000 --output run2.json --compare run1.json
+Traffic mix as endpoint=weight pairs:
+    python loadtest.py --mix qr=50,view=30,export=20
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import time
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+import httpx
+
+# Endpoint -> share of requests
+DEFAULT_MIX = {
+    "list": 20,
+    "get": 20,
+    "qr": 15,
+    "view": 15,
+    "export": 10,
+    "update": 10,
+    "create": 5,
+    "upload": 5,
+}
+
+SCAN_TYPES = ("CT BRAIN", "MRI SPINE", "X-RAY CHEST", "USG ABDOMEN", "CT CHEST")
+DOCTORS = ("Dr Ahmed", "Dr Khan", "Dr Malik", "Dr Hussain")
+
+# A result counts as a regression when it is this much worse than the earlier run
+DEFAULT_TOLERANCE = 0.2
+
+
+def synthetic_report(n):
+    day = date(2024, 1, 1) + timedelta(days=n % 365)
+    return {
+        "uhid": f"UH{n:07d}",
+        "sl_no": str(n),
+        "reg_no": f"REG-{n}",
+        "patient_no": f"P-{n}",
+        "patient_name": f"Load Test Patient {n}",
+        "report_date": day.isoformat(),
+        "age_sex": f"{20 + n % 60}/{'M' if n % 2 else 'F'}",
+        "origin_ethe": "OPD",
+        "ref_by": DOCTORS[n % len(DOCTORS)],
+        "film_no": f"F-{n % 1000}",
+        "scan_time": "10:15 AM",
+        "report_time": "11:05 AM",
+        "tat": "50 min",
+        "scan_type": SCAN_TYPES[n % len(SCAN_TYPES)],
+        "doctor_description": "No focal lesion is seen. Ventricles and sulci are normal. " * 4,
+        "impression": "No acute abnormality.",
+    }
+
+
+def upload_document():
+    """A .docx like the ones the app exports, to send to the upload endpoint"""
+    from word_export import render_table_format
+    values = synthetic_report(0)
+    values["patient_name"] = "Uploaded Patient"
+    values["created_at"] = datetime.now()
+    return render_table_format(SimpleNamespace(**values))
+
+
+async def seed(client, count, batch_size):
+    """Create count reports through POST /reports/batch; returns [(id, serial_number)]"""
+    saved = []
+    for start in range(0, count, batch_size):
+        reports = [synthetic_report(n) for n in range(start, min(count, start + batch_size))]
+        response = await client.post("/reports/batch", json=reports)
+        response.raise_for_status()
+        saved.extend((item["id"], item["serial_number"]) for item in response.json()["reports"])
+    return saved
+
+
+class LoadTest:
+    def __init__(self, client, reports, mix, args):
+        self.client = client
+        self.reports = reports
+        self.endpoints = list(mix)
+        self.weights = [mix[name] for name in self.endpoints]
+        self.random = random.Random(args.random_seed)
+        self.document = upload_document() if "upload" in mix else None
+        self.next_report = len(reports)
+        # Endpoint -> list of latencies (seconds) and -> {status: count}
+        self.latencies = {name: [] for name in self.endpoints}
+        self.statuses = {name: {} for name in self.endpoints}
+
+    def request_for(self, endpoint):
+        report_id, serial = self.random.choice(self.reports)
+        if endpoint == "list":
+            return "GET", "/reports", {"params": {"limit": 50}}
+        if endpoint == "get":
+            return "GET", f"/reports/serial/{serial}", {}
+        if endpoint == "qr":
+            return "GET", f"/reports/serial/{serial}/qr", {}
+        if endpoint == "view":
+            return "GET", f"/view/{serial}", {}
+        if endpoint == "export":
+            return "GET", f"/reports/{report_id}/export", {}
+        if endpoint == "update":
+            return "PATCH", f"/reports/serial/{serial}", {"json": {"impression": f"Reviewed {time.time():.0f}."}}
+        if endpoint == "create":
+            self.next_report += 1
+            return "POST", "/reports", {"json": synthetic_report(self.next_report)}
+        if endpoint == "upload":
+            files = {"file": (f"{serial}.docx", self.document)}
+            return "POST", f"/reports/serial/{serial}/upload", {"files": files}
+        raise ValueError(f"Unknown endpoint {endpoint}")
+
+    async def worker(self, end):
+        while time.perf_counter() < end:
+            endpoint = self.random.choices(self.endpoints, self.weights)[0]
+            method, url, options = self.request_for(endpoint)
+            start = time.perf_counter()
+            try:
+                response = await self.client.request(method, url, **options)
+                await response.aread()
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = e.__class__.__name__
+            self.latencies[endpoint].append(time.perf_counter() - start)
+            self.statuses[endpoint][status] = self.statuses[endpoint].get(status, 0) + 1
+
+    async def run(self, concurrency, seconds):
+        start = time.perf_counter()
+        end = start + seconds
+        await asyncio.gather(*[self.worker(end) for _ in range(concurrency)])
+        return time.perf_counter() - start
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return None
+    index = max(0, min(len(values) - 1, int(round(pct / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def summarise(test, elapsed):
+    endpoints = {}
+    total = 0
+    for name in test.endpoints:
+        latencies = sorted(test.latencies[name])
+        count = len(latencies)
+        total += count
+        errors = sum(n for status, n in test.statuses[name].items() if not status.startswith(("2", "3")))
+        endpoints[name] = {
+            "requests": count,
+            "errors": errors,
+            "statuses": test.statuses[name],
+            "throughput": round(count / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2) if count else None,
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2) if count else None,
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2) if count else None,
+            "max_ms": round(latencies[-1] * 1000, 2) if count else None,
+        }
+    return {"requests": total, "throughput": round(total / elapsed, 2), "endpoints": endpoints}
+
+
+def print_summary(summary):
+    print(f"{'endpoint':<8} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, result in summary["endpoints"].items():
+        if not result["requests"]:
+            print(f"{name:<8} {0:>9}")
+            continue
+        print(
+            f"{name:<8} {result['requests']:>9} {result['errors']:>7} {result['throughput']:>9.1f} "
+            f"{result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f}"
+        )
+    print(f"{'total':<8} {summary['requests']:>9} {'':>7} {summary['throughput']:>9.1f}")
+
+
+def compare(summary, previous, tolerance):
+    """Print changes against an earlier run; returns the endpoints that got worse"""
+    regressions = []
+    print(f"\ncompared with {previous['started_at']} (tolerance {tolerance:.0%})")
+    for name, result in summary["endpoints"].items():
+        before = previous["endpoints"].get(name)
+        if not before or not before["requests"] or not result["requests"]:
+            continue
+        problems = []
+        if result["throughput"] < before["throughput"] * (1 - tolerance):
+            problems.append(f"throughput {before['throughput']:.1f} -> {result['throughput']:.1f} req/s")
+        for key in ("p95_ms", "p99_ms"):
+            if result[key] > before[key] * (1 + tolerance):
+                problems.append(f"{key[:3]} {before[key]:.1f} -> {result[key]:.1f} ms")
+        if result["errors"] > before["errors"]:
+            problems.append(f"errors {before['errors']} -> {result['errors']}")
+
+        if problems:
+            regressions.append(name)
+            print(f"  REGRESSION {name}: " + ", ".join(problems))
+        else:
+            change = (result["p95_ms"] - before["p95_ms"]) / before["p95_ms"] if before["p95_ms"] else 0
+            print(f"  ok {name}: p95 {before['p95_ms']:.1f} -> {result['p95_ms']:.1f} ms ({change:+.0%})")
+    return regressions
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint {name}; use {', '.join(DEFAULT_MIX)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def main(args):
+    if args.url:
+        target = args.url
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+    else:
+        from main import app
+        from database import DATABASE_URL
+        target = f"in-process ({DATABASE_URL.split('://')[0]})"
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest/api", timeout=args.timeout)
+
+    limits_note = f"{args.concurrency} concurrent clients for {args.seconds:g}s"
+    async with client:
+        start = time.perf_counter()
+        reports = await seed(client, args.seed, args.batch_size)
+        print(f"Seeded {len(reports)} reports in {time.perf_counter() - start:.1f}s; {limits_note} against {target}")
+
+        test = LoadTest(client, reports, args.mix, args)
+        started_at = datetime.now().isoformat(timespec="seconds")
+        elapsed = await test.run(args.concurrency, args.seconds)
+
+    summary = summarise(test, elapsed)
+    print_summary(summary)
+
+    result = {
+        "started_at": started_at,
+        "target": target,
+        "python": platform.python_version(),
+        "settings": {
+            "seed": args.seed,
+            "concurrency": args.concurrency,
+            "seconds": args.seconds,
+            "mix": args.mix,
+            "random_seed": args.random_seed,
+        },
+        **summary,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        if previous.get("settings") != result["settings"]:
+            print("Note: the earlier run used different settings:", previous.get("settings"))
+        if compare(result, previous, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="Running server, e.g. http://localhost:8000/api")
+    parser.add_argument("--seed", type=int, default=1000, help="Synthetic reports to create first")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Reports per POST /reports/batch while seeding")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="e.g. list=20,get=20,qr=15,export=10")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--random-seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Earlier results JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    raise SystemExit(asyncio.run(main(parser.parse_args())))
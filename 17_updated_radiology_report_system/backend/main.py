@@ -1,26 +1,54 @@
-import uvicorn
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from routes import router
-from models import Base
-from database import engine
-
-app = FastAPI(title="Radiology Report System")
-
-Base.metadata.create_all(bind=engine)
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-app.include_router(router, prefix="/api")
-
-@app.get("/")
-def home():
-    return {"message": "Radiology Report System API is running!"}
-
-if __name__ == "__main__":
+import uvicorn
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from routes import router
+from models import Base
+from database import engine, async_engine
+from migrations import apply_migrations
+from export_jobs import export_runner
+from report_events import report_events
+from workers import shutdown_pools
+from metrics import install, instrument_engine
+from http_cache import HttpCacheMiddleware
+
+
+# Background export workers and the live events broadcaster run while the server is up
+@asynccontextmanager
+async def lifespan(app):
+    export_runner.start()
+    await report_events.start()
+    yield
+    await report_events.stop()
+    export_runner.stop()
+    shutdown_pools()
+
+
+app = FastAPI(title="Radiology Report System", lifespan=lifespan)
+
+Base.metadata.create_all(bind=engine)
+apply_migrations()
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+app.include_router(router, prefix="/api")
+
+# ETag / 304 and compression for the JSON API; patient data is never stored by shared caches
+app.add_middleware(HttpCacheMiddleware, policies={"/api/qr-config": "public, max-age=300"})
+
+# Request latency, SQL statements and render/QR/parse spans; served on /metrics
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+install(app)
+
+@app.get("/")
+def home():
+    return {"message": "Radiology Report System API is running!"}
+
+if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,307 @@
+"""
+Request timing and Prometheus metrics for the FastAPI apps.
+
+    from metrics import install, instrument_engine, span
+    install(app)                  # middleware + GET /metrics
+    instrument_engine(engine)     # count SQL statements and DB time per request
+
+    with span("qr_encode"):       # or @timed("qr_encode") on a function
+        ...
+
+Every request records its total latency, number of SQL statements, DB time and
+the time spent in named spans. Totals are kept as histograms and served in the
+Prometheus text format on /metrics. Send the header "X-Timing-Debug: 1" (or set
+METRICS_DEBUG=1) to get the breakdown of one request back in a Server-Timing header.
+
+The same file is copied into each app folder. Numbers are per process: with
+several uvicorn workers, each worker serves its own /metrics.
+"""
+
+import contextvars
+import functools
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds in seconds for the latency histograms
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Upper bounds for the SQL-statements-per-request histogram
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+DEBUG_HEADER = b"x-timing-debug"
+METRICS_DEBUG = os.getenv("METRICS_DEBUG", "0") == "1"
+METRICS_PATH = "/metrics"
+
+# Route templates compiled to regexes, see route_label
+_route_patterns = {}
+
+# Timings of the request being served by this task / thread (None outside a request)
+_current = contextvars.ContextVar("request_timings", default=None)
+
+
+class Histogram:
+    """Prometheus histogram with labels; observe() is safe to call from any thread"""
+
+    def __init__(self, name, help_text, labelnames, buckets=TIME_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        # label values -> [count per bucket..., +Inf count, sum]
+        self.series = {}
+
+    def observe(self, value, *labels):
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            series = {labels: list(values) for labels, values in self.series.items()}
+        for labels, values in sorted(series.items()):
+            base = ",".join(f'{name}="{_label(value)}"' for name, value in zip(self.labelnames, labels))
+            prefix = base + "," if base else ""
+            for bound, count in zip(self.buckets, values):
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {values[-2]}')
+            lines.append(f"{self.name}_count{{{base}}} {values[-2]}")
+            lines.append(f"{self.name}_sum{{{base}}} {values[-1]:.6f}")
+        return "\n".join(lines)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time to serve a request", ("method", "route", "status")
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Time spent in SQL statements per request", ("method", "route")
+)
+REQUEST_DB_STATEMENTS = Histogram(
+    "http_request_db_statements", "SQL statements run per request", ("method", "route"), COUNT_BUCKETS
+)
+SPAN_SECONDS = Histogram(
+    "span_duration_seconds", "Time spent in a named span (rendering, QR encoding, parsing)", ("span",)
+)
+HISTOGRAMS = [REQUEST_SECONDS, REQUEST_DB_SECONDS, REQUEST_DB_STATEMENTS, SPAN_SECONDS]
+
+
+class RequestTimings:
+    """What one request spent its time on; shared with the threads it hands work to"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.db_seconds = 0.0
+        self.statements = 0
+        # span name -> [seconds, calls]
+        self.spans = {}
+
+    def add_statement(self, seconds):
+        with self.lock:
+            self.db_seconds += seconds
+            self.statements += 1
+
+    def add_span(self, name, seconds):
+        with self.lock:
+            total = self.spans.setdefault(name, [0.0, 0])
+            total[0] += seconds
+            total[1] += 1
+
+    def server_timing(self, total_seconds):
+        """Server-Timing header value, durations in milliseconds"""
+        with self.lock:
+            parts = [f'db;dur={self.db_seconds * 1000:.2f};desc="{self.statements} statements"']
+            for name, (seconds, calls) in self.spans.items():
+                parts.append(f'{name};dur={seconds * 1000:.2f};desc="{calls} calls"')
+        parts.append(f"total;dur={total_seconds * 1000:.2f}")
+        return ", ".join(parts)
+
+
+def current_timings():
+    return _current.get()
+
+
+@contextmanager
+def span(name):
+    """Time a block of code under a name, for this request and the span histogram"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        SPAN_SECONDS.observe(seconds, name)
+        timings = _current.get()
+        if timings is not None:
+            timings.add_span(name, seconds)
+
+
+def timed(name):
+    """Decorator form of span()"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_statement(seconds):
+    timings = _current.get()
+    if timings is not None:
+        timings.add_statement(seconds)
+
+
+def instrument_engine(engine):
+    """Count statements and DB time of a SQLAlchemy engine (for AsyncEngine pass .sync_engine)"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        record_statement(time.perf_counter() - conn.info["metrics_started"].pop())
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("metrics_started"):
+            record_statement(time.perf_counter() - conn.info["metrics_started"].pop())
+
+
+_psycopg2_connection = None
+
+
+def psycopg2_connection_factory():
+    """psycopg2 connection class whose cursors count statements and DB time:
+    psycopg2.connect(..., connection_factory=psycopg2_connection_factory())"""
+    global _psycopg2_connection
+    if _psycopg2_connection is not None:
+        return _psycopg2_connection
+
+    import psycopg2.extensions
+
+    cursor_classes = {}
+
+    def timed_cursor(base):
+        if base not in cursor_classes:
+            class TimedCursor(base):
+                def execute(self, query, vars=None):
+                    start = time.perf_counter()
+                    try:
+                        return super().execute(query, vars)
+                    finally:
+                        record_statement(time.perf_counter() - start)
+
+                def executemany(self, query, vars_list):
+                    start = time.perf_counter()
+                    try:
+                        return super().executemany(query, vars_list)
+                    finally:
+                        record_statement(time.perf_counter() - start)
+
+            cursor_classes[base] = TimedCursor
+        return cursor_classes[base]
+
+    class TimedConnection(psycopg2.extensions.connection):
+        def cursor(self, *args, **kwargs):
+            # Keeps a cursor_factory the caller asked for (e.g. RealDictCursor)
+            base = kwargs.pop("cursor_factory", None) or self.cursor_factory or psycopg2.extensions.cursor
+            return super().cursor(*args, cursor_factory=timed_cursor(base), **kwargs)
+
+    _psycopg2_connection = TimedConnection
+    return TimedConnection
+
+
+def route_label(scope):
+    """Path template of the route that served the request, e.g. /api/reports/{report_id}.
+    A route's path leaves out the prefix its router was included with, so that is
+    taken from the request path: whatever comes before the part the template matched."""
+    template = getattr(scope.get("route"), "path", None)
+    if template is None:
+        return "unmatched"
+
+    pattern = _route_patterns.get(template)
+    if pattern is None:
+        pattern = re.escape(template)
+        pattern = re.sub(r"\\\{[^}]*:path\\\}", ".+", pattern)
+        pattern = re.sub(r"\\\{[^}]*\\\}", "[^/]+", pattern)
+        pattern = _route_patterns[template] = re.compile(pattern + "$")
+
+    path = scope["path"]
+    root_path = scope.get("root_path", "")
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    match = pattern.search(path)
+    return (path[:match.start()] if match else "") + template
+
+
+class MetricsMiddleware:
+    """ASGI middleware: times every HTTP request and records it in the histograms"""
+
+    def __init__(self, app, debug=METRICS_DEBUG):
+        self.app = app
+        self.debug = debug
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        debug = self.debug or any(name == DEBUG_HEADER and value != b"0" for name, value in scope["headers"])
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if debug:
+                    # Timing up to the first byte; streamed bodies are not included
+                    header = timings.server_timing(time.perf_counter() - start)
+                    message["headers"] = list(message.get("headers", [])) + [(b"server-timing", header.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            seconds = time.perf_counter() - start
+            # The route template keeps the label set small (/reports/{id}, not every id)
+            route = route_label(scope)
+            method = scope["method"]
+            REQUEST_SECONDS.observe(seconds, method, route, status)
+            REQUEST_DB_SECONDS.observe(timings.db_seconds, method, route)
+            REQUEST_DB_STATEMENTS.observe(timings.statements, method, route)
+            _current.reset(token)
+
+
+def render_metrics():
+    return "\n\n".join(histogram.render() for histogram in HISTOGRAMS) + "\n"
+
+
+def install(app, path=METRICS_PATH):
+    """Add the middleware and the Prometheus endpoint to a FastAPI app"""
+    from fastapi.responses import PlainTextResponse
+
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get(path, include_in_schema=False)
+    def metrics():
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
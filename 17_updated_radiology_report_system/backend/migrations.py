@@ -0,0 +1,72 @@
+from sqlalchemy import text, inspect
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.orm import Session
+from database import engine
+from models import RadiologyReport, ExportJob
+from analytics import rebuild_analytics
+
+
+# Full-text search support (Postgres only). search_vector is a generated
+# column, so Postgres keeps it up to date on every INSERT and UPDATE.
+POSTGRES_STATEMENTS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    ALTER TABLE radiology_reports ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(patient_name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(scan_type, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(impression, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(doctor_description, '')), 'C')
+    ) STORED
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_radiology_reports_search_vector
+    ON radiology_reports USING GIN (search_vector)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_radiology_reports_patient_name_trgm
+    ON radiology_reports USING GIN (patient_name gin_trgm_ops)
+    """,
+    # Close matches in patient lookups (trigram word similarity)
+    """
+    CREATE INDEX IF NOT EXISTS ix_radiology_reports_patient_no_trgm
+    ON radiology_reports USING GIN (patient_no gin_trgm_ops)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_radiology_reports_reg_no_trgm
+    ON radiology_reports USING GIN (reg_no gin_trgm_ops)
+    """,
+]
+
+
+# Columns added to a model after its table was created (all nullable)
+def add_missing_columns(conn, table):
+    existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+    for column in table.columns:
+        if column.name not in existing:
+            column_type = column.type.compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
+
+# create_all() only builds missing tables, so columns and indexes added to an
+# existing table have to be created here. Every step is safe to run on each startup.
+# On a large live table, build new indexes first with CREATE INDEX CONCURRENTLY
+# under the same name; these steps then find them and skip them.
+def apply_migrations():
+    with engine.begin() as conn:
+        add_missing_columns(conn, RadiologyReport.__table__)
+        add_missing_columns(conn, ExportJob.__table__)
+
+        # IF NOT EXISTS rather than checkfirst: reflection does not see
+        # expression indexes such as lower(patient_name) on every database
+        for table in (RadiologyReport.__table__, ExportJob.__table__):
+            for index in table.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+
+        if engine.dialect.name == "postgresql":
+            for statement in POSTGRES_STATEMENTS:
+                conn.execute(text(statement))
+
+    # Reports saved before the analytics columns existed
+    with Session(engine) as db, db.begin():
+        rebuild_analytics(db)
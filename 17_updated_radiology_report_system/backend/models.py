@@ -1,31 +1,129 @@
-from sqlalchemy import Column, Integer, String, Text, Date, DateTime
-from datetime import datetime
-from database import Base
-
-class RadiologyReport(Base):
-    __tablename__ = "radiology_reports"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    serial_number = Column(String(50), unique=True, nullable=False)
-    
-    uhid = Column(String(50))
-    sl_no = Column(String(50))
-    reg_no = Column(String(50))
-    patient_no = Column(String(50))
-    patient_name = Column(String(255), nullable=False)
-    
-    report_date = Column(Date)
-    age_sex = Column(String(50))
-    origin_ethe = Column(String(100))
-    ref_by = Column(String(255))
-    
-    film_no = Column(String(50))
-    scan_time = Column(String(50))
-    report_time = Column(String(50))
-    tat = Column(String(50))
-    scan_type = Column(String(100))
-    
-    doctor_description = Column(Text)
-    impression = Column(Text)
-    
-    created_at = Column(DateTime, default=datetime.now)
\ No newline at end of file
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Float, JSON, Index, func
+from datetime import datetime
+from database import Base
+
+class RadiologyReport(Base):
+    __tablename__ = "radiology_reports"
+    __table_args__ = (
+        # Keyset pagination of the reports list walks (created_at, id) newest first
+        Index("ix_radiology_reports_created_at_id", "created_at", "id"),
+        Index("ix_radiology_reports_scan_type_created_at_id", "scan_type", "created_at", "id"),
+        Index("ix_radiology_reports_report_date_created_at_id", "report_date", "created_at", "id"),
+        # Summary rows are rebuilt from one day and scan type at a time
+        Index("ix_radiology_reports_stat_day_scan_type", "stat_day", "scan_type"),
+        # A patient's timeline walks (stat_day, id) newest first within one uhid
+        Index("ix_radiology_reports_uhid_stat_day_id", "uhid", "stat_day", "id"),
+        # Exact and prefix lookups (LIKE 'abc%'); pattern ops make Postgres use the
+        # index for LIKE whatever the database collation
+        Index("ix_radiology_reports_patient_no", "patient_no", postgresql_ops={"patient_no": "varchar_pattern_ops"}),
+        Index("ix_radiology_reports_reg_no", "reg_no", postgresql_ops={"reg_no": "varchar_pattern_ops"}),
+        # Rows changed since a client's last sync
+        Index("ix_radiology_reports_updated_at", "updated_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    serial_number = Column(String(50), unique=True, nullable=False)
+    
+    uhid = Column(String(50))
+    sl_no = Column(String(50))
+    reg_no = Column(String(50))
+    patient_no = Column(String(50))
+    patient_name = Column(String(255), nullable=False)
+    
+    report_date = Column(Date)
+    age_sex = Column(String(50))
+    origin_ethe = Column(String(100))
+    ref_by = Column(String(255))
+    
+    film_no = Column(String(50))
+    scan_time = Column(String(50))
+    report_time = Column(String(50))
+    tat = Column(String(50))
+    scan_type = Column(String(100))
+    
+    doctor_description = Column(Text)
+    impression = Column(Text)
+    
+    created_at = Column(DateTime, default=datetime.now)
+    # Set on every INSERT and UPDATE (ON CONFLICT upserts set it themselves)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    # Parsed from scan_time, report_time and tat when the report is written (see analytics.py)
+    scan_at = Column(DateTime)
+    report_at = Column(DateTime)
+    tat_minutes = Column(Float)
+    stat_day = Column(Date)
+
+
+# Name prefix lookups in any case (an expression index, so it is declared after the columns)
+Index(
+    "ix_radiology_reports_patient_name_lower",
+    func.lower(RadiologyReport.patient_name).label("lower_name"),
+    postgresql_ops={"lower_name": "text_pattern_ops"},
+)
+
+
+class ReportTombstone(Base):
+    __tablename__ = "report_tombstones"
+
+    # Deleted reports, kept for TOMBSTONE_KEEP_DAYS so clients syncing the
+    # reports list find out about them
+    id = Column(Integer, primary_key=True)
+    report_id = Column(Integer, nullable=False)
+    serial_number = Column(String(50), nullable=False)
+    deleted_at = Column(DateTime, nullable=False, default=datetime.now, index=True)
+
+
+class ReportDailyStats(Base):
+    __tablename__ = "report_daily_stats"
+
+    # One row per day and scan type ("" when the scan type is empty)
+    day = Column(Date, primary_key=True)
+    scan_type = Column(String(100), primary_key=True)
+
+    report_count = Column(Integer, nullable=False)
+    tat_count = Column(Integer, nullable=False)
+    tat_mean = Column(Float)
+    tat_p50 = Column(Float)
+    tat_p90 = Column(Float)
+    # {"Dr. Ahmed": 12, ...}
+    referrers = Column(JSON)
+    updated_at = Column(DateTime)
+
+
+class SerialCounter(Base):
+    __tablename__ = "serial_counters"
+
+    # Highest serial number handed out so far for each day
+    day = Column(Date, primary_key=True)
+    last_value = Column(Integer, nullable=False)
+
+
+class ExportJob(Base):
+    __tablename__ = "export_jobs"
+    __table_args__ = (
+        # Workers claim the oldest queued job
+        Index("ix_export_jobs_status_id", "status", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    status = Column(String(20), nullable=False, default="queued")
+    format = Column(String(10), nullable=False)
+
+    # What to export: one report, or every report in a date range
+    serial_number = Column(String(50))
+    date_from = Column(Date)
+    date_to = Column(Date)
+
+    created_at = Column(DateTime, default=datetime.now)
+    started_at = Column(DateTime)
+    # Renewed by the runner while the job runs
+    heartbeat_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    attempts = Column(Integer, nullable=False, default=0)
+    worker = Column(String(100))
+
+    file_name = Column(String(255))
+    file_size = Column(Integer)
+    report_count = Column(Integer)
+    error = Column(Text)
@@ -0,0 +1,124 @@
+from sqlalchemy import select, func, literal, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import RadiologyReport
+
+
+# Fields a patient can be looked up by
+LOOKUP_FIELDS = {
+    "patient_no": RadiologyReport.patient_no,
+    "reg_no": RadiologyReport.reg_no,
+    "patient_name": RadiologyReport.patient_name,
+}
+
+# Close matches (pg_trgm) need at least this many characters to mean anything
+FUZZY_MIN_LENGTH = 3
+
+TIMELINE_COLUMNS = (
+    RadiologyReport.id,
+    RadiologyReport.serial_number,
+    RadiologyReport.uhid,
+    RadiologyReport.patient_name,
+    RadiologyReport.patient_no,
+    RadiologyReport.report_date,
+    RadiologyReport.age_sex,
+    RadiologyReport.scan_type,
+    RadiologyReport.created_at,
+    # Report date, or the day of the scan / entry for reports without one
+    RadiologyReport.stat_day,
+)
+
+MATCH_COLUMNS = (
+    RadiologyReport.id,
+    RadiologyReport.serial_number,
+    RadiologyReport.uhid,
+    RadiologyReport.patient_name,
+    RadiologyReport.patient_no,
+    RadiologyReport.reg_no,
+    RadiologyReport.report_date,
+    RadiologyReport.scan_type,
+)
+
+
+async def patient_timeline(db: AsyncSession, uhid, limit, after=None):
+    """One page of a patient's reports, newest first. Walks the (uhid, stat_day, id)
+    index, so the cost depends on the page size and not on the size of the table.
+    after is the (stat_day, id) of the last row of the previous page."""
+    query = select(*TIMELINE_COLUMNS).where(RadiologyReport.uhid == uhid)
+    if after:
+        query = query.where(tuple_(RadiologyReport.stat_day, RadiologyReport.id) < tuple_(*after))
+
+    return (await db.execute(query.order_by(
+        RadiologyReport.stat_day.desc(),
+        RadiologyReport.id.desc()
+    ).limit(limit))).all()
+
+
+def escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def prefix_query(dialect, field, q, limit):
+    # Identifiers match as stored, names in any case
+    if field == "patient_name":
+        key, q = func.lower(LOOKUP_FIELDS[field]), q.lower()
+    else:
+        key = LOOKUP_FIELDS[field]
+
+    if dialect.name == "postgresql":
+        # Sorting with the pattern operator lets Postgres read the matches in
+        # order from the *_pattern_ops index and stop after limit rows
+        condition = key.like(escape_like(q) + "%", escape="\\")
+        order = text(f"{key.compile(dialect=dialect)} USING ~<~")
+    else:
+        # SQLite's LIKE ignores case, so it cannot use the index; the same
+        # prefix as a range of the (binary sorted) index can
+        condition = (key >= q) & (key < q + "\U0010ffff")
+        order = key
+
+    return (
+        select(*MATCH_COLUMNS, literal(field).label("field"), literal(1.0).label("score"))
+        .where(condition)
+        .order_by(order)
+        .limit(limit)
+    )
+
+
+async def _fuzzy_matches(db, field, q, limit):
+    column = LOOKUP_FIELDS[field]
+
+    if db.bind.dialect.name != "postgresql":
+        # The local SQLite stand-in gets an unranked substring scan
+        return (await db.execute(
+            select(*MATCH_COLUMNS, literal(field).label("field"), literal(0.0).label("score"))
+            .where(column.ilike("%" + escape_like(q) + "%", escape="\\"))
+            .order_by(RadiologyReport.id.desc())
+            .limit(limit)
+        )).all()
+
+    # Misspellings and partial words: q is like some word of the value (the %>
+    # operator, answered from the trigram index)
+    score = func.word_similarity(q, column)
+    return (await db.execute(
+        select(*MATCH_COLUMNS, literal(field).label("field"), score.label("score"))
+        .where(column.op("%>")(q))
+        .order_by(score.desc(), RadiologyReport.id.desc())
+        .limit(limit)
+    )).all()
+
+
+async def lookup_patients(db: AsyncSession, q, fields, limit):
+    """Reports whose patient_no, reg_no or patient_name starts with q, then (when
+    there are fewer than limit) close matches, best first; one result per report"""
+    results = {}
+    for field in fields:
+        for row in (await db.execute(prefix_query(db.bind.dialect, field, q, limit))).all():
+            results.setdefault(row.id, row)
+
+    if len(results) < limit and len(q) >= FUZZY_MIN_LENGTH:
+        fuzzy = []
+        for field in fields:
+            fuzzy.extend(row for row in await _fuzzy_matches(db, field, q, limit) if row.id not in results)
+        for row in sorted(fuzzy, key=lambda row: -row.score):
+            results.setdefault(row.id, row)
+
+    return list(results.values())[:limit]
@@ -1,34 +1,86 @@
-import qrcode
-from io import BytesIO
-from datetime import datetime
-import random
-import socket
-
-def generate_serial_number():
-    """Generate unique serial number: RAD-20260212-1234"""
-    date = datetime.now().strftime("%Y%m%d")
-    random_num = random.randint(1000, 9999)
-    return f"RAD-{date}-{random_num}"
-
-def get_server_ip():
-    """Get local LAN IP address of the server"""
-    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    try:
-        s.connect(("8.8.8.8", 80))
-        ip = s.getsockname()[0]
-    except:
-        ip = "127.0.0.1"
-    finally:
-        s.close()
-    return ip
-
-def create_qr_code(serial_number):
-    """Create QR code image and return as bytes (generated on-the-fly)"""
-    server_ip = get_server_ip()
-    url = f"http://{server_ip}:8000/api/view/{serial_number}"
-    
-    qr = qrcode.make(url)
-    
-    buffer = BytesIO()
-    qr.save(buffer, format="PNG")
-    return buffer.getvalue()
\ No newline at end of file
+import qrcode
+import qrcode.image.svg
+import hashlib
+from io import BytesIO
+import socket
+from starlette.concurrency import run_in_threadpool
+from metrics import span
+from workers import run_render
+from cache import MemoryLRU, DiskCache, TieredCache
+from config import PUBLIC_BASE_URL, QR_CACHE_MEMORY_BYTES, QR_CACHE_DIR, QR_CACHE_DISK_BYTES
+
+QR_MEDIA_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+def get_server_ip():
+    """Get local LAN IP address of the server"""
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.connect(("8.8.8.8", 80))
+        ip = s.getsockname()[0]
+    except:
+        ip = "127.0.0.1"
+    finally:
+        s.close()
+    return ip
+
+# Resolved once when the server starts, not on every request
+BASE_URL = (PUBLIC_BASE_URL or f"http://{get_server_ip()}:8000").rstrip("/")
+
+# Part of every cache key and of the image URLs browsers may keep for good (?v=),
+# so changing the base URL never serves old images
+BASE_URL_KEY = hashlib.sha1(BASE_URL.encode()).hexdigest()[:12]
+
+qr_cache = TieredCache(
+    MemoryLRU(QR_CACHE_MEMORY_BYTES),
+    DiskCache(QR_CACHE_DIR, QR_CACHE_DISK_BYTES) if QR_CACHE_DIR else None,
+)
+
+def report_url(serial_number):
+    return f"{BASE_URL}/api/view/{serial_number}"
+
+def qr_etag(serial_number, fmt):
+    """The image only depends on the URL and format, so the ETag can be computed without it"""
+    digest = hashlib.sha1(f"{report_url(serial_number)}|{fmt}".encode()).hexdigest()
+    return f'"{digest}"'
+
+def get_cached_qr(serial_number, fmt="png"):
+    return qr_cache.get(serial_number, f"{BASE_URL_KEY}.{fmt}")
+
+def create_qr_code(serial_number, fmt="png"):
+    """Create QR code image (PNG or SVG) and return as bytes, cached per serial number"""
+    qr_bytes = get_cached_qr(serial_number, fmt)
+    if qr_bytes is not None:
+        return qr_bytes
+
+    with span("qr_encode"):
+        qr_bytes = encode_qr(report_url(serial_number), fmt)
+    qr_cache.set(serial_number, f"{BASE_URL_KEY}.{fmt}", qr_bytes)
+    return qr_bytes
+
+async def create_qr_code_async(serial_number, fmt="png"):
+    """Same as create_qr_code for the API routes: encoded in the render process pool
+    (raises PoolSaturated when it is full)"""
+    # The disk tier (QR_CACHE_DIR) reads, writes and evicts files; keep it off the event loop
+    qr_bytes = await run_in_threadpool(get_cached_qr, serial_number, fmt)
+    if qr_bytes is not None:
+        return qr_bytes
+
+    with span("qr_encode"):
+        qr_bytes = await run_render(encode_qr, report_url(serial_number), fmt)
+    await run_in_threadpool(qr_cache.set, serial_number, f"{BASE_URL_KEY}.{fmt}", qr_bytes)
+    return qr_bytes
+
+def encode_qr(url, fmt="png"):
+    """QR image bytes for a URL (no caching; safe to run in a worker process)"""
+    # SVG skips rasterising and PNG compression, so it is cheaper to produce
+    if fmt == "svg":
+        qr = qrcode.make(url, image_factory=qrcode.image.svg.SvgPathImage)
+    else:
+        qr = qrcode.make(url)
+    
+    buffer = BytesIO()
+    qr.save(buffer)
+    return buffer.getvalue()
+
+def invalidate_qr(serial_number):
+    qr_cache.invalidate(serial_number)
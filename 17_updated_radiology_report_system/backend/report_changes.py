@@ -0,0 +1,123 @@
+import base64
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete, func
+from export_cache import invalidate_export, delete_export
+from qr_generator import invalidate_qr
+from view_cache import invalidate_page
+from report_events import report_events, CREATED, UPDATED, DELETED
+from models import RadiologyReport, ReportTombstone
+from config import SYNC_OVERLAP_SECONDS, SYNC_MAX_CHANGES, TOMBSTONE_KEEP_DAYS
+
+SYNC_OVERLAP = timedelta(seconds=SYNC_OVERLAP_SECONDS)
+TOMBSTONE_KEEP = timedelta(days=TOMBSTONE_KEEP_DAYS)
+
+
+# Called after a report is created, updated or deleted and the change is committed
+def report_created(report_id, serial_number):
+    reports_created([(report_id, serial_number)])
+
+
+def report_changed(report_id, serial_number):
+    reports_changed([(report_id, serial_number)])
+
+
+def report_deleted(report_id, serial_number, digest):
+    """Also removes the deleted report's export file (blocking file I/O)"""
+    _invalidate(report_id, serial_number)
+    delete_export(report_id, digest)
+    invalidate_qr(serial_number)
+    report_events.publish(DELETED, [(report_id, serial_number)])
+
+
+# Same for many reports written at once, as (id, serial) pairs
+def reports_created(reports):
+    # Nothing to invalidate: serials are never reused, and an id SQLite reuses
+    # had its entries dropped when its report was deleted
+    report_events.publish(CREATED, reports)
+
+
+def reports_changed(reports):
+    for report_id, serial_number in reports:
+        _invalidate(report_id, serial_number)
+    report_events.publish(UPDATED, reports)
+
+
+def _invalidate(report_id, serial_number):
+    invalidate_export(report_id)
+    invalidate_page(serial_number)
+
+
+# Called in the deleting transaction, so the tombstone commits with the delete
+async def add_tombstone(db, report_id, serial_number):
+    now = datetime.now()
+    db.add(ReportTombstone(report_id=report_id, serial_number=serial_number, deleted_at=now))
+    await db.execute(delete(ReportTombstone).where(ReportTombstone.deleted_at < now - TOMBSTONE_KEEP))
+
+
+# A sync token is the time of the latest write the database had seen when a
+# list or sync query started (the same token while nothing changes, so those
+# responses stay byte-identical and can be answered with 304 Not Modified)
+def encode_sync_token(latest_write):
+    return base64.urlsafe_b64encode(latest_write.isoformat().encode()).decode()
+
+
+def decode_sync_token(token):
+    try:
+        return datetime.fromisoformat(base64.urlsafe_b64decode(token.encode()).decode())
+    except Exception:
+        raise ValueError("Invalid sync token")
+
+
+async def latest_writes(db):
+    """(latest updated_at, latest deleted_at), from the ends of their indexes"""
+    latest_delete = select(func.max(ReportTombstone.deleted_at)).scalar_subquery()
+    return (await db.execute(select(func.max(RadiologyReport.updated_at), latest_delete))).one()
+
+
+def token_for(latest_update, latest_delete):
+    latest = [value for value in (latest_update, latest_delete) if value is not None]
+    # datetime.min: nothing written yet, every later write is a change
+    return encode_sync_token(max(latest, default=datetime.min))
+
+
+async def sync_token(db):
+    return token_for(*await latest_writes(db))
+
+
+async def changes_since(db, since, columns):
+    """Reports written and report ids deleted since the token time, as
+    (rows, deleted ids, new token), or None when the client should reload the list
+    (deletes it needs may have been pruned, or there are too many changes).
+
+    Rows written up to SYNC_OVERLAP before the token are sent again: a transaction
+    can write a row before one sync starts and commit after it has finished.
+    Applying a row twice does nothing, so the overlap costs a few repeated rows."""
+    latest_update, latest_delete = await latest_writes(db)
+    # Each delete prunes the tombstones older than TOMBSTONE_KEEP before it
+    if latest_delete is not None and since < latest_delete - TOMBSTONE_KEEP:
+        return None
+    window = since - SYNC_OVERLAP
+
+    rows = (await db.execute(
+        select(*columns)
+        .where(RadiologyReport.updated_at >= window)
+        .order_by(RadiologyReport.updated_at, RadiologyReport.id)
+        .limit(SYNC_MAX_CHANGES + 1)
+    )).all()
+    if len(rows) > SYNC_MAX_CHANGES:
+        return None
+
+    # A deleted id can come back on SQLite, which reuses the highest rowid;
+    # the row that exists now wins
+    current = {row.id for row in rows}
+    deleted = (await db.execute(
+        select(ReportTombstone.report_id)
+        .where(ReportTombstone.deleted_at >= window)
+        .order_by(ReportTombstone.id)
+        .limit(SYNC_MAX_CHANGES + 1)
+    )).scalars().all()
+    if len(deleted) > SYNC_MAX_CHANGES:
+        return None
+    deleted = list(dict.fromkeys(report_id for report_id in deleted if report_id not in current))
+
+    return rows, deleted, token_for(latest_update, latest_delete)
@@ -0,0 +1,215 @@
+"""
+Live report events for the reports page (GET /api/reports/events, Server-Sent Events).
+
+Every app process runs one broadcaster. A report write calls publish(), which
+hands the event to every client connected to this process; on Postgres it is
+also sent with NOTIFY, and every other process LISTENs and hands it to its own
+clients. The events only say what changed (created / updated / deleted, id and
+serial); the page then fetches the rows through /api/reports/changes.
+
+Each client has a small queue. A client that stops reading fills it; its
+backlog is then dropped for a single "reset" event, which makes the page sync
+once instead of replaying every event it missed. Idle clients cost a queue and
+a parked coroutine each, and one heartbeat task keeps all of their connections
+alive, so a worker holds thousands of them (raise the open files limit to match).
+"""
+
+import asyncio
+import json
+import logging
+import signal
+import threading
+from sqlalchemy.engine import make_url
+from config import (
+    ASYNC_DATABASE_URL, EVENTS_CHANNEL, EVENTS_CLIENT_BUFFER, EVENTS_MAX_CLIENTS,
+    EVENTS_HEARTBEAT_SECONDS, EVENTS_RETRY_MS,
+)
+
+CREATED = "created"
+UPDATED = "updated"
+DELETED = "deleted"
+RESET = "reset"
+
+logger = logging.getLogger(__name__)
+
+# Seconds between attempts to get the LISTEN connection back
+RECONNECT_SECONDS = 5
+
+# Events waiting to be sent with NOTIFY before new ones are dropped
+OUTBOX_SIZE = 10000
+
+
+def sse_frame(event_type, data):
+    return f"event: {event_type}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+HEARTBEAT = b": ping\n\n"
+RESET_FRAME = sse_frame(RESET, {})
+
+
+def event_frame(event):
+    if event["type"] == RESET:
+        return RESET_FRAME
+    return sse_frame(event["type"], {"id": event["id"], "serial_number": event["serial_number"]})
+
+
+class ReportEvents:
+    """Fans report events out to this process's SSE clients and to the other app processes"""
+
+    def __init__(self, url=ASYNC_DATABASE_URL):
+        self.url = make_url(url)
+        self.loop = None
+        self.clients = set()
+        self.tasks = []
+        self.outbox = None
+        self.closing = False
+        self.signal_handlers = {}
+
+    async def start(self):
+        if self.loop is not None:
+            return
+        self.loop = asyncio.get_running_loop()
+        self.closing = False
+        self.tasks.append(asyncio.create_task(self._heartbeat()))
+        if self.url.get_backend_name() == "postgresql":
+            self.outbox = asyncio.Queue(OUTBOX_SIZE)
+            self.tasks.append(asyncio.create_task(self._listen()))
+
+        # uvicorn waits for open responses to finish before it shuts down, and an
+        # event stream never does: end the streams as soon as the server is told to stop
+        if threading.current_thread() is threading.main_thread():
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                previous = signal.getsignal(sig)
+                if callable(previous):
+                    self.signal_handlers[sig] = previous
+                    signal.signal(sig, self._on_exit_signal)
+
+    async def stop(self):
+        for sig, previous in self.signal_handlers.items():
+            signal.signal(sig, previous)
+        self.signal_handlers = {}
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        self.loop = None
+        self.outbox = None
+
+    def _on_exit_signal(self, sig, frame):
+        self.loop.call_soon_threadsafe(self._close_streams)
+        self.signal_handlers[sig](sig, frame)
+
+    def _close_streams(self):
+        self.closing = True
+        for queue in self.clients:
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+    def full(self):
+        return self.closing or len(self.clients) >= EVENTS_MAX_CLIENTS
+
+    def publish(self, event_type, reports):
+        """Called with the (id, serial) of the reports a write changed, after it
+        commits; safe from any thread. More reports than a client's queue holds
+        go out as one reset, so a batch costs every page one sync. Does nothing
+        outside the server (scripts), where nobody is listening."""
+        loop = self.loop
+        if loop is None or not reports:
+            return
+        if len(reports) > EVENTS_CLIENT_BUFFER:
+            events = [{"type": RESET}]
+        else:
+            events = [{"type": event_type, "id": report_id, "serial_number": serial} for report_id, serial in reports]
+
+        try:
+            if asyncio.get_running_loop() is loop:
+                self._publish(events)
+                return
+        except RuntimeError:
+            pass
+        loop.call_soon_threadsafe(self._publish, events)
+
+    def _publish(self, events):
+        for event in events:
+            self._deliver(event_frame(event))
+            if self.outbox is not None:
+                try:
+                    self.outbox.put_nowait(json.dumps(event, separators=(",", ":")))
+                except asyncio.QueueFull:
+                    # Postgres is unreachable or far behind; other processes' clients
+                    # get a reset when the listener reconnects
+                    pass
+
+    def _deliver(self, frame, droppable=False):
+        # The frame is encoded once and the same bytes are queued for every client
+        for queue in self.clients:
+            try:
+                queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                if droppable:
+                    continue
+                # This client stopped reading: swap its backlog for one reset
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESET_FRAME)
+
+    async def stream(self):
+        """Body of one SSE response"""
+        queue = asyncio.Queue(EVENTS_CLIENT_BUFFER)
+        self.clients.add(queue)
+        try:
+            # How long the browser waits before reconnecting after a drop
+            yield f"retry: {EVENTS_RETRY_MS}\n\n".encode()
+            while True:
+                frame = await queue.get()
+                if frame is None:
+                    return
+                yield frame
+        finally:
+            self.clients.discard(queue)
+
+    async def _heartbeat(self):
+        # Comment lines keep proxies from closing idle connections and find dead ones
+        while True:
+            await asyncio.sleep(EVENTS_HEARTBEAT_SECONDS)
+            self._deliver(HEARTBEAT, droppable=True)
+
+    async def _listen(self):
+        import asyncpg
+
+        # asyncpg takes a plain postgresql:// URL, not SQLAlchemy's +asyncpg one
+        dsn = self.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                own_pid = connection.get_server_pid()
+
+                def on_notify(_, pid, channel, payload):
+                    # Our own events were delivered when they were published
+                    if pid != own_pid:
+                        self._deliver(event_frame(json.loads(payload)))
+
+                await connection.add_listener(EVENTS_CHANNEL, on_notify)
+                # Other processes' events may have been missed while we were not listening
+                self._deliver(RESET_FRAME)
+
+                # Events are sent on the listening connection, one at a time
+                while not connection.is_closed():
+                    try:
+                        payload = await asyncio.wait_for(self.outbox.get(), RECONNECT_SECONDS)
+                    except asyncio.TimeoutError:
+                        continue
+                    await connection.execute("SELECT pg_notify($1, $2)", EVENTS_CHANNEL, payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Report events listener error: %s", e)
+            finally:
+                if connection is not None:
+                    connection.terminate()
+            await asyncio.sleep(RECONNECT_SECONDS)
+
+
+report_events = ReportEvents()
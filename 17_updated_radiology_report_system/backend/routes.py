@@ -1,329 +1,1012 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, File, UploadFile
-from fastapi.responses import StreamingResponse, Response, HTMLResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from typing import Optional
-from database import get_db
-from models import RadiologyReport
-from word_export import create_table_format
-from qr_generator import generate_serial_number, create_qr_code
-from docx import Document
-from io import BytesIO
-from datetime import datetime
-
-templates = Jinja2Templates(directory="templates")
-router = APIRouter()
-
-class ReportCreate(BaseModel):
-    uhid: Optional[str] = None
-    sl_no: Optional[str] = None
-    reg_no: Optional[str] = None
-    patient_no: Optional[str] = None
-    patient_name: str
-    report_date: Optional[str] = None
-    age_sex: Optional[str] = None
-    origin_ethe: Optional[str] = None
-    ref_by: Optional[str] = None
-    film_no: Optional[str] = None
-    scan_time: Optional[str] = None
-    report_time: Optional[str] = None
-    tat: Optional[str] = None
-    scan_type: Optional[str] = None
-    doctor_description: Optional[str] = None
-    impression: Optional[str] = None
-
-
-# Create a new radiology report with auto-generated serial number
-@router.post("/reports")
-def create_report(report: ReportCreate, db: Session = Depends(get_db)):
-    try:
-        serial_number = generate_serial_number()
-        
-        new_report = RadiologyReport(
-            **report.dict(),
-            serial_number=serial_number
-        )
-        
-        db.add(new_report)
-        db.commit()
-        db.refresh(new_report)
-        
-        return {
-            "success": True,
-            "id": new_report.id,
-            "serial_number": serial_number,
-            "message": "Report created successfully"
-        }
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-# Get all reports for displaying in reports table
-@router.get("/reports")
-def get_all_reports(db: Session = Depends(get_db)):
-    try:
-        reports = db.query(RadiologyReport).order_by(
-            RadiologyReport.created_at.desc()
-        ).all()
-        
-        reports_list = []
-        for report in reports:
-            reports_list.append({
-                "id": report.id,
-                "serial_number": report.serial_number,
-                "uhid": report.uhid,
-                "patient_name": report.patient_name,
-                "patient_no": report.patient_no,
-                "report_date": str(report.report_date) if report.report_date else None,
-                "age_sex": report.age_sex,
-                "scan_type": report.scan_type,
-                "created_at": str(report.created_at)
-            })
-        
-        return reports_list
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-# Get single report by serial number for editing
-@router.get("/reports/serial/{serial_number}")
-def get_report_by_serial(serial_number: str, db: Session = Depends(get_db)):
-    try:
-        report = db.query(RadiologyReport).filter(
-            RadiologyReport.serial_number == serial_number
-        ).first()
-        
-        if not report:
-            raise HTTPException(status_code=404, detail="Report not found")
-        
-        return {
-            "id": report.id,
-            "serial_number": report.serial_number,
-            "uhid": report.uhid,
-            "sl_no": report.sl_no,
-            "reg_no": report.reg_no,
-            "patient_no": report.patient_no,
-            "patient_name": report.patient_name,
-            "report_date": str(report.report_date) if report.report_date else None,
-            "age_sex": report.age_sex,
-            "origin_ethe": report.origin_ethe,
-            "ref_by": report.ref_by,
-            "film_no": report.film_no,
-            "scan_time": report.scan_time,
-            "report_time": report.report_time,
-            "tat": report.tat,
-            "scan_type": report.scan_type,
-            "doctor_description": report.doctor_description,
-            "impression": report.impression
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-# Update existing report with new data
-@router.put("/reports/serial/{serial_number}")
-def update_report(serial_number: str, report: ReportCreate, db: Session = Depends(get_db)):
-    try:
-        db_report = db.query(RadiologyReport).filter(
-            RadiologyReport.serial_number == serial_number
-        ).first()
-        
-        if not db_report:
-            raise HTTPException(status_code=404, detail="Report not found")
-        
-        for key, value in report.dict().items():
-            if value is not None:
-                setattr(db_report, key, value)
-        
-        db.commit()
-        return {"success": True, "message": "Report updated successfully"}
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-# Delete a report from database
-@router.delete("/reports/serial/{serial_number}")
-def delete_report(serial_number: str, db: Session = Depends(get_db)):
-    try:
-        report = db.query(RadiologyReport).filter(
-            RadiologyReport.serial_number == serial_number
-        ).first()
-        
-        if not report:
-            raise HTTPException(status_code=404, detail="Report not found")
-        
-        db.delete(report)
-        db.commit()
-        return {"success": True, "message": "Report deleted successfully"}
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-# Upload Word document and extract data to update report in database
-@router.post("/reports/serial/{serial_number}/upload")
-async def upload_file(serial_number: str, file: UploadFile = File(...), db: Session = Depends(get_db)):
-    try:
-        if not file.filename.endswith(".docx"):
-            raise HTTPException(status_code=400, detail="Only .docx files allowed")
-
-        content = await file.read()
-        document = Document(BytesIO(content))
-        extracted = {}
-
-        # Extract table data
-        for table in document.tables:
-            for row in table.rows:
-                cells = [c.text.strip() for c in row.cells]
-                if len(cells) >= 2:
-                    extracted[cells[0].replace(":", "").strip()] = cells[1].strip()
-                if len(cells) >= 4:
-                    extracted[cells[2].replace(":", "").strip()] = cells[3].strip()
-            break
-
-        # Extract scan type and sections
-        scan_type = None
-        findings_text = ""
-        impression_text = ""
-        current_section = None
-        last_text = ""
-
-        for para in document.paragraphs:
-            text = para.text.strip()
-            if not text:
-                continue
-
-            if text.startswith("Findings:"):
-                scan_type = last_text
-                current_section = "Findings"
-                continue
-            elif text.startswith("Impression:"):
-                current_section = "Impression"
-                continue
-
-            if current_section == "Findings":
-                findings_text += text + "\n"
-            elif current_section == "Impression":
-                impression_text += text + "\n"
-
-            last_text = text
-
-        # Parse report date
-        report_date = None
-        if extracted.get("Report Date"):
-            for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y"):
-                try:
-                    report_date = datetime.strptime(extracted["Report Date"], fmt).date()
-                    break
-                except:
-                    continue
-
-        # Prepare data for database
-        report_data = {
-            "uhid": extracted.get("UHID"),
-            "sl_no": extracted.get("Sl No"),
-            "reg_no": extracted.get("Reg No"),
-            "patient_no": extracted.get("Patient No"),
-            "patient_name": extracted.get("Patient Name", "Uploaded Patient"),
-            "age_sex": extracted.get("Age/Sex"),
-            "origin_ethe": extracted.get("Origin"),
-            "ref_by": extracted.get("Referred By"),
-            "film_no": extracted.get("Film No"),
-            "scan_time": extracted.get("Scan Time"),
-            "report_time": extracted.get("Report Time"),
-            "tat": extracted.get("TAT"),
-            "scan_type": scan_type,
-            "report_date": report_date,
-            "doctor_description": findings_text.strip(),
-            "impression": impression_text.strip(),
-        }
-
-        # Update existing report
-        report = db.query(RadiologyReport).filter(
-            RadiologyReport.serial_number == serial_number
-        ).first()
-        
-        if report:
-            for k, v in report_data.items():
-                if v is not None:
-                    setattr(report, k, v)
-            db.commit()
-            return {"success": True, "message": "Report updated from file"}
-
-        # Create new report if not exists
-        new_report = RadiologyReport(
-            serial_number=serial_number,
-            **report_data
-        )
-        db.add(new_report)
-        db.commit()
-        return {"success": True, "message": "New report created from file"}
-
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-# Generate QR code on-the-fly for report viewing
-@router.get("/reports/serial/{serial_number}/qr")
-def get_qr(serial_number: str, db: Session = Depends(get_db)):
-    try:
-        report = db.query(RadiologyReport).filter(
-            RadiologyReport.serial_number == serial_number
-        ).first()
-        
-        if not report:
-            raise HTTPException(status_code=404, detail="Report not found")
-        
-        # Generate QR code dynamically (not stored in database)
-        qr_bytes = create_qr_code(serial_number)
-        
-        return Response(content=qr_bytes, media_type="image/png")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-# Export report as Word document
-@router.get("/reports/{report_id}/export")
-def export_report(report_id: int, db: Session = Depends(get_db)):
-    try:
-        report = db.query(RadiologyReport).filter(
-            RadiologyReport.id == report_id
-        ).first()
-        
-        if not report:
-            raise HTTPException(status_code=404, detail="Report not found")
-        
-        file_stream = create_table_format(report)
-        filename = f"radiology_report_{report_id}.docx"
-        
-        return StreamingResponse(
-            file_stream,
-            media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-# Display report online when QR code is scanned
-@router.get("/view/{serial_number}", response_class=HTMLResponse)
-def view_online(serial_number: str, request: Request, db: Session = Depends(get_db)):
-    try:
-        report = db.query(RadiologyReport).filter(
-            RadiologyReport.serial_number == serial_number
-        ).first()
-
-        if not report:
-            return HTMLResponse(content="<h1>Report not found</h1>", status_code=404)
-
-        return templates.TemplateResponse("report_view.html", {
-            "request": request,
-            "report": report
-        })
-
-    except Exception as e:
-        return HTMLResponse(content=f"<h1>Error: {str(e)}</h1>", status_code=500)
\ No newline at end of file
+from fastapi import APIRouter, Depends, HTTPException, Request, Query
+from fastapi.responses import StreamingResponse, Response, HTMLResponse, FileResponse
+from fastapi.templating import Jinja2Templates
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select, update, bindparam, func, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel
+from typing import Optional, List
+from database import get_db
+from schemas import (
+    MessageResponse, ReportCreated, BatchCreated, ReportPage, SearchPage, ReportDetail,
+    PatientTimeline, PatientLookup, ReportChanges,
+    PatchResult, BatchPatchResult, BulkUploadResult, AnalyticsResponse, QrConfig,
+    ExportJobResponse, ExportMetrics,
+)
+from models import RadiologyReport, ExportJob, ReportDailyStats
+from export_cache import report_digest, get_export_async
+from report_events import report_events
+from report_changes import (
+    report_created, report_changed, report_deleted, reports_created, reports_changed,
+    add_tombstone, changes_since, sync_token, decode_sync_token,
+)
+from view_cache import get_page, store_page
+from http_cache import etag_matches
+from bulk_export import stream_reports_zip
+from serials import generate_serial_number_async, serial_allocator
+from batch_create import insert_reports
+from analytics import derive, stats_key, current_keys, update_analytics, recompute_stats, ANALYTICS_FIELDS
+from qr_generator import create_qr_code_async, qr_etag, QR_MEDIA_TYPES, BASE_URL, BASE_URL_KEY
+from search import search_reports
+from patients import patient_timeline, lookup_patients, LOOKUP_FIELDS
+from ingest import ingest_files, read_upload, read_bulk_upload, save_uploaded_report
+from workers import upload_pool, PoolSaturated
+from export_jobs import export_runner, job_path, download_name, MEDIA_TYPES, QUEUED, RUNNING, DONE
+from config import UPLOAD_RETRY_AFTER, RENDER_RETRY_AFTER, BULK_RETRY_AFTER, EXPORT_JOB_MAX_QUEUED, EVENTS_RETRY_MS
+from datetime import datetime, date, timedelta
+import base64
+import asyncio
+import os
+
+templates = Jinja2Templates(directory="templates")
+router = APIRouter()
+
+class ReportCreate(BaseModel):
+    uhid: Optional[str] = None
+    sl_no: Optional[str] = None
+    reg_no: Optional[str] = None
+    patient_no: Optional[str] = None
+    patient_name: str
+    report_date: Optional[date] = None
+    age_sex: Optional[str] = None
+    origin_ethe: Optional[str] = None
+    ref_by: Optional[str] = None
+    film_no: Optional[str] = None
+    scan_time: Optional[str] = None
+    report_time: Optional[str] = None
+    tat: Optional[str] = None
+    scan_type: Optional[str] = None
+    doctor_description: Optional[str] = None
+    impression: Optional[str] = None
+
+
+class ExportJobCreate(BaseModel):
+    serial_number: Optional[str] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    format: Optional[str] = None
+
+
+# Partial update: only the fields present in the request are written (null clears a field)
+class ReportPatch(ReportCreate):
+    patient_name: Optional[str] = None
+
+
+class ReportPatchItem(ReportPatch):
+    serial_number: str
+
+
+# Batch update: either the same changes for many serials, or different changes per report
+class ReportBatchPatch(BaseModel):
+    serial_numbers: Optional[List[str]] = None
+    changes: Optional[ReportPatch] = None
+    items: Optional[List[ReportPatchItem]] = None
+
+
+# Most reports one batch update may touch
+BATCH_UPDATE_LIMIT = 5000
+
+# Most reports one batch create may add
+BATCH_CREATE_LIMIT = 10000
+
+
+def patch_values(patch):
+    values = patch.dict(exclude_unset=True)
+    values.pop("serial_number", None)
+    if "patient_name" in values and not values["patient_name"]:
+        raise HTTPException(status_code=400, detail="patient_name cannot be empty")
+    return values
+
+
+# Create a new radiology report with auto-generated serial number
+@router.post("/reports", response_model=ReportCreated)
+async def create_report(report: ReportCreate, db: AsyncSession = Depends(get_db)):
+    try:
+        serial_number = await generate_serial_number_async()
+        values = {**report.dict(), "created_at": datetime.now()}
+        
+        new_report = RadiologyReport(
+            **values,
+            **derive(values),
+            serial_number=serial_number
+        )
+        
+        db.add(new_report)
+        await db.flush()
+        await db.run_sync(recompute_stats, {stats_key(new_report.stat_day, new_report.scan_type)})
+        await db.commit()
+        report_created(new_report.id, serial_number)
+        
+        return {
+            "success": True,
+            "id": new_report.id,
+            "serial_number": serial_number,
+            "message": "Report created successfully"
+        }
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Create many reports in one call (RIS integrations); one transaction, multi-row INSERT
+@router.post("/reports/batch", response_model=BatchCreated)
+async def create_reports_batch(reports: List[ReportCreate], db: AsyncSession = Depends(get_db)):
+    try:
+        if not reports:
+            raise HTTPException(status_code=400, detail="No reports given")
+        if len(reports) > BATCH_CREATE_LIMIT:
+            raise HTTPException(status_code=400, detail=f"At most {BATCH_CREATE_LIMIT} reports per batch")
+
+        serial_numbers = await serial_allocator.allocate_async(len(reports))
+        created_at = datetime.now()
+        rows = []
+        for report, serial_number in zip(reports, serial_numbers):
+            row = {**report.dict(), "serial_number": serial_number, "created_at": created_at, "updated_at": created_at}
+            row.update(derive(row))
+            rows.append(row)
+
+        saved = await insert_reports(db, rows)
+        await db.run_sync(recompute_stats, {stats_key(row["stat_day"], row["scan_type"]) for row in rows})
+        await db.commit()
+        reports_created(saved)
+
+        return {
+            "success": True,
+            "count": len(saved),
+            "reports": [{"id": report_id, "serial_number": serial} for report_id, serial in saved],
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Columns shown in the reports table (the large text columns are left out)
+SUMMARY_COLUMNS = (
+    RadiologyReport.id,
+    RadiologyReport.serial_number,
+    RadiologyReport.uhid,
+    RadiologyReport.patient_name,
+    RadiologyReport.patient_no,
+    RadiologyReport.report_date,
+    RadiologyReport.age_sex,
+    RadiologyReport.scan_type,
+    RadiologyReport.created_at,
+)
+
+
+# Cursor is the (created_at, id) of the last row on the previous page
+def encode_cursor(created_at, report_id):
+    raw = f"{created_at.isoformat()}|{report_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, report_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(report_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+# Get one page of reports for displaying in reports table (newest first)
+@router.get("/reports", response_model=ReportPage)
+async def get_all_reports(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    scan_type: Optional[str] = None,
+    report_date: Optional[date] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    try:
+        # Taken before the page is read: a write committed in between is sent again by the next sync
+        token = await sync_token(db)
+        query = select(*SUMMARY_COLUMNS)
+
+        if scan_type:
+            query = query.where(RadiologyReport.scan_type == scan_type)
+        if report_date:
+            query = query.where(RadiologyReport.report_date == report_date)
+        if cursor:
+            last_created_at, last_id = decode_cursor(cursor)
+            query = query.where(
+                tuple_(RadiologyReport.created_at, RadiologyReport.id) < tuple_(last_created_at, last_id)
+            )
+
+        # Fetch one extra row to know whether another page exists
+        rows = (await db.execute(query.order_by(
+            RadiologyReport.created_at.desc(),
+            RadiologyReport.id.desc()
+        ).limit(limit + 1))).all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+        # The Row tuples go straight into ReportPage; no ORM objects or dicts are built
+        return {"items": rows, "next_cursor": next_cursor, "sync_token": token}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Reports created, updated or deleted since a sync token (from the list or the last sync),
+# so the table can be patched instead of downloaded again
+@router.get("/reports/changes", response_model=ReportChanges)
+async def get_report_changes(since: str, db: AsyncSession = Depends(get_db)):
+    try:
+        try:
+            since_time = decode_sync_token(since)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        changes = await changes_since(db, since_time, SUMMARY_COLUMNS)
+        if changes is None:
+            return {"reset": True}
+
+        rows, deleted, token = changes
+        return {"token": token, "items": rows, "deleted": deleted}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Live create / update / delete events for open report lists (Server-Sent Events)
+@router.get("/reports/events")
+async def report_event_stream():
+    if report_events.full():
+        raise HTTPException(
+            status_code=503,
+            detail="Too many live connections, try again shortly",
+            headers={"Retry-After": str(EVENTS_RETRY_MS // 1000)}
+        )
+    return StreamingResponse(
+        report_events.stream(),
+        media_type="text/event-stream",
+        # Proxies (nginx) must pass events through as they come, not buffer them
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# Search findings, impressions, patient names and scan types (ranked)
+@router.get("/reports/search", response_model=SearchPage)
+async def search(
+    q: str = Query(..., min_length=2),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db)
+):
+    try:
+        # Fetch one extra row to know whether another page exists
+        results = await search_reports(db, q, limit + 1, offset)
+
+        next_offset = None
+        if len(results) > limit:
+            results = results[:limit]
+            next_offset = offset + limit
+
+        return {"items": results, "next_offset": next_offset}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Find patients by the start of their patient no, reg no or name (close matches after)
+@router.get("/patients/lookup", response_model=PatientLookup)
+async def lookup_patient(
+    q: str = Query(..., min_length=1),
+    field: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db)
+):
+    try:
+        if field and field not in LOOKUP_FIELDS:
+            raise HTTPException(status_code=400, detail=f"field must be one of {', '.join(LOOKUP_FIELDS)}")
+
+        fields = [field] if field else list(LOOKUP_FIELDS)
+        return {"items": await lookup_patients(db, q.strip(), fields, limit)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# One patient's reports, newest first (by report date, else the day of the scan / entry)
+@router.get("/patients/{uhid}/reports", response_model=PatientTimeline)
+async def get_patient_reports(
+    uhid: str,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    try:
+        after = None
+        if cursor:
+            # Same cursor format as the reports list, holding (stat_day, id)
+            last_day, last_id = decode_cursor(cursor)
+            after = (last_day.date(), last_id)
+
+        # Fetch one extra row to know whether another page exists
+        rows = await patient_timeline(db, uhid, limit + 1, after)
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].stat_day, rows[-1].id)
+
+        return {"uhid": uhid, "items": rows, "next_cursor": next_cursor}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Load one full report row (None if there is no such serial)
+async def find_report(db, serial_number):
+    result = await db.execute(
+        select(RadiologyReport).where(RadiologyReport.serial_number == serial_number)
+    )
+    return result.scalars().first()
+
+
+# Get single report by serial number for editing
+@router.get("/reports/serial/{serial_number}", response_model=ReportDetail)
+async def get_report_by_serial(serial_number: str, db: AsyncSession = Depends(get_db)):
+    try:
+        report = await find_report(db, serial_number)
+        
+        if not report:
+            raise HTTPException(status_code=404, detail="Report not found")
+        
+        return report
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Update existing report with new data
+@router.put("/reports/serial/{serial_number}", response_model=MessageResponse)
+async def update_report(serial_number: str, report: ReportCreate, db: AsyncSession = Depends(get_db)):
+    try:
+        db_report = await find_report(db, serial_number)
+        
+        if not db_report:
+            raise HTTPException(status_code=404, detail="Report not found")
+        
+        old_key = stats_key(db_report.stat_day, db_report.scan_type)
+        for key, value in report.dict().items():
+            if value is not None:
+                setattr(db_report, key, value)
+        
+        await db.flush()
+        await db.run_sync(update_analytics, [db_report.id], {old_key})
+        await db.commit()
+        report_changed(db_report.id, serial_number)
+        return {"success": True, "message": "Report updated successfully"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Update only the given fields, in a single UPDATE ... RETURNING
+@router.patch("/reports/serial/{serial_number}", response_model=PatchResult)
+async def patch_report(serial_number: str, report: ReportPatch, db: AsyncSession = Depends(get_db)):
+    try:
+        values = patch_values(report)
+        if not values:
+            raise HTTPException(status_code=400, detail="No fields to update")
+
+        # Only a change to one of these can move the report in the daily summary
+        old_keys = None
+        if ANALYTICS_FIELDS & values.keys():
+            old_keys = await db.run_sync(current_keys, RadiologyReport.serial_number == serial_number)
+
+        row = (await db.execute(
+            update(RadiologyReport)
+            .where(RadiologyReport.serial_number == serial_number)
+            .values(**values)
+            .returning(RadiologyReport.id)
+        )).first()
+
+        if not row:
+            raise HTTPException(status_code=404, detail="Report not found")
+
+        if old_keys is not None:
+            await db.run_sync(update_analytics, [row.id], old_keys)
+        await db.commit()
+        report_changed(row.id, serial_number)
+        return {"success": True, "id": row.id, "updated_fields": sorted(values)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Update many reports in one call (e.g. fixing ref_by across a day's list)
+@router.patch("/reports/batch", response_model=BatchPatchResult)
+async def patch_reports_batch(batch: ReportBatchPatch, db: AsyncSession = Depends(get_db)):
+    try:
+        if batch.items is not None:
+            if batch.serial_numbers is not None or batch.changes is not None:
+                raise HTTPException(status_code=400, detail="Send either items or serial_numbers with changes")
+            updated, not_found = await apply_patch_items(db, batch.items)
+        elif batch.serial_numbers and batch.changes is not None:
+            updated, not_found = await apply_patch_to_all(db, batch.serial_numbers, batch.changes)
+        else:
+            raise HTTPException(status_code=400, detail="Send either items or serial_numbers with changes")
+
+        await db.commit()
+        reports_changed(updated)
+
+        return {
+            "success": True,
+            "updated": [serial for _, serial in updated],
+            "not_found": not_found,
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Same changes for every serial: one UPDATE ... WHERE serial_number IN (...)
+async def apply_patch_to_all(db, serial_numbers, changes):
+    serial_numbers = list(dict.fromkeys(serial_numbers))
+    if len(serial_numbers) > BATCH_UPDATE_LIMIT:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_UPDATE_LIMIT} reports per batch")
+
+    values = patch_values(changes)
+    if not values:
+        raise HTTPException(status_code=400, detail="No fields to update")
+
+    old_keys = None
+    if ANALYTICS_FIELDS & values.keys():
+        old_keys = await db.run_sync(current_keys, RadiologyReport.serial_number.in_(serial_numbers))
+
+    rows = (await db.execute(
+        update(RadiologyReport)
+        .where(RadiologyReport.serial_number.in_(serial_numbers))
+        .values(**values)
+        .returning(RadiologyReport.id, RadiologyReport.serial_number)
+    )).all()
+
+    updated = [(row.id, row.serial_number) for row in rows]
+    if old_keys is not None:
+        await db.run_sync(update_analytics, [report_id for report_id, _ in updated], old_keys)
+    found = {serial for _, serial in updated}
+    return updated, [serial for serial in serial_numbers if serial not in found]
+
+
+# Different changes per report: one transaction, one executemany per set of changed fields
+async def apply_patch_items(db, items):
+    if len(items) > BATCH_UPDATE_LIMIT:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_UPDATE_LIMIT} reports per batch")
+
+    # A later item for the same serial wins
+    changes = {}
+    for item in items:
+        values = patch_values(item)
+        if values:
+            changes.setdefault(item.serial_number, {}).update(values)
+
+    existing = dict((await db.execute(
+        select(RadiologyReport.serial_number, RadiologyReport.id)
+        .where(RadiologyReport.serial_number.in_(list(changes)))
+    )).all())
+
+    touched = set().union(*changes.values()) if changes else set()
+    old_keys = None
+    if ANALYTICS_FIELDS & touched:
+        old_keys = await db.run_sync(current_keys, RadiologyReport.serial_number.in_(list(existing)))
+
+    groups = {}
+    for serial, values in changes.items():
+        if serial in existing:
+            params = {f"new_{field}": value for field, value in values.items()}
+            groups.setdefault(tuple(sorted(values)), []).append({"match_serial": serial, **params})
+
+    table = RadiologyReport.__table__
+    for fields, params in groups.items():
+        stmt = (
+            update(table)
+            .where(table.c.serial_number == bindparam("match_serial"))
+            .values({field: bindparam(f"new_{field}") for field in fields})
+        )
+        await db.execute(stmt, params)
+
+    updated = [(existing[serial], serial) for serial in changes if serial in existing]
+    if old_keys is not None:
+        await db.run_sync(update_analytics, [report_id for report_id, _ in updated], old_keys)
+    return updated, [serial for serial in changes if serial not in existing]
+
+
+# Delete a report from database
+@router.delete("/reports/serial/{serial_number}", response_model=MessageResponse)
+async def delete_report(serial_number: str, db: AsyncSession = Depends(get_db)):
+    try:
+        report = await find_report(db, serial_number)
+        
+        if not report:
+            raise HTTPException(status_code=404, detail="Report not found")
+        
+        old_key = stats_key(report.stat_day, report.scan_type)
+        # Names the report's cached export, which holds patient data
+        digest = report_digest(report)
+        await db.delete(report)
+        await add_tombstone(db, report.id, serial_number)
+        await db.flush()
+        await db.run_sync(recompute_stats, {old_key})
+        await db.commit()
+        await run_in_threadpool(report_deleted, report.id, serial_number, digest)
+        return {"success": True, "message": "Report deleted successfully"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Upload Word document and extract data to update report in database
+# (size-capped while it is received, then parsed and saved in a bounded thread pool)
+@router.post(
+    "/reports/serial/{serial_number}/upload",
+    response_model=MessageResponse,
+    # The form is read by the route itself (see read_upload); documented here
+    openapi_extra={"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+        "type": "object", "properties": {"file": {"type": "string", "format": "binary"}}, "required": ["file"]
+    }}}}}
+)
+async def upload_file(serial_number: str, request: Request):
+    form = None
+    try:
+        form, file = await read_upload(request)
+        if not file.filename.endswith(".docx"):
+            raise HTTPException(status_code=400, detail="Only .docx files allowed")
+
+        try:
+            future = upload_pool.submit(save_uploaded_report, serial_number, file.file)
+        except PoolSaturated:
+            raise HTTPException(
+                status_code=503,
+                detail="Too many uploads in progress, try again shortly",
+                headers={"Retry-After": str(UPLOAD_RETRY_AFTER)}
+            )
+        # The upload thread closes the file when it is done with it
+        form = None
+
+        message = await asyncio.wrap_future(future)
+        return {"success": True, "message": message}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if form is not None:
+            await form.close()
+
+
+# Upload many Word documents (or ZIP files of them) at once. Files named after a
+# report (RAD-YYYYMMDD-N.docx, as the ZIP export names them) update it; any other
+# name creates a new report, also when the same file is uploaded again.
+# Sizes are capped like the single upload (see read_form and check_bulk_upload).
+@router.post(
+    "/reports/upload/bulk",
+    response_model=BulkUploadResult,
+    openapi_extra={"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+        "type": "object",
+        "properties": {"files": {"type": "array", "items": {"type": "string", "format": "binary"}}},
+        "required": ["files"]
+    }}}}}
+)
+async def upload_bulk(request: Request):
+    form = None
+    try:
+        form, files = await read_bulk_upload(request)
+        results = await run_in_threadpool(ingest_files, files)
+        counts = {}
+        for result in results:
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+
+        return {"success": "error" not in counts, "counts": counts, "files": results}
+    except HTTPException:
+        raise
+    except PoolSaturated:
+        raise bulk_busy()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if form is not None:
+            await form.close()
+
+
+# Sent when BULK_CONCURRENCY bulk uploads / ZIP exports (or too many queued
+# export jobs) are already waiting for the worker processes
+def bulk_busy():
+    return HTTPException(
+        status_code=503,
+        detail="Too many bulk operations in progress, try again later",
+        headers={"Retry-After": str(BULK_RETRY_AFTER)}
+    )
+
+
+# Sent when too many exports / QR images are already waiting for a render process
+def render_pool_full():
+    return HTTPException(
+        status_code=503,
+        detail="Too many documents being rendered, try again shortly",
+        headers={"Retry-After": str(RENDER_RETRY_AFTER)}
+    )
+
+
+# QR code for report viewing. The image encodes BASE_URL, so clients may only keep
+# it for good when the URL names that version (?v=, from /qr-config)
+@router.get("/reports/serial/{serial_number}/qr")
+async def get_qr(
+    serial_number: str,
+    request: Request,
+    format: str = "png",
+    v: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    try:
+        if format not in QR_MEDIA_TYPES:
+            raise HTTPException(status_code=400, detail="Format must be png or svg")
+
+        report = (await db.execute(
+            select(RadiologyReport.id).where(RadiologyReport.serial_number == serial_number)
+        )).first()
+
+        if not report:
+            raise HTTPException(status_code=404, detail="Report not found")
+
+        etag = qr_etag(serial_number, format)
+        if v == BASE_URL_KEY:
+            cache_control = "public, max-age=31536000, immutable"
+        else:
+            cache_control = "no-cache"
+        headers = {"ETag": etag, "Cache-Control": cache_control}
+
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+        # As in export_report: no connection is held while the image is encoded
+        await db.close()
+        qr_bytes = await create_qr_code_async(serial_number, format)
+        
+        return Response(content=qr_bytes, media_type=QR_MEDIA_TYPES[format], headers=headers)
+    except HTTPException:
+        raise
+    except PoolSaturated:
+        raise render_pool_full()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Turnaround and volume dashboard; reads only the daily summary table
+@router.get("/analytics", response_model=AnalyticsResponse)
+async def get_analytics(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    scan_type: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    try:
+        date_to = date_to or date.today()
+        date_from = date_from or date_to - timedelta(days=29)
+        if date_from > date_to:
+            raise HTTPException(status_code=400, detail="date_from is after date_to")
+
+        query = select(ReportDailyStats).where(
+            ReportDailyStats.day >= date_from,
+            ReportDailyStats.day <= date_to
+        )
+        if scan_type is not None:
+            query = query.where(ReportDailyStats.scan_type == scan_type)
+        rows = (await db.execute(
+            query.order_by(ReportDailyStats.day, ReportDailyStats.scan_type)
+        )).scalars().all()
+
+        days = []
+        by_scan_type = {}
+        referrers = {}
+        tat_total = 0.0
+        tat_count = 0
+        for row in rows:
+            days.append({
+                "day": row.day,
+                "scan_type": row.scan_type or None,
+                "report_count": row.report_count,
+                "tat_count": row.tat_count,
+                "tat_mean": row.tat_mean,
+                "tat_p50": row.tat_p50,
+                "tat_p90": row.tat_p90,
+                "referrers": row.referrers or {},
+            })
+            name = row.scan_type or "Unknown"
+            by_scan_type[name] = by_scan_type.get(name, 0) + row.report_count
+            for referrer, count in (row.referrers or {}).items():
+                referrers[referrer] = referrers.get(referrer, 0) + count
+            if row.tat_count:
+                tat_total += row.tat_mean * row.tat_count
+                tat_count += row.tat_count
+
+        # Percentiles cannot be combined across days, so the totals only carry the mean
+        return {
+            "date_from": date_from,
+            "date_to": date_to,
+            "days": days,
+            "totals": {
+                "report_count": sum(by_scan_type.values()),
+                "tat_count": tat_count,
+                "tat_mean": tat_total / tat_count if tat_count else None,
+                "by_scan_type": by_scan_type,
+                "referrers": dict(sorted(referrers.items(), key=lambda item: -item[1])),
+            },
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Public base URL that QR codes point to (used by the QR popup)
+@router.get("/qr-config", response_model=QrConfig)
+async def get_qr_config():
+    return {"base_url": BASE_URL, "qr_version": BASE_URL_KEY}
+
+
+# Export report as Word document (rendered once per version of the report)
+@router.get("/reports/{report_id}/export")
+async def export_report(report_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    try:
+        report = await db.get(RadiologyReport, report_id)
+        
+        if not report:
+            raise HTTPException(status_code=404, detail="Report not found")
+        
+        digest = report_digest(report)
+        etag = f'"{digest}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+        # Browser already has this exact version of the document
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+        # Give the connection back before waiting for a render, so JSON requests
+        # never queue for the database pool behind exports (the loaded row stays usable)
+        await db.close()
+        content = await get_export_async(report, digest)
+        filename = f"radiology_report_{report_id}.docx"
+        headers["Content-Disposition"] = f"attachment; filename={filename}"
+        
+        return Response(
+            content=content,
+            media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+            headers=headers
+        )
+    except HTTPException:
+        raise
+    except PoolSaturated:
+        raise render_pool_full()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Export many reports at once as a ZIP of Word documents (streamed while rendering)
+@router.get("/reports/export/zip")
+def export_reports_zip(
+    serial_number: Optional[List[str]] = Query(None),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None
+):
+    if not serial_number and not (date_from and date_to):
+        raise HTTPException(status_code=400, detail="Give serial numbers or a date range")
+
+    filename = "radiology_reports.zip"
+    if date_from and date_to:
+        filename = f"radiology_reports_{date_from}_{date_to}.zip"
+
+    chunks = stream_reports_zip(serial_number, date_from, date_to)
+    try:
+        # Takes a bulk slot (the empty first chunk), or 503 when none is free
+        next(chunks)
+    except PoolSaturated:
+        raise bulk_busy()
+
+    return StreamingResponse(
+        chunks,
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
+# Display report online when QR code is scanned
+# (rendered once per version, precompressed, and revalidated with ETag / Last-Modified)
+@router.get("/view/{serial_number}", response_class=HTMLResponse)
+async def view_online(serial_number: str, request: Request, db: AsyncSession = Depends(get_db)):
+    try:
+        # The cached page is checked against the report's version on every request:
+        # it may have been changed through another worker, or while the page was rendered
+        version = (await db.execute(
+            select(RadiologyReport.updated_at).where(RadiologyReport.serial_number == serial_number)
+        )).first()
+
+        if not version:
+            return HTMLResponse(content="<h1>Report not found</h1>", status_code=404)
+
+        page = get_page(serial_number, version.updated_at)
+
+        if page is None:
+            report = await find_report(db, serial_number)
+
+            if not report:
+                return HTMLResponse(content="<h1>Report not found</h1>", status_code=404)
+
+            html = templates.get_template("report_view.html").render(request=request, report=report)
+            # Compressing the variants is CPU work, keep it off the event loop
+            page = await run_in_threadpool(store_page, serial_number, html, report.updated_at)
+
+        headers = {
+            "ETag": page.etag,
+            "Last-Modified": page.last_modified,
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+
+        if page.not_modified(request.headers):
+            return Response(status_code=304, headers=headers)
+
+        encoding = page.choose_encoding(request.headers.get("accept-encoding"))
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+
+        return HTMLResponse(content=page.bodies[encoding], headers=headers)
+
+    except Exception as e:
+        return HTMLResponse(content=f"<h1>Error: {str(e)}</h1>", status_code=500)
+
+
+def export_job_dict(job):
+    result = {
+        "id": job.id,
+        "status": job.status,
+        "format": job.format,
+        "serial_number": job.serial_number,
+        "date_from": job.date_from,
+        "date_to": job.date_to,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "report_count": job.report_count,
+        "file_size": job.file_size,
+        "error": job.error,
+    }
+    if job.status == DONE:
+        result["file_url"] = f"/api/exports/{job.id}/file"
+    return result
+
+
+# Queue a background export (one report as .docx, or a date range as .zip)
+@router.post("/exports", status_code=202, response_model=ExportJobResponse)
+async def create_export_job(request: ExportJobCreate, db: AsyncSession = Depends(get_db)):
+    try:
+        if request.serial_number and (request.date_from or request.date_to):
+            raise HTTPException(status_code=400, detail="Give a serial number or a date range, not both")
+        if not request.serial_number and not (request.date_from and request.date_to):
+            raise HTTPException(status_code=400, detail="Give a serial number or a date range")
+
+        format = request.format or ("docx" if request.serial_number else "zip")
+        if format not in MEDIA_TYPES:
+            raise HTTPException(status_code=400, detail="Format must be docx or zip")
+        if format == "docx" and not request.serial_number:
+            raise HTTPException(status_code=400, detail="A date range can only be exported as zip")
+
+        queued = await db.scalar(select(func.count()).where(ExportJob.status == QUEUED))
+        if queued >= EXPORT_JOB_MAX_QUEUED:
+            raise bulk_busy()
+
+        job = ExportJob(
+            status=QUEUED,
+            format=format,
+            serial_number=request.serial_number,
+            date_from=request.date_from,
+            date_to=request.date_to,
+        )
+        db.add(job)
+        await db.commit()
+        export_runner.notify()
+
+        return export_job_dict(job)
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Queue depth, job latency and worker utilisation
+@router.get("/exports/metrics", response_model=ExportMetrics)
+async def export_job_metrics(db: AsyncSession = Depends(get_db)):
+    try:
+        counts = dict((await db.execute(
+            select(ExportJob.status, func.count()).group_by(ExportJob.status)
+        )).all())
+
+        # Latency of the most recent finished jobs
+        recent = (await db.execute(
+            select(ExportJob.created_at, ExportJob.started_at, ExportJob.finished_at)
+            .where(ExportJob.status == DONE)
+            .order_by(ExportJob.id.desc())
+            .limit(200)
+        )).all()
+
+        def summary(values):
+            if not values:
+                return None
+            values = sorted(values)
+            return {
+                "mean": round(sum(values) / len(values), 3),
+                "p50": round(values[len(values) // 2], 3),
+                "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+                "max": round(values[-1], 3),
+            }
+
+        return {
+            "queue_depth": counts.get(QUEUED, 0),
+            "running": counts.get(RUNNING, 0),
+            "jobs_by_status": counts,
+            "wait_seconds": summary([(row.started_at - row.created_at).total_seconds() for row in recent]),
+            "run_seconds": summary([(row.finished_at - row.started_at).total_seconds() for row in recent]),
+            "total_seconds": summary([(row.finished_at - row.created_at).total_seconds() for row in recent]),
+            "this_process": export_runner.stats(),
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Status of one export job (poll until it is done)
+@router.get("/exports/{job_id}", response_model=ExportJobResponse)
+async def get_export_job(job_id: int, db: AsyncSession = Depends(get_db)):
+    try:
+        job = await db.get(ExportJob, job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Export job not found")
+
+        result = export_job_dict(job)
+        if job.status == QUEUED:
+            ahead = (await db.execute(
+                select(func.count()).select_from(ExportJob)
+                .where(ExportJob.status == QUEUED, ExportJob.id < job.id)
+            )).scalar()
+            result["queue_position"] = ahead + 1
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Download the file of a finished export job
+@router.get("/exports/{job_id}/file")
+async def download_export_job(job_id: int, db: AsyncSession = Depends(get_db)):
+    job = await db.get(ExportJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    if job.status != DONE:
+        raise HTTPException(status_code=409, detail=f"Export is {job.status}")
+
+    path = job_path(job.file_name)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=410, detail="Export file is no longer available")
+
+    return FileResponse(path, media_type=MEDIA_TYPES[job.format], filename=download_name(job))
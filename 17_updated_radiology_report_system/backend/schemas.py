@@ -0,0 +1,232 @@
+from pydantic import BaseModel, ConfigDict
+from typing import Optional, List, Dict
+from datetime import date, datetime
+
+# Response models. With a response model FastAPI validates the returned value
+# and writes it straight to JSON bytes in pydantic-core, so routes return rows,
+# ORM objects or plain dicts without converting dates to strings themselves.
+
+
+class MessageResponse(BaseModel):
+    success: bool
+    message: str
+
+
+class ReportCreated(BaseModel):
+    success: bool
+    id: int
+    serial_number: str
+    message: str
+
+
+class ReportRef(BaseModel):
+    # from_attributes lets these be filled from SQLAlchemy Row tuples and ORM objects
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    serial_number: str
+
+
+class BatchCreated(BaseModel):
+    success: bool
+    count: int
+    reports: List[ReportRef]
+
+
+# One row of the reports table (SUMMARY_COLUMNS)
+class ReportSummary(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    serial_number: str
+    uhid: Optional[str] = None
+    patient_name: str
+    patient_no: Optional[str] = None
+    report_date: Optional[date] = None
+    age_sex: Optional[str] = None
+    scan_type: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+class ReportPage(BaseModel):
+    items: List[ReportSummary]
+    next_cursor: Optional[str] = None
+    # Pass to /reports/changes to get what changed after this page was read
+    sync_token: Optional[str] = None
+
+
+# What changed in the reports list since a sync token. reset means the token
+# is too old or too much changed: reload the list instead.
+class ReportChanges(BaseModel):
+    token: Optional[str] = None
+    items: List[ReportSummary] = []
+    deleted: List[int] = []
+    reset: bool = False
+
+
+class SearchResult(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    serial_number: str
+    patient_name: str
+    scan_type: Optional[str] = None
+    report_date: Optional[date] = None
+    rank: float
+    findings_snippet: Optional[str] = None
+    impression_snippet: Optional[str] = None
+
+
+class SearchPage(BaseModel):
+    items: List[SearchResult]
+    next_offset: Optional[int] = None
+
+
+# A patient's reports, newest first
+class PatientTimeline(BaseModel):
+    uhid: str
+    items: List[ReportSummary]
+    next_cursor: Optional[str] = None
+
+
+class PatientMatch(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    serial_number: str
+    uhid: Optional[str] = None
+    patient_name: str
+    patient_no: Optional[str] = None
+    reg_no: Optional[str] = None
+    report_date: Optional[date] = None
+    scan_type: Optional[str] = None
+    # Which field matched, and how well (1.0 for a prefix match)
+    field: str
+    score: float
+
+
+class PatientLookup(BaseModel):
+    items: List[PatientMatch]
+
+
+# Everything the edit form needs
+class ReportDetail(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    serial_number: str
+    uhid: Optional[str] = None
+    sl_no: Optional[str] = None
+    reg_no: Optional[str] = None
+    patient_no: Optional[str] = None
+    patient_name: str
+    report_date: Optional[date] = None
+    age_sex: Optional[str] = None
+    origin_ethe: Optional[str] = None
+    ref_by: Optional[str] = None
+    film_no: Optional[str] = None
+    scan_time: Optional[str] = None
+    report_time: Optional[str] = None
+    tat: Optional[str] = None
+    scan_type: Optional[str] = None
+    doctor_description: Optional[str] = None
+    impression: Optional[str] = None
+
+
+class PatchResult(BaseModel):
+    success: bool
+    id: int
+    updated_fields: List[str]
+
+
+class BatchPatchResult(BaseModel):
+    success: bool
+    updated: List[str]
+    not_found: List[str]
+
+
+class UploadedFileResult(BaseModel):
+    filename: str
+    status: str
+    serial_number: Optional[str] = None
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class BulkUploadResult(BaseModel):
+    success: bool
+    counts: Dict[str, int]
+    files: List[UploadedFileResult]
+
+
+class DailyStats(BaseModel):
+    day: date
+    scan_type: Optional[str] = None
+    report_count: int
+    tat_count: int
+    tat_mean: Optional[float] = None
+    tat_p50: Optional[float] = None
+    tat_p90: Optional[float] = None
+    referrers: Dict[str, int]
+
+
+class AnalyticsTotals(BaseModel):
+    report_count: int
+    tat_count: int
+    tat_mean: Optional[float] = None
+    by_scan_type: Dict[str, int]
+    referrers: Dict[str, int]
+
+
+class AnalyticsResponse(BaseModel):
+    date_from: date
+    date_to: date
+    days: List[DailyStats]
+    totals: AnalyticsTotals
+
+
+class QrConfig(BaseModel):
+    base_url: str
+    qr_version: str
+
+
+class ExportJobResponse(BaseModel):
+    id: int
+    status: str
+    format: str
+    serial_number: Optional[str] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    report_count: Optional[int] = None
+    file_size: Optional[int] = None
+    error: Optional[str] = None
+    # Only set once the job is done / while it is still queued
+    file_url: Optional[str] = None
+    queue_position: Optional[int] = None
+
+
+class LatencySummary(BaseModel):
+    mean: float
+    p50: float
+    p95: float
+    max: float
+
+
+class RunnerStats(BaseModel):
+    workers: int
+    busy_workers: int
+    jobs_completed: int
+    utilisation: float
+
+
+class ExportMetrics(BaseModel):
+    queue_depth: int
+    running: int
+    jobs_by_status: Dict[str, int]
+    wait_seconds: Optional[LatencySummary] = None
+    run_seconds: Optional[LatencySummary] = None
+    total_seconds: Optional[LatencySummary] = None
+    this_process: RunnerStats
@@ -0,0 +1,97 @@
+import html
+import re
+from sqlalchemy import text, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import RadiologyReport
+
+
+# Matches in snippets are delimited with control characters rather than HTML, so the
+# report text around them can be escaped afterwards (see mark)
+START_SEL = "\x02"
+STOP_SEL = "\x03"
+HEADLINE_OPTIONS = f"MaxFragments=2, MaxWords=20, MinWords=5, StartSel={START_SEL}, StopSel={STOP_SEL}"
+
+# Fallback snippets: characters shown, of which up to SNIPPET_LEAD before the first match
+SNIPPET_CHARS = 200
+SNIPPET_LEAD = 60
+
+# Rank the matching rows first and only build snippets for the requested page,
+# because ts_headline re-parses the whole text of every row it is given.
+POSTGRES_SEARCH = text(f"""
+    WITH q AS (
+        SELECT websearch_to_tsquery('english', :q) || websearch_to_tsquery('simple', :q) AS query
+    ),
+    hits AS (
+        SELECT r.id,
+               ts_rank_cd(r.search_vector, q.query) + similarity(r.patient_name, :q) AS rank
+        FROM radiology_reports r, q
+        WHERE r.search_vector @@ q.query OR r.patient_name % :q
+        ORDER BY rank DESC, r.id DESC
+        LIMIT :limit OFFSET :offset
+    )
+    SELECT r.id, r.serial_number, r.patient_name, r.scan_type, r.report_date, hits.rank,
+           ts_headline('english', coalesce(r.doctor_description, ''), q.query, '{HEADLINE_OPTIONS}') AS findings_snippet,
+           ts_headline('english', coalesce(r.impression, ''), q.query, '{HEADLINE_OPTIONS}') AS impression_snippet
+    FROM hits
+    JOIN radiology_reports r ON r.id = hits.id, q
+    ORDER BY hits.rank DESC, r.id DESC
+""")
+
+
+def mark(snippet):
+    """HTML-escape a snippet and wrap its delimited matches in <mark> (the format
+    both search backends return)"""
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(START_SEL, "<mark>").replace(STOP_SEL, "</mark>")
+
+
+def _headline(value, q):
+    """Stand-in for ts_headline: the text around the first match of q, matches delimited"""
+    value = value or ""
+    first = value.lower().find(q.lower())
+    start = max(0, first - SNIPPET_LEAD) if first >= 0 else 0
+    value = value[start:start + SNIPPET_CHARS]
+    return re.sub(re.escape(q), lambda match: START_SEL + match.group(0) + STOP_SEL, value, flags=re.IGNORECASE)
+
+
+# Other databases (the local SQLite stand-in) get a plain unranked LIKE scan
+async def _search_fallback(db, q, limit, offset):
+    pattern = f"%{q}%"
+    reports = (await db.execute(select(RadiologyReport).where(or_(
+        RadiologyReport.patient_name.ilike(pattern),
+        RadiologyReport.scan_type.ilike(pattern),
+        RadiologyReport.doctor_description.ilike(pattern),
+        RadiologyReport.impression.ilike(pattern),
+    )).order_by(RadiologyReport.id.desc()).limit(limit).offset(offset))).scalars().all()
+
+    results = []
+    for report in reports:
+        results.append({
+            "id": report.id,
+            "serial_number": report.serial_number,
+            "patient_name": report.patient_name,
+            "scan_type": report.scan_type,
+            "report_date": report.report_date,
+            "rank": 0.0,
+            "findings_snippet": mark(_headline(report.doctor_description, q)),
+            "impression_snippet": mark(_headline(report.impression, q)),
+        })
+    return results
+
+
+async def search_reports(db: AsyncSession, q, limit, offset):
+    """Return one page of reports matching q, best match first, as dicts shaped like
+    SearchResult. Snippets are HTML-escaped text with matches in <mark> tags."""
+    if db.bind.dialect.name != "postgresql":
+        return await _search_fallback(db, q, limit, offset)
+
+    rows = (await db.execute(POSTGRES_SEARCH, {"q": q, "limit": limit, "offset": offset})).mappings().all()
+    return [
+        {
+            **row,
+            "findings_snippet": mark(row["findings_snippet"]),
+            "impression_snippet": mark(row["impression_snippet"]),
+        }
+        for row in rows
+    ]
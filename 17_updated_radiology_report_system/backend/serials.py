@@ -0,0 +1,133 @@
+import re
+import threading
+from collections import deque
+from datetime import datetime
+from sqlalchemy import update
+from database import engine, async_engine, dialect_insert
+from models import RadiologyReport, SerialCounter
+from config import SERIAL_BLOCK_SIZE
+
+SERIAL_SUFFIX = re.compile(r"^RAD-\d{8}-(\d+)$")
+
+
+def format_serial(day, number):
+    """RAD-20260212-0042 (more digits once a day passes 9999)"""
+    return f"RAD-{day:%Y%m%d}-{number:04d}"
+
+
+def _highest_existing(conn, day):
+    """Largest number already used on this day (serials created before the counter existed)"""
+    prefix = f"RAD-{day:%Y%m%d}-"
+    rows = conn.execute(
+        RadiologyReport.__table__.select()
+        .with_only_columns(RadiologyReport.serial_number)
+        .where(RadiologyReport.serial_number.like(prefix + "%"))
+    )
+    numbers = [int(match.group(1)) for (serial,) in rows if (match := SERIAL_SUFFIX.match(serial))]
+    return max(numbers, default=0)
+
+
+def _reserve(conn, day, size):
+    counters = SerialCounter.__table__
+    last_value = conn.execute(
+        update(counters)
+        .where(counters.c.day == day)
+        .values(last_value=counters.c.last_value + size)
+        .returning(counters.c.last_value)
+    ).scalar()
+    if last_value is not None:
+        return last_value
+
+    # First block of the day. If another worker creates the row at the
+    # same moment, ON CONFLICT turns this into a normal increment.
+    stmt = dialect_insert(conn)(counters).values(day=day, last_value=_highest_existing(conn, day) + size)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[counters.c.day],
+        set_={"last_value": counters.c.last_value + size},
+    ).returning(counters.c.last_value)
+    return conn.execute(stmt).scalar()
+
+
+def reserve_block(day, size):
+    """Reserve `size` numbers for `day` in the database; returns the last one reserved"""
+    with engine.begin() as conn:
+        return _reserve(conn, day, size)
+
+
+async def reserve_block_async(day, size):
+    """Same as reserve_block() through the async engine"""
+    async with async_engine.begin() as conn:
+        return await conn.run_sync(_reserve, day, size)
+
+
+class SerialAllocator:
+    """Hands out serial numbers from blocks reserved in the serial_counters table.
+
+    Each app worker reserves SERIAL_BLOCK_SIZE numbers per round trip, so
+    most reports get their serial without touching the database. Numbers
+    left in a block when the worker stops are skipped, never reused.
+
+    The lock only guards the in-memory blocks; reserving a new block happens
+    outside it, so a slow database round trip never blocks the event loop.
+    """
+
+    def __init__(self, block_size=SERIAL_BLOCK_SIZE):
+        self.block_size = block_size
+        self.lock = threading.Lock()
+        self.day = None
+        # Reserved (first, last) number ranges for self.day, oldest first
+        self.blocks = deque()
+
+    def _take(self, day, count):
+        """Take up to `count` numbers from the reserved blocks"""
+        numbers = []
+        with self.lock:
+            if day != self.day:
+                self.day = day
+                self.blocks.clear()
+
+            while self.blocks and len(numbers) < count:
+                first, last = self.blocks.popleft()
+                take = min(count - len(numbers), last - first + 1)
+                numbers.extend(range(first, first + take))
+                if first + take <= last:
+                    self.blocks.appendleft((first + take, last))
+        return numbers
+
+    def _add_block(self, day, last_value, size):
+        with self.lock:
+            if day == self.day:
+                self.blocks.append((last_value - size + 1, last_value))
+
+    def allocate(self, count=1):
+        """Return `count` new serial numbers for today"""
+        day = datetime.now().date()
+        numbers = self._take(day, count)
+        while len(numbers) < count:
+            size = max(self.block_size, count - len(numbers))
+            self._add_block(day, reserve_block(day, size), size)
+            numbers.extend(self._take(day, count - len(numbers)))
+        return [format_serial(day, n) for n in numbers]
+
+    async def allocate_async(self, count=1):
+        """Same as allocate() for async routes"""
+        day = datetime.now().date()
+        numbers = self._take(day, count)
+        while len(numbers) < count:
+            size = max(self.block_size, count - len(numbers))
+            self._add_block(day, await reserve_block_async(day, size), size)
+            numbers.extend(self._take(day, count - len(numbers)))
+        return [format_serial(day, n) for n in numbers]
+
+
+serial_allocator = SerialAllocator()
+
+
+def generate_serial_number():
+    """Generate unique serial number: RAD-20260212-0001"""
+    return serial_allocator.allocate(1)[0]
+
+
+async def generate_serial_number_async():
+    """Same as generate_serial_number() for async routes"""
+    return (await serial_allocator.allocate_async(1))[0]
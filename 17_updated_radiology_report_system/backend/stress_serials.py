@@ -0,0 +1,68 @@
+"""
+Concurrency check: many threads in several worker processes create reports at
+once, and every serial number handed out must be unique.
+Each process imports the app itself, so each has its own SerialAllocator
+(like separate uvicorn workers). Run from the backend folder, e.g.
+    DATABASE_URL=sqlite:///stress.db python stress_serials.py --processes 4 --threads 16 --requests 50
+or against a running server:
+    python stress_serials.py --url http://localhost:8000/api
+"""
+
+import argparse
+import sys
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool
+
+
+def worker(args):
+    url, threads, requests = args
+    if url:
+        import httpx
+        client = httpx.Client(base_url=url, timeout=60)
+        path = "/reports"
+    else:
+        from fastapi.testclient import TestClient
+        from main import app
+        client = TestClient(app)
+        path = "/api/reports"
+
+    def create(n):
+        response = client.post(path, json={"patient_name": f"Stress Patient {n}"})
+        if response.status_code != 200:
+            return None, f"{response.status_code}: {response.text[:200]}"
+        return response.json()["serial_number"], None
+
+    # Entering the client once keeps every thread on one event loop (the async
+    # connection pool cannot be shared between loops)
+    with client, ThreadPoolExecutor(max_workers=threads) as pool:
+        return list(pool.map(create, range(threads * requests)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="Running server, e.g. http://localhost:8000/api")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=25, help="Reports created per thread")
+    args = parser.parse_args()
+
+    if not args.url:
+        # Create the tables once before the workers start
+        import main  # noqa: F401
+
+    with Pool(args.processes) as pool:
+        results = [r for chunk in pool.map(worker, [(args.url, args.threads, args.requests)] * args.processes) for r in chunk]
+
+    serials = [serial for serial, _ in results if serial]
+    errors = [error for _, error in results if error]
+    duplicates = {serial: n for serial, n in Counter(serials).items() if n > 1}
+
+    print(f"Requests: {len(results)}  created: {len(serials)}  failed: {len(errors)}")
+    print(f"Unique serials: {len(set(serials))}  collisions: {len(duplicates)}")
+    for error in errors[:5]:
+        print("  error:", error)
+    for serial, n in list(duplicates.items())[:5]:
+        print(f"  {serial} handed out {n} times")
+
+    sys.exit(1 if errors or duplicates else 0)
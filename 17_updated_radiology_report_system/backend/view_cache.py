@@ -0,0 +1,80 @@
+import gzip
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from cache import MemoryLRU
+from http_cache import etag_matches, weak_etag
+from config import VIEW_CACHE_MEMORY_BYTES
+
+# Brotli is optional; without it pages are served as gzip or plain
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+view_cache = MemoryLRU(VIEW_CACHE_MEMORY_BYTES)
+
+
+class CachedPage:
+    """One rendered page with its precompressed variants and validators,
+    for the report version (updated_at) it was rendered from"""
+
+    def __init__(self, html, updated_at):
+        body = html.encode("utf-8")
+        self.bodies = {"identity": body, "gzip": gzip.compress(body, compresslevel=9)}
+        if brotli is not None:
+            self.bodies["br"] = brotli.compress(body, quality=11)
+
+        # Weak, as in http_cache: the gzip, br and plain bodies differ byte for byte
+        # but are the same page, so one validator covers all of them
+        self.etag = weak_etag(body)
+        self.updated_at = updated_at
+        # Last-Modified is when the report changed, not when the page was rendered
+        self.modified = int(updated_at.timestamp()) if updated_at else int(time.time())
+        self.last_modified = formatdate(self.modified, usegmt=True)
+        self.size = sum(len(variant) for variant in self.bodies.values())
+
+    def not_modified(self, headers):
+        """True when the client's copy is still current (If-None-Match wins over If-Modified-Since)"""
+        if_none_match = headers.get("if-none-match")
+        if if_none_match:
+            return etag_matches(if_none_match, self.etag)
+
+        if_modified_since = headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return parsedate_to_datetime(if_modified_since).timestamp() >= self.modified
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def choose_encoding(self, accept_encoding):
+        """Best variant the client accepts: brotli, then gzip, then plain"""
+        accepted = set()
+        for item in (accept_encoding or "").split(","):
+            coding, _, params = item.strip().partition(";")
+            if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+                continue
+            accepted.add(coding.strip().lower())
+
+        for encoding in ("br", "gzip"):
+            if encoding in self.bodies and (encoding in accepted or "*" in accepted):
+                return encoding
+        return "identity"
+
+
+def get_page(serial_number, updated_at):
+    """The cached page, if it was rendered from this version of the report"""
+    page = view_cache.get(serial_number, "page")
+    if page is not None and page.updated_at == updated_at:
+        return page
+    return None
+
+
+def store_page(serial_number, html, updated_at):
+    page = CachedPage(html, updated_at)
+    view_cache.set(serial_number, "page", page, size=page.size)
+    return page
+
+
+def invalidate_page(serial_number):
+    view_cache.invalidate(serial_number)
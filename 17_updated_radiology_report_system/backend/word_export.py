@@ -1,66 +1,89 @@
-from docx import Document
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-import io
-
-def create_table_format(report):
-    """Generate Word document in table format"""
-    doc = Document()
-    
-    title = doc.add_heading('RADIOLOGY REPORT', level=1)
-    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    doc.add_paragraph()
-    
-    table = doc.add_table(rows=7, cols=4)
-    table.style = 'Table Grid'
-    
-    table.rows[0].cells[0].text = 'UHID:'
-    table.rows[0].cells[1].text = str(report.uhid or '')
-    table.rows[0].cells[2].text = 'Patient No:'
-    table.rows[0].cells[3].text = str(report.patient_no or '')
-    
-    table.rows[1].cells[0].text = 'Sl No:'
-    table.rows[1].cells[1].text = str(report.sl_no or '')
-    table.rows[1].cells[2].text = 'Reg No:'
-    table.rows[1].cells[3].text = str(report.reg_no or '')
-    
-    table.rows[2].cells[0].text = 'Patient Name:'
-    merged_cell = table.rows[2].cells[1].merge(table.rows[2].cells[3])
-    merged_cell.text = str(report.patient_name or '')
-    
-    table.rows[3].cells[0].text = 'Age/Sex:'
-    table.rows[3].cells[1].text = str(report.age_sex or '')
-    table.rows[3].cells[2].text = 'Report Date:'
-    table.rows[3].cells[3].text = str(report.report_date or '')
-    
-    table.rows[4].cells[0].text = 'Origin:'
-    table.rows[4].cells[1].text = str(report.origin_ethe or '')
-    table.rows[4].cells[2].text = 'Referred By:'
-    table.rows[4].cells[3].text = str(report.ref_by or '')
-    
-    table.rows[5].cells[0].text = 'Film No:'
-    table.rows[5].cells[1].text = str(report.film_no or '')
-    table.rows[5].cells[2].text = 'Scan Time:'
-    table.rows[5].cells[3].text = str(report.scan_time or '')
-    
-    table.rows[6].cells[0].text = 'Report Time:'
-    table.rows[6].cells[1].text = str(report.report_time or '')
-    table.rows[6].cells[2].text = 'TAT:'
-    table.rows[6].cells[3].text = str(report.tat or '')
-    
-    doc.add_paragraph()
-    
-    scan_heading = doc.add_heading(str(report.scan_type or 'SCAN TYPE'), level=2)
-    scan_heading.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    doc.add_paragraph()
-    
-    doc.add_heading('Findings:', level=3)
-    doc.add_paragraph(str(report.doctor_description or 'No findings recorded.'))
-    doc.add_paragraph()
-    
-    doc.add_heading('Impression:', level=3)
-    doc.add_paragraph(str(report.impression or 'No impression recorded.'))
-    
-    file_stream = io.BytesIO()
-    doc.save(file_stream)
-    file_stream.seek(0)
-    return file_stream
\ No newline at end of file
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+import io
+from docx_template import DocxTemplate
+
+def create_table_format(report):
+    """Generate Word document in table format"""
+    doc = Document()
+    
+    title = doc.add_heading('RADIOLOGY REPORT', level=1)
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    doc.add_paragraph()
+    
+    table = doc.add_table(rows=7, cols=4)
+    table.style = 'Table Grid'
+    
+    table.rows[0].cells[0].text = 'UHID:'
+    table.rows[0].cells[1].text = str(report.uhid or '')
+    table.rows[0].cells[2].text = 'Patient No:'
+    table.rows[0].cells[3].text = str(report.patient_no or '')
+    
+    table.rows[1].cells[0].text = 'Sl No:'
+    table.rows[1].cells[1].text = str(report.sl_no or '')
+    table.rows[1].cells[2].text = 'Reg No:'
+    table.rows[1].cells[3].text = str(report.reg_no or '')
+    
+    table.rows[2].cells[0].text = 'Patient Name:'
+    merged_cell = table.rows[2].cells[1].merge(table.rows[2].cells[3])
+    merged_cell.text = str(report.patient_name or '')
+    
+    table.rows[3].cells[0].text = 'Age/Sex:'
+    table.rows[3].cells[1].text = str(report.age_sex or '')
+    table.rows[3].cells[2].text = 'Report Date:'
+    table.rows[3].cells[3].text = str(report.report_date or '')
+    
+    table.rows[4].cells[0].text = 'Origin:'
+    table.rows[4].cells[1].text = str(report.origin_ethe or '')
+    table.rows[4].cells[2].text = 'Referred By:'
+    table.rows[4].cells[3].text = str(report.ref_by or '')
+    
+    table.rows[5].cells[0].text = 'Film No:'
+    table.rows[5].cells[1].text = str(report.film_no or '')
+    table.rows[5].cells[2].text = 'Scan Time:'
+    table.rows[5].cells[3].text = str(report.scan_time or '')
+    
+    table.rows[6].cells[0].text = 'Report Time:'
+    table.rows[6].cells[1].text = str(report.report_time or '')
+    table.rows[6].cells[2].text = 'TAT:'
+    table.rows[6].cells[3].text = str(report.tat or '')
+    
+    doc.add_paragraph()
+    
+    scan_heading = doc.add_heading(str(report.scan_type or 'SCAN TYPE'), level=2)
+    scan_heading.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    doc.add_paragraph()
+    
+    doc.add_heading('Findings:', level=3)
+    doc.add_paragraph(str(report.doctor_description or 'No findings recorded.'))
+    doc.add_paragraph()
+    
+    doc.add_heading('Impression:', level=3)
+    doc.add_paragraph(str(report.impression or 'No impression recorded.'))
+    
+    file_stream = io.BytesIO()
+    doc.save(file_stream)
+    file_stream.seek(0)
+    return file_stream
+
+
+# Every report field create_table_format writes, and its text when empty
+TABLE_FORMAT_FIELDS = (
+    "uhid", "patient_no", "sl_no", "reg_no", "patient_name", "age_sex",
+    "report_date", "origin_ethe", "ref_by", "film_no", "scan_time",
+    "report_time", "tat", "scan_type", "doctor_description", "impression",
+)
+TABLE_FORMAT_DEFAULTS = {
+    "scan_type": "SCAN TYPE",
+    "doctor_description": "No findings recorded.",
+    "impression": "No impression recorded.",
+}
+
+# Built once when the module is imported; each export only fills in the values
+table_template = DocxTemplate(create_table_format, TABLE_FORMAT_FIELDS, TABLE_FORMAT_DEFAULTS)
+
+
+# Timed by the callers (as docx_render), which may run it in another thread or process
+def render_table_format(report):
+    """Same document as create_table_format, rendered from the compiled template (bytes)"""
+    return table_template.render(report)
@@ -0,0 +1,125 @@
+import asyncio
+import contextvars
+import os
+import signal
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from types import SimpleNamespace
+from starlette.concurrency import run_in_threadpool
+from config import (
+    WORKER_PROCESSES, BULK_CONCURRENCY, UPLOAD_WORKERS, UPLOAD_QUEUE,
+    RENDER_PROCESSES, RENDER_QUEUE, RENDER_NICE, RENDER_SCHED_IDLE,
+)
+from word_export import render_table_format
+
+_process_pool = None
+
+
+class PoolSaturated(Exception):
+    """Raised instead of queueing when a bounded pool has no free slot"""
+
+
+class BoundedExecutor:
+    """Executor that refuses new work once max_pending jobs are running or waiting"""
+
+    def __init__(self, executor, max_pending):
+        self.executor = executor
+        self.max_pending = max_pending
+        self.slots = threading.BoundedSemaphore(max_pending)
+
+    def submit(self, fn, *args, **kwargs):
+        if not self.slots.acquire(blocking=False):
+            raise PoolSaturated()
+        try:
+            if isinstance(self.executor, ThreadPoolExecutor):
+                # Run in the caller's context so request metrics follow the work
+                future = self.executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+            else:
+                future = self.executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    async def run(self, fn, *args):
+        """Submit and wait without blocking the event loop; raises PoolSaturated when full"""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+
+# Parses and saves single uploads away from the event loop
+upload_pool = BoundedExecutor(
+    ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="upload"),
+    UPLOAD_WORKERS + UPLOAD_QUEUE,
+)
+
+
+def init_worker_process():
+    # Forked from the server, a worker inherits uvicorn's signal handlers and would
+    # otherwise ignore SIGTERM; Ctrl+C is left to the server, which shuts pools down
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def init_render_process():
+    init_worker_process()
+    os.nice(RENDER_NICE)
+    if RENDER_SCHED_IDLE and hasattr(os, "SCHED_IDLE"):
+        os.sched_setscheduler(0, os.SCHED_IDLE, os.sched_param(0))
+
+
+# The pool is created on first use so importing this module stays cheap. Its
+# processes yield the CPU to the API process, like the render processes.
+def get_process_pool():
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=WORKER_PROCESSES, initializer=init_render_process)
+    return _process_pool
+
+
+# Bulk operations using the pool above; each bounds its own queued documents
+bulk_slots = threading.BoundedSemaphore(BULK_CONCURRENCY)
+
+
+@contextmanager
+def bulk_slot():
+    """Hold one of the BULK_CONCURRENCY slots; raises PoolSaturated when none is free"""
+    if not bulk_slots.acquire(blocking=False):
+        raise PoolSaturated()
+    try:
+        yield
+    finally:
+        bulk_slots.release()
+
+
+# Renders exports and QR images for the API routes. python-docx and qrcode/Pillow
+# hold the GIL, so doing this in the app process slows every other request on it.
+# The processes start on first use.
+render_pool = None
+if RENDER_PROCESSES > 0:
+    render_pool = BoundedExecutor(
+        ProcessPoolExecutor(max_workers=RENDER_PROCESSES, initializer=init_render_process),
+        RENDER_PROCESSES + RENDER_QUEUE,
+    )
+
+
+async def run_render(fn, *args):
+    """Run fn(*args) in the render pool, or in the thread pool when RENDER_PROCESSES is 0.
+    Raises PoolSaturated when RENDER_QUEUE renders are already waiting."""
+    if render_pool is None:
+        return await run_in_threadpool(fn, *args)
+    return await render_pool.run(fn, *args)
+
+
+def shutdown_pools():
+    """Stop the worker processes; called when the server shuts down so none outlive it"""
+    if render_pool is not None:
+        render_pool.executor.shutdown(wait=True, cancel_futures=True)
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=True, cancel_futures=True)
+
+
+def render_table_docx(fields):
+    """Render one report (given as a plain dict of fields) to .docx bytes in a worker process"""
+    return render_table_format(SimpleNamespace(**fields))
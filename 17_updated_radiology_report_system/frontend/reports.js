@@ -1,195 +1,426 @@
-const API_URL = 'http://localhost:8000/api';
-
-window.addEventListener('DOMContentLoaded', () => {
-    loadReports();
-});
-
-async function loadReports() {
-    try {
-        const response = await fetch(`${API_URL}/reports`);
-        const data = await response.json();
-
-        document.getElementById('loading').style.display = 'none';
-
-        if (!data || data.length === 0) {
-            document.getElementById('noReports').style.display = 'block';
-        } else {
-            document.getElementById('reportsContainer').style.display = 'block';
-            displayReports(data);
-        }
-    } catch (err) {
-        console.error('Error loading reports:', err);
-        document.getElementById('loading').innerText =
-            'Error loading reports. Make sure backend is running.';
-    }
-}
-
-function displayReports(reports) {
-    const tableBody = document.getElementById('reportsTable');
-    tableBody.innerHTML = '';
-
-    reports.forEach(report => {
-        const row = document.createElement('tr');
-        row.innerHTML = `
-            <td>${report.serial_number}</td>
-            <td>${report.patient_name}</td>
-            <td>${report.age_sex || '-'}</td>
-            <td>${report.scan_type || '-'}</td>
-            <td>
-                <button class="btn-export" onclick="viewQR('${report.serial_number}')">QR Code</button>
-                <button class="btn-export" onclick="uploadFile('${report.serial_number}')">Upload</button>
-                <button class="btn-export" onclick="updateReport('${report.serial_number}')">Update</button>
-                <button class="btn-export" onclick="deleteReport('${report.serial_number}')">Delete</button>
-                <button class="btn-export" onclick="exportReport(${report.id})">Export</button>
-            </td>
-        `;
-        tableBody.appendChild(row);
-    });
-}
-
-function viewQR(serial) {
-    const qrImageUrl = `${API_URL}/reports/serial/${serial}/qr`;
-    const reportUrl = `http://192.168.100.9:8000/api/view/${serial}`;
-
-    const baseUrl = window.location.href.substring(0, window.location.href.lastIndexOf('/'));
-    const popupUrl = `${baseUrl}/qr_popup.html?serial=${encodeURIComponent(serial)}&qrUrl=${encodeURIComponent(qrImageUrl)}&reportUrl=${encodeURIComponent(reportUrl)}`;
-
-    const popup = window.open(popupUrl, 'QR Code', 'width=550,height=700,scrollbars=no,resizable=yes');
-
-    if (!popup) {
-        showNotification('Please allow popups for this site to view QR code', 'error');
-    }
-}
-
-function uploadFile(serial) {
-    const input = document.createElement('input');
-    input.type = 'file';
-    input.accept = '.docx';
-
-    input.onchange = async (e) => {
-        const file = e.target.files[0];
-        if (!file) return;
-
-        showNotification('Uploading file...', 'info');
-
-        const formData = new FormData();
-        formData.append('file', file);
-
-        try {
-            const response = await fetch(`${API_URL}/reports/serial/${serial}/upload`, {
-                method: 'POST',
-                body: formData
-            });
-            const result = await response.json();
-
-            if (result.success) {
-                showNotification(result.message || 'File uploaded successfully!', 'success');
-                setTimeout(() => loadReports(), 1500);
-            } else {
-                showNotification('Upload failed', 'error');
-            }
-        } catch (err) {
-            console.error('Upload error:', err);
-            showNotification('Error uploading file', 'error');
-        }
-    };
-
-    input.click();
-}
-
-function updateReport(serial) {
-    window.location.href = `index.html?serial=${serial}`;
-}
-
-async function deleteReport(serial) {
-    // Show confirmation message without blocking
-    showConfirmation('Delete this report?', () => {
-        performDelete(serial);
-    });
-}
-
-async function performDelete(serial) {
-    try {
-        const response = await fetch(`${API_URL}/reports/serial/${serial}`, { method: 'DELETE' });
-        const result = await response.json();
-
-        if (result.success) {
-            showNotification('Report deleted successfully!', 'success');
-            setTimeout(() => loadReports(), 1500);
-        } else {
-            showNotification('Error deleting report', 'error');
-        }
-    } catch (err) {
-        console.error('Delete error:', err);
-        showNotification('Error deleting report', 'error');
-    }
-}
-
-function exportReport(id) {
-    window.open(`${API_URL}/reports/${id}/export`, '_blank');
-    showNotification('Downloading report...', 'info');
-}
-
-// Notification system (instead of alert)
-function showNotification(message, type) {
-    // Remove existing notification if any
-    const existingNotif = document.querySelector('.notification');
-    if (existingNotif) {
-        existingNotif.remove();
-    }
-
-    const notification = document.createElement('div');
-    notification.className = `notification notification-${type}`;
-    notification.textContent = message;
-
-    document.body.appendChild(notification);
-
-    // Auto remove after 3 seconds
-    setTimeout(() => {
-        notification.classList.add('notification-fade');
-        setTimeout(() => notification.remove(), 300);
-    }, 3000);
-}
-
-// Confirmation system (instead of confirm)
-function showConfirmation(message, onConfirm) {
-    // Remove existing confirmation if any
-    const existingConfirm = document.querySelector('.confirm-overlay');
-    if (existingConfirm) {
-        existingConfirm.remove();
-    }
-
-    const overlay = document.createElement('div');
-    overlay.className = 'confirm-overlay';
-
-    const box = document.createElement('div');
-    box.className = 'confirm-box';
-
-    const messageEl = document.createElement('p');
-    messageEl.textContent = message;
-
-    const btnContainer = document.createElement('div');
-    btnContainer.className = 'confirm-buttons';
-
-    const yesBtn = document.createElement('button');
-    yesBtn.textContent = 'Yes';
-    yesBtn.className = 'btn-confirm-yes';
-    yesBtn.onclick = () => {
-        overlay.remove();
-        onConfirm();
-    };
-
-    const noBtn = document.createElement('button');
-    noBtn.textContent = 'No';
-    noBtn.className = 'btn-confirm-no';
-    noBtn.onclick = () => overlay.remove();
-
-    btnContainer.appendChild(yesBtn);
-    btnContainer.appendChild(noBtn);
-
-    box.appendChild(messageEl);
-    box.appendChild(btnContainer);
-    overlay.appendChild(box);
-
-    document.body.appendChild(overlay);
+const API_URL = 'http://localhost:8000/api';
+const PAGE_SIZE = 50;
+
+// How often the table asks for changes made elsewhere when live events are
+// not connected, and how long a burst of events is gathered into one sync (milliseconds)
+const SYNC_INTERVAL = 15000;
+const SYNC_DELAY = 250;
+
+// Cursor for the next page (null when the last page has been loaded)
+let nextCursor = null;
+
+// Token for /reports/changes: everything changed after it is not in the table yet
+let syncToken = null;
+
+// Live report events from the server (null when the browser has no EventSource)
+let liveEvents = null;
+let syncTimer = null;
+let syncing = false;
+
+window.addEventListener('DOMContentLoaded', () => {
+    loadReports();
+    loadQrConfig();
+    connectLiveEvents();
+    setInterval(() => {
+        const live = liveEvents && liveEvents.readyState === EventSource.OPEN;
+        if (!live && !document.hidden) syncReports();
+    }, SYNC_INTERVAL);
+});
+
+// Events only say that something changed; the rows come from /reports/changes
+function connectLiveEvents() {
+    if (!window.EventSource) return;
+
+    liveEvents = new EventSource(`${API_URL}/reports/events`);
+    ['created', 'updated', 'deleted', 'reset'].forEach(type => {
+        liveEvents.addEventListener(type, scheduleSync);
+    });
+    // Catch up on anything missed while disconnected (the browser reconnects by itself)
+    liveEvents.onopen = scheduleSync;
+}
+
+function scheduleSync() {
+    if (syncTimer) return;
+    syncTimer = setTimeout(() => {
+        syncTimer = null;
+        syncReports();
+    }, SYNC_DELAY);
+}
+
+// Build the list URL from the filters and the paging cursor
+function reportsUrl(cursor) {
+    const params = new URLSearchParams({ limit: PAGE_SIZE });
+    const scanType = document.getElementById('filterScanType').value.trim();
+    const reportDate = document.getElementById('filterReportDate').value;
+
+    if (scanType) params.append('scan_type', scanType);
+    if (reportDate) params.append('report_date', reportDate);
+    if (cursor) params.append('cursor', cursor);
+
+    return `${API_URL}/reports?${params.toString()}`;
+}
+
+// Load the first page again (used on start, after filters change and after edits)
+async function loadReports() {
+    try {
+        const response = await fetch(reportsUrl(null));
+        const data = await response.json();
+
+        document.getElementById('loading').style.display = 'none';
+        document.getElementById('reportsTable').innerHTML = '';
+        nextCursor = data.next_cursor;
+        syncToken = data.sync_token;
+
+        displayReports(data.items || []);
+        updateEmptyState();
+        updateLoadMore();
+    } catch (err) {
+        console.error('Error loading reports:', err);
+        document.getElementById('loading').innerText =
+            'Error loading reports. Make sure backend is running.';
+    }
+}
+
+// Append the next page below the rows already shown
+async function loadMoreReports() {
+    if (!nextCursor) return;
+
+    try {
+        const response = await fetch(reportsUrl(nextCursor));
+        const data = await response.json();
+
+        nextCursor = data.next_cursor;
+        displayReports(data.items);
+        updateLoadMore();
+    } catch (err) {
+        console.error('Error loading reports:', err);
+        showNotification('Error loading more reports', 'error');
+    }
+}
+
+// Apply what changed since the table was loaded or last synced, row by row
+async function syncReports() {
+    if (!syncToken) return;
+    // One sync at a time; events arriving meanwhile are picked up by another one
+    if (syncing) {
+        scheduleSync();
+        return;
+    }
+    syncing = true;
+
+    try {
+        const response = await fetch(`${API_URL}/reports/changes?since=${encodeURIComponent(syncToken)}`);
+        const data = await response.json();
+
+        // Token too old or too many changes: a full reload is cheaper
+        if (!response.ok || data.reset) {
+            loadReports();
+            return;
+        }
+
+        syncToken = data.token;
+        data.deleted.forEach(id => removeRow(id));
+        data.items.forEach(report => applyChange(report));
+        updateEmptyState();
+    } catch (err) {
+        console.error('Error syncing reports:', err);
+    } finally {
+        syncing = false;
+    }
+}
+
+function findRow(id) {
+    return document.querySelector(`#reportsTable tr[data-id="${id}"]`);
+}
+
+function removeRow(id) {
+    const row = findRow(id);
+    if (row) row.remove();
+}
+
+// Same filters as the list endpoint
+function matchesFilters(report) {
+    const scanType = document.getElementById('filterScanType').value.trim();
+    const reportDate = document.getElementById('filterReportDate').value;
+
+    if (scanType && report.scan_type !== scanType) return false;
+    if (reportDate && report.report_date !== reportDate) return false;
+    return true;
+}
+
+// Rows are sorted newest first by (created_at, id), like the list endpoint
+function isNewer(report, row) {
+    if (report.created_at !== row.dataset.createdAt) return report.created_at > row.dataset.createdAt;
+    return report.id > Number(row.dataset.id);
+}
+
+function applyChange(report) {
+    const existing = findRow(report.id);
+    if (!matchesFilters(report)) {
+        if (existing) existing.remove();
+        return;
+    }
+
+    const row = createRow(report);
+    if (existing) {
+        existing.replaceWith(row);
+        return;
+    }
+
+    // New rows are nearly always the newest, so this usually stops at the first row
+    const tableBody = document.getElementById('reportsTable');
+    const before = Array.from(tableBody.rows).find(other => isNewer(report, other));
+    if (before) {
+        tableBody.insertBefore(row, before);
+    } else if (!nextCursor) {
+        // Older than every loaded row: only shown here when there are no more pages
+        tableBody.appendChild(row);
+    }
+}
+
+function updateEmptyState() {
+    const empty = document.getElementById('reportsTable').rows.length === 0 && !nextCursor;
+    document.getElementById('reportsContainer').style.display = empty ? 'none' : 'block';
+    document.getElementById('noReports').style.display = empty ? 'block' : 'none';
+}
+
+function updateLoadMore() {
+    document.getElementById('loadMore').style.display = nextCursor ? 'block' : 'none';
+}
+
+function displayReports(reports) {
+    const tableBody = document.getElementById('reportsTable');
+    reports.forEach(report => tableBody.appendChild(createRow(report)));
+}
+
+function createRow(report) {
+    const row = document.createElement('tr');
+    row.dataset.id = report.id;
+    row.dataset.createdAt = report.created_at;
+    row.innerHTML = `
+            <td>${report.serial_number}</td>
+            <td>${report.patient_name}</td>
+            <td>${report.age_sex || '-'}</td>
+            <td>${report.scan_type || '-'}</td>
+            <td>
+                <button class="btn-export" onclick="viewQR('${report.serial_number}')">QR Code</button>
+                <button class="btn-export" onclick="uploadFile('${report.serial_number}')">Upload</button>
+                <button class="btn-export" onclick="updateReport('${report.serial_number}')">Update</button>
+                <button class="btn-export" onclick="deleteReport('${report.serial_number}')">Delete</button>
+                <button class="btn-export" onclick="exportReport(${report.id})">Export</button>
+            </td>
+        `;
+    return row;
+}
+
+// Public address QR codes point to, and its version for the image URLs
+// (asked from the backend once on load)
+let qrBaseUrl = API_URL.replace(/\/api$/, '');
+let qrVersion = '';
+
+async function loadQrConfig() {
+    try {
+        const response = await fetch(`${API_URL}/qr-config`);
+        const config = await response.json();
+        qrBaseUrl = config.base_url;
+        qrVersion = config.qr_version;
+    } catch (err) {
+        console.error('Error loading QR config:', err);
+    }
+}
+
+function viewQR(serial) {
+    // The browser may keep a versioned image for good; without a version it revalidates
+    const qrImageUrl = qrVersion
+        ? `${API_URL}/reports/serial/${serial}/qr?v=${qrVersion}`
+        : `${API_URL}/reports/serial/${serial}/qr`;
+    const reportUrl = `${qrBaseUrl}/api/view/${serial}`;
+
+    const baseUrl = window.location.href.substring(0, window.location.href.lastIndexOf('/'));
+    const popupUrl = `${baseUrl}/qr_popup.html?serial=${encodeURIComponent(serial)}&qrUrl=${encodeURIComponent(qrImageUrl)}&reportUrl=${encodeURIComponent(reportUrl)}`;
+
+    const popup = window.open(popupUrl, 'QR Code', 'width=550,height=700,scrollbars=no,resizable=yes');
+
+    if (!popup) {
+        showNotification('Please allow popups for this site to view QR code', 'error');
+    }
+}
+
+function uploadFile(serial) {
+    const input = document.createElement('input');
+    input.type = 'file';
+    input.accept = '.docx';
+
+    input.onchange = async (e) => {
+        const file = e.target.files[0];
+        if (!file) return;
+
+        showNotification('Uploading file...', 'info');
+
+        const formData = new FormData();
+        formData.append('file', file);
+
+        try {
+            const response = await fetch(`${API_URL}/reports/serial/${serial}/upload`, {
+                method: 'POST',
+                body: formData
+            });
+            const result = await response.json();
+
+            if (result.success) {
+                showNotification(result.message || 'File uploaded successfully!', 'success');
+                syncReports();
+            } else {
+                showNotification('Upload failed', 'error');
+            }
+        } catch (err) {
+            console.error('Upload error:', err);
+            showNotification('Error uploading file', 'error');
+        }
+    };
+
+    input.click();
+}
+
+function updateReport(serial) {
+    window.location.href = `index.html?serial=${serial}`;
+}
+
+async function deleteReport(serial) {
+    // Show confirmation message without blocking
+    showConfirmation('Delete this report?', () => {
+        performDelete(serial);
+    });
+}
+
+async function performDelete(serial) {
+    try {
+        const response = await fetch(`${API_URL}/reports/serial/${serial}`, { method: 'DELETE' });
+        const result = await response.json();
+
+        if (result.success) {
+            showNotification('Report deleted successfully!', 'success');
+            syncReports();
+        } else {
+            showNotification('Error deleting report', 'error');
+        }
+    } catch (err) {
+        console.error('Delete error:', err);
+        showNotification('Error deleting report', 'error');
+    }
+}
+
+function exportReport(id) {
+    window.open(`${API_URL}/reports/${id}/export`, '_blank');
+    showNotification('Downloading report...', 'info');
+}
+
+// Download every report in the chosen date range as one ZIP
+function exportZip() {
+    const dateFrom = document.getElementById('archiveFrom').value;
+    const dateTo = document.getElementById('archiveTo').value;
+
+    if (!dateFrom || !dateTo) {
+        showNotification('Choose both dates to export', 'error');
+        return;
+    }
+
+    // Large archives are rendered in the background; poll until the file is ready
+    fetch(`${API_URL}/exports`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ date_from: dateFrom, date_to: dateTo })
+    })
+        .then(response => response.json())
+        .then(job => {
+            showNotification('Preparing export...', 'info');
+            waitForExport(job.id);
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            showNotification('Error starting export', 'error');
+        });
+}
+
+function waitForExport(jobId) {
+    fetch(`${API_URL}/exports/${jobId}`)
+        .then(response => response.json())
+        .then(job => {
+            if (job.status === 'done') {
+                window.open(`${API_URL}/exports/${jobId}/file`, '_blank');
+                showNotification(`Downloading ${job.report_count} reports...`, 'info');
+            } else if (job.status === 'failed') {
+                showNotification(`Export failed: ${job.error}`, 'error');
+            } else {
+                setTimeout(() => waitForExport(jobId), 2000);
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            showNotification('Error checking export', 'error');
+        });
+}
+
+// Notification system (instead of alert)
+function showNotification(message, type) {
+    // Remove existing notification if any
+    const existingNotif = document.querySelector('.notification');
+    if (existingNotif) {
+        existingNotif.remove();
+    }
+
+    const notification = document.createElement('div');
+    notification.className = `notification notification-${type}`;
+    notification.textContent = message;
+
+    document.body.appendChild(notification);
+
+    // Auto remove after 3 seconds
+    setTimeout(() => {
+        notification.classList.add('notification-fade');
+        setTimeout(() => notification.remove(), 300);
+    }, 3000);
+}
+
+// Confirmation system (instead of confirm)
+function showConfirmation(message, onConfirm) {
+    // Remove existing confirmation if any
+    const existingConfirm = document.querySelector('.confirm-overlay');
+    if (existingConfirm) {
+        existingConfirm.remove();
+    }
+
+    const overlay = document.createElement('div');
+    overlay.className = 'confirm-overlay';
+
+    const box = document.createElement('div');
+    box.className = 'confirm-box';
+
+    const messageEl = document.createElement('p');
+    messageEl.textContent = message;
+
+    const btnContainer = document.createElement('div');
+    btnContainer.className = 'confirm-buttons';
+
+    const yesBtn = document.createElement('button');
+    yesBtn.textContent = 'Yes';
+    yesBtn.className = 'btn-confirm-yes';
+    yesBtn.onclick = () => {
+        overlay.remove();
+        onConfirm();
+    };
+
+    const noBtn = document.createElement('button');
+    noBtn.textContent = 'No';
+    noBtn.className = 'btn-confirm-no';
+    noBtn.onclick = () => overlay.remove();
+
+    btnContainer.appendChild(yesBtn);
+    btnContainer.appendChild(noBtn);
+
+    box.appendChild(messageEl);
+    box.appendChild(btnContainer);
+    overlay.appendChild(box);
+
+    document.body.appendChild(overlay);
 }
\ No newline at end of file